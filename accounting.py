@@ -0,0 +1,199 @@
+"""Token and latency accounting per agent and tool, per user request.
+
+Every agent carries an :class:`Accounting` capability. It records the tokens,
+model requests and wall time of each model request, the calls and wall time
+of each tool, and the wall time of each agent run into the request's
+:class:`UsageReport` (``MyDeps.usage``), so nested worker runs add up to one
+report per user request.
+
+After each model request the agent's totals are checked against its budget in
+``AGENT_TOKEN_BUDGETS``. Going over issues a :class:`TokenBudgetWarning`, or
+raises :class:`TokenBudgetExceeded` when ``TOKEN_BUDGET_ACTION`` is ``fail``.
+Responses replayed from the LLM cache report no tokens.
+"""
+
+import time
+import warnings
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from pydantic_ai.capabilities import AbstractCapability
+from pydantic_ai.exceptions import UsageLimitExceeded
+
+from config import AGENT_TOKEN_BUDGETS, TOKEN_BUDGET_ACTION
+
+
+class TokenBudgetWarning(UserWarning):
+    pass
+
+
+class TokenBudgetExceeded(UsageLimitExceeded):
+    pass
+
+
+@dataclass
+class TokenBudget:
+    input_tokens_per_request: int | None = None
+    total_tokens: int | None = None
+
+
+@dataclass
+class AgentUsage:
+    runs: int = 0
+    run_seconds: float = 0.0
+    requests: int = 0
+    request_seconds: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    max_input_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+
+@dataclass
+class ToolUsage:
+    calls: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    # Tokens of the results handed to the model, and of the same results as
+    # JSON, for the results rendered compactly (see compact.py).
+    result_tokens: int = 0
+    json_tokens: int = 0
+
+
+@dataclass
+class UsageReport:
+    """Everything one user request cost, keyed by agent and by tool name."""
+
+    agents: dict[str, AgentUsage] = field(default_factory=dict)
+    tools: dict[str, ToolUsage] = field(default_factory=dict)
+
+    def agent(self, name: str) -> AgentUsage:
+        return self.agents.setdefault(name, AgentUsage())
+
+    def tool(self, name: str) -> ToolUsage:
+        return self.tools.setdefault(name, ToolUsage())
+
+    @property
+    def input_tokens(self) -> int:
+        return sum(usage.input_tokens for usage in self.agents.values())
+
+    @property
+    def output_tokens(self) -> int:
+        return sum(usage.output_tokens for usage in self.agents.values())
+
+    @property
+    def requests(self) -> int:
+        return sum(usage.requests for usage in self.agents.values())
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "requests": self.requests,
+            "agents": {name: asdict(usage) for name, usage in self.agents.items()},
+            "tools": {name: asdict(usage) for name, usage in self.tools.items()},
+        }
+
+
+def budget_for(agent_name: str) -> TokenBudget:
+    return TokenBudget(**AGENT_TOKEN_BUDGETS.get(agent_name, {}))
+
+
+def check_budget(
+    agent_name: str,
+    usage: AgentUsage,
+    budget: TokenBudget,
+    last_input_tokens: int,
+    action: str = TOKEN_BUDGET_ACTION,
+) -> None:
+    """Warn or raise if an agent's usage in this request is over its budget.
+
+    :param agent_name: agent being checked
+    :type agent_name: str
+    :param usage: the agent's usage so far in this user request
+    :type usage: AgentUsage
+    :param budget: the agent's budget
+    :type budget: TokenBudget
+    :param last_input_tokens: prompt size of the model request just made
+    :type last_input_tokens: int
+    :param action: "warn" or "fail"
+    :type action: str
+    :raises TokenBudgetExceeded: if over budget and ``action`` is "fail"
+    """
+    problems = []
+    limit = budget.input_tokens_per_request
+    if limit is not None and last_input_tokens > limit:
+        problems.append(f"prompt of {last_input_tokens} tokens exceeds {limit}")
+    limit = budget.total_tokens
+    if limit is not None and usage.total_tokens > limit:
+        problems.append(f"{usage.total_tokens} tokens in this request exceed {limit}")
+    if not problems:
+        return
+    message = f"{agent_name} is over its token budget: {'; '.join(problems)}"
+    if action == "fail":
+        raise TokenBudgetExceeded(message)
+    warnings.warn(message, TokenBudgetWarning, stacklevel=2)
+
+
+def request_usage(ctx) -> UsageReport | None:
+    """The request's usage report, or None if the deps do not carry one."""
+    return getattr(ctx.deps, "usage", None)
+
+
+@dataclass
+class Accounting(AbstractCapability):
+    """Capability that books an agent's usage on ``ctx.deps.usage``."""
+
+    agent_name: str
+    budget: TokenBudget | None = None
+
+    def __post_init__(self) -> None:
+        if self.budget is None:
+            self.budget = budget_for(self.agent_name)
+
+    async def wrap_run(self, ctx, *, handler):
+        start = time.perf_counter()
+        try:
+            return await handler()
+        finally:
+            report = request_usage(ctx)
+            if report is not None:
+                usage = report.agent(self.agent_name)
+                usage.runs += 1
+                usage.run_seconds += time.perf_counter() - start
+
+    async def wrap_model_request(self, ctx, *, request_context, handler):
+        start = time.perf_counter()
+        response = await handler(request_context)
+        report = request_usage(ctx)
+        if report is not None:
+            usage = report.agent(self.agent_name)
+            usage.requests += 1
+            usage.request_seconds += time.perf_counter() - start
+            usage.input_tokens += response.usage.input_tokens
+            usage.output_tokens += response.usage.output_tokens
+            usage.max_input_tokens = max(
+                usage.max_input_tokens, response.usage.input_tokens
+            )
+            check_budget(
+                self.agent_name, usage, self.budget, response.usage.input_tokens
+            )
+        return response
+
+    async def wrap_tool_execute(self, ctx, *, call, tool_def, args, handler):
+        report = request_usage(ctx)
+        if report is None or tool_def.kind != "function":
+            return await handler(args)
+        usage = report.tool(call.tool_name)
+        usage.calls += 1
+        start = time.perf_counter()
+        try:
+            return await handler(args)
+        except Exception:
+            usage.errors += 1
+            raise
+        finally:
+            usage.seconds += time.perf_counter() - start
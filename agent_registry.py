@@ -0,0 +1,52 @@
+"""Agents built on first use and looked up by name.
+
+Importing an agent package only defines its prompt, tools and output model;
+the ``Agent`` itself (and with it the model client) is created the first time
+:func:`get_agent` asks for it. Worker names match ``AgentNames``.
+"""
+
+import importlib
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pydantic_ai import Agent
+
+PLANNER = "planner"
+
+AGENT_FACTORIES = {
+    PLANNER: "planner_agent.agent:build_planner_agent",
+    "invoice_worker": "invoice_agent.agent:build_invoice_agent",
+    "ticket_worker": "ticket_agent.agent:build_ticket_agent",
+    "customer_detail_worker": (
+        "customer_detail_agent.agent:build_customer_detail_agent"
+    ),
+}
+
+_agents: dict[str, "Agent"] = {}
+_lock = threading.Lock()
+
+
+def get_agent(name: str) -> "Agent":
+    """Return the agent registered under ``name``, building it on first use.
+
+    :param name: ``PLANNER`` or a worker name, e.g. ``AgentNames.INVOICE_AGENT``
+    :type name: str
+    :raises KeyError: if no agent is registered under that name
+    :return: the shared agent instance
+    :rtype: Agent
+    """
+    agent = _agents.get(name)
+    if agent is not None:
+        return agent
+    module_name, factory_name = AGENT_FACTORIES[name].split(":")
+    with _lock:
+        if name not in _agents:
+            factory = getattr(importlib.import_module(module_name), factory_name)
+            _agents[name] = factory()
+        return _agents[name]
+
+
+def built_agents() -> list[str]:
+    """Names of the agents built so far."""
+    return list(_agents)
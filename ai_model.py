@@ -1,12 +1,31 @@
 import os
+from functools import cache
+from typing import TYPE_CHECKING
 
 from dotenv import load_dotenv
-from pydantic_ai.models.mistral import MistralModel
 
-from config import AI_MODEL
+from config import AI_MODEL, LLM_CACHE_ENABLED, TEMPERATURE
+
+if TYPE_CHECKING:
+    from pydantic_ai.models import Model
 
 load_dotenv()
 api_key = os.getenv("MISTRAL_API_KEY")
 
 
-model = MistralModel(AI_MODEL)
+@cache
+def get_model() -> "Model":
+    """Build (once) the model shared by all agents.
+
+    The Mistral SDK is imported here rather than at module level; it is the
+    single most expensive import of the project.
+    """
+    from pydantic_ai.models.mistral import MistralModel
+    from pydantic_ai.settings import ModelSettings
+
+    model = MistralModel(AI_MODEL, settings=ModelSettings(temperature=TEMPERATURE))
+    if LLM_CACHE_ENABLED:
+        from llm_cache import CachedModel
+
+        model = CachedModel(model)
+    return model
@@ -27,6 +27,16 @@ target_metadata = Base.metadata
 # ... etc.
 
 
+# Full-text search objects are created by hand-written DDL (see
+# database.TICKET_SEARCH_DDL); keep autogenerate from proposing to drop them.
+SEARCH_OBJECTS = {"tickets_fts", "search_vector", "ix_tickets_search_vector"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    is_search_object = name in SEARCH_OBJECTS or name.startswith("tickets_fts_")
+    return not (reflected and compare_to is None and is_search_object)
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -43,6 +53,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -66,7 +77,11 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
@@ -0,0 +1,39 @@
+"""add foreign key indexes
+
+Revision ID: c41e8f2a7d10
+Revises: b0970a00819c
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e8f2a7d10'
+down_revision: Union[str, Sequence[str], None] = 'b0970a00819c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Leading customer_id makes this the FK index of tickets as well as the
+    # index for listing a customer's tickets by status and date.
+    op.create_index(
+        'ix_tickets_customer_id_status_created_at',
+        'tickets',
+        ['customer_id', 'status', 'created_at'],
+    )
+    op.create_index('ix_invoices_customer_id', 'invoices', ['customer_id'])
+    op.create_index(
+        'ix_customer_details_customer_id', 'customer_details', ['customer_id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_customer_details_customer_id', table_name='customer_details')
+    op.drop_index('ix_invoices_customer_id', table_name='invoices')
+    op.drop_index('ix_tickets_customer_id_status_created_at', table_name='tickets')
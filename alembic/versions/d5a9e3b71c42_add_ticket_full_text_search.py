@@ -0,0 +1,107 @@
+"""add ticket full text search
+
+Revision ID: d5a9e3b71c42
+Revises: c41e8f2a7d10
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a9e3b71c42'
+down_revision: Union[str, Sequence[str], None] = 'c41e8f2a7d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SQLITE_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE tickets_fts USING fts5(
+        subject, description,
+        content='tickets', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER tickets_fts_insert AFTER INSERT ON tickets
+    BEGIN
+        INSERT INTO tickets_fts (rowid, subject, description)
+        VALUES (new.id, new.subject, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER tickets_fts_delete AFTER DELETE ON tickets
+    BEGIN
+        INSERT INTO tickets_fts (tickets_fts, rowid, subject, description)
+        VALUES ('delete', old.id, old.subject, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER tickets_fts_update
+    AFTER UPDATE OF subject, description ON tickets
+    BEGIN
+        INSERT INTO tickets_fts (tickets_fts, rowid, subject, description)
+        VALUES ('delete', old.id, old.subject, old.description);
+        INSERT INTO tickets_fts (rowid, subject, description)
+        VALUES (new.id, new.subject, new.description);
+    END
+    """,
+    # Index the tickets that already exist.
+    "INSERT INTO tickets_fts (tickets_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS tickets_fts_update",
+    "DROP TRIGGER IF EXISTS tickets_fts_delete",
+    "DROP TRIGGER IF EXISTS tickets_fts_insert",
+    "DROP TABLE IF EXISTS tickets_fts",
+]
+
+POSTGRESQL_VECTOR = """
+    setweight(to_tsvector('english', coalesce({row}subject, '')), 'A')
+    || setweight(to_tsvector('english', coalesce({row}description, '')), 'B')
+"""
+
+POSTGRESQL_UPGRADE = [
+    "ALTER TABLE tickets ADD COLUMN search_vector tsvector",
+    f"""
+    CREATE FUNCTION tickets_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {POSTGRESQL_VECTOR.format(row='NEW.')};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER tickets_search_vector_update
+    BEFORE INSERT OR UPDATE OF subject, description ON tickets
+    FOR EACH ROW EXECUTE FUNCTION tickets_search_vector_update()
+    """,
+    # Index the tickets that already exist.
+    f"UPDATE tickets SET search_vector = {POSTGRESQL_VECTOR.format(row='')}",
+    "CREATE INDEX ix_tickets_search_vector ON tickets USING gin (search_vector)",
+]
+
+POSTGRESQL_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_tickets_search_vector",
+    "DROP TRIGGER IF EXISTS tickets_search_vector_update ON tickets",
+    "DROP FUNCTION IF EXISTS tickets_search_vector_update()",
+    "ALTER TABLE tickets DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _execute(statements: dict[str, list[str]]) -> None:
+    # Other backends get no index; ticket search falls back to LIKE there.
+    for statement in statements.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _execute({'sqlite': SQLITE_UPGRADE, 'postgresql': POSTGRESQL_UPGRADE})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _execute({'sqlite': SQLITE_DOWNGRADE, 'postgresql': POSTGRESQL_DOWNGRADE})
@@ -0,0 +1,28 @@
+"""add ticket updated_at index
+
+Revision ID: e7b2c94f1a36
+Revises: d5a9e3b71c42
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2c94f1a36'
+down_revision: Union[str, Sequence[str], None] = 'd5a9e3b71c42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The similar-ticket index reads the tickets updated since its last refresh.
+    op.create_index('ix_tickets_updated_at', 'tickets', ['updated_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tickets_updated_at', table_name='tickets')
@@ -1,8 +1,27 @@
 from config import USER_PROMPT
 from dependencies import MyDeps
-from planner_agent.agent import planner_agent
+from planner_agent.events import (
+    RunFinished,
+    SummaryDelta,
+    ToolCalled,
+    WorkerFinished,
+    WorkerStarted,
+)
+from planner_agent.router import route_stream_sync
 
 if __name__ == "__main__":
     my_db_deps = MyDeps(db_name="Production_SQL_Azure", is_admin=True)
-    result = planner_agent.run_sync(USER_PROMPT, deps=my_db_deps)
-    print(result.output)
+    for event in route_stream_sync(USER_PROMPT, deps=my_db_deps):
+        match event:
+            case WorkerStarted(worker=worker):
+                print(f"[{worker} started]")
+            case WorkerFinished(worker=worker, elapsed=elapsed, error=error):
+                outcome = f"failed: {error}" if error else "finished"
+                print(f"[{worker} {outcome} after {elapsed:.2f}s]")
+            case ToolCalled(agent=agent, tool_name=tool_name):
+                print(f"[{agent} called {tool_name}]")
+            case SummaryDelta(text=text):
+                print(text, end="", flush=True)
+            case RunFinished(output=output):
+                print()
+                print(output)
@@ -0,0 +1,205 @@
+"""Run a JSONL file of prompts through the planner on one event loop.
+
+Each input line is ``{"id": ..., "prompt": ...}`` (``id`` defaults to the line
+number). Results are written as JSONL as soon as each prompt finishes, in
+completion order::
+
+    {"id": ..., "output": {...PlannerOutput...}, "elapsed": 1.23, "usage": {...}}
+    {"id": ..., "error": "...", "elapsed": 0.5}
+
+A line that is not a JSON object with a ``prompt`` gets an error result under
+its ``id``, or its line number, and the batch goes on. Ids that succeeded are
+appended to a checkpoint file, so rerunning the same command after a crash
+skips them. Failed prompts are not checkpointed and are retried on the next
+run. A prompt that finished right before a crash may be
+written twice.
+
+Usage::
+
+    python batch.py prompts.jsonl -o results.jsonl --concurrency 8
+    cat prompts.jsonl | python batch.py - > results.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Iterator
+
+from config import BATCH_CONCURRENCY
+from dependencies import MyDeps
+from metrics import latency_summary
+from planner_agent.router import route_async
+
+
+@dataclass
+class BatchItem:
+    id: str
+    prompt: str
+
+
+@dataclass
+class InvalidItem:
+    """An input line that could not be read as an item."""
+
+    id: str
+    error: str
+
+
+@dataclass
+class BatchStats:
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+    def report(self, elapsed: float) -> str:
+        done = self.succeeded + self.failed
+        summary = latency_summary(self.latencies)
+        return (
+            f"{done} prompts ({self.failed} failed, {self.skipped} skipped) "
+            f"in {elapsed:.1f}s, {done / elapsed if elapsed else 0.0:.2f} prompts/s, "
+            f"latency p50 {summary['p50_ms']:.0f} ms, p95 {summary['p95_ms']:.0f} ms, "
+            f"p99 {summary['p99_ms']:.0f} ms"
+        )
+
+
+def read_items(
+    lines: IO[str], done: set[str]
+) -> Iterator[BatchItem | InvalidItem | str]:
+    """Parse input lines, yielding the ids of already finished items as strings."""
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        record = None
+        try:
+            record = json.loads(line)
+            prompt = record["prompt"]
+        except (json.JSONDecodeError, KeyError, TypeError) as exc:
+            item_id = record.get("id") if isinstance(record, dict) else None
+            item_id = str(line_number if item_id is None else item_id)
+            yield InvalidItem(item_id, f"line {line_number}: {exc!r}")
+            continue
+        item_id = str(record.get("id", line_number))
+        if item_id in done:
+            yield item_id
+        else:
+            yield BatchItem(item_id, prompt)
+
+
+def load_checkpoint(path: Path | None) -> set[str]:
+    if path is None or not path.exists():
+        return set()
+    return {line.strip() for line in path.read_text().splitlines() if line.strip()}
+
+
+class BatchRunner:
+    """Feeds items to a fixed number of worker tasks and writes their results."""
+
+    def __init__(
+        self,
+        output: IO[str],
+        checkpoint: IO[str] | None,
+        concurrency: int = BATCH_CONCURRENCY,
+        db_name: str = "Production_SQL_Azure",
+        is_admin: bool = False,
+    ) -> None:
+        self.output = output
+        self.checkpoint = checkpoint
+        self.concurrency = concurrency
+        self.db_name = db_name
+        self.is_admin = is_admin
+        self.stats = BatchStats()
+
+    async def _process(self, item: BatchItem) -> None:
+        deps = MyDeps(db_name=self.db_name, is_admin=self.is_admin)
+        start = time.perf_counter()
+        try:
+            output = await route_async(item.prompt, deps)
+        except Exception as exc:
+            elapsed = time.perf_counter() - start
+            self.stats.failed += 1
+            self._write({"id": item.id, "error": repr(exc), "elapsed": elapsed})
+            return
+        elapsed = time.perf_counter() - start
+        self.stats.succeeded += 1
+        self.stats.latencies.append(elapsed)
+        self._write(
+            {
+                "id": item.id,
+                "output": output.model_dump(mode="json"),
+                "elapsed": elapsed,
+                "usage": deps.usage.to_dict(),
+            }
+        )
+        if self.checkpoint is not None:
+            self.checkpoint.write(f"{item.id}\n")
+            self.checkpoint.flush()
+
+    def _write(self, record: dict) -> None:
+        self.output.write(json.dumps(record) + "\n")
+        self.output.flush()
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while (item := await queue.get()) is not None:
+            await self._process(item)
+
+    async def run(self, items: Iterator[BatchItem | InvalidItem | str]) -> BatchStats:
+        """Process items with at most ``concurrency`` prompts in flight."""
+        queue: asyncio.Queue[BatchItem | None] = asyncio.Queue(self.concurrency * 2)
+        workers = [
+            asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)
+        ]
+        for item in items:
+            if isinstance(item, str):
+                self.stats.skipped += 1
+                continue
+            if isinstance(item, InvalidItem):
+                self.stats.failed += 1
+                self._write({"id": item.id, "error": item.error, "elapsed": 0.0})
+                continue
+            await queue.put(item)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+        return self.stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL file of prompts, or - for stdin")
+    parser.add_argument("-o", "--output", help="JSONL results file (default stdout)")
+    parser.add_argument(
+        "--checkpoint",
+        help="file of finished ids (default: <output>.checkpoint when -o is given)",
+    )
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--db-name", default="Production_SQL_Azure")
+    parser.add_argument("--admin", action="store_true")
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint or (
+        f"{args.output}.checkpoint" if args.output else None
+    )
+    checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+    done = load_checkpoint(checkpoint_path)
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    output = open(args.output, "a") if args.output else sys.stdout
+    checkpoint = open(checkpoint_path, "a") if checkpoint_path else None
+    runner = BatchRunner(output, checkpoint, args.concurrency, args.db_name, args.admin)
+    start = time.perf_counter()
+    try:
+        stats = asyncio.run(runner.run(read_items(source, done)))
+    finally:
+        for stream in (source, output, checkpoint):
+            if stream not in (None, sys.stdin, sys.stdout):
+                stream.close()
+    print(stats.report(time.perf_counter() - start), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
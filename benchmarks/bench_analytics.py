@@ -0,0 +1,179 @@
+"""Benchmark of the SQL-side analytics against working row by row.
+
+Seeds ``--customers``, ``--tickets`` and ``--invoices`` rows and answers three
+questions three ways:
+
+* ``sql``: the :mod:`service_layer.analytics` function, aggregating in SQL;
+* ``rows``: fetching the matching rows and aggregating them in Python;
+* ``lookups``: what a model without these tools does, listing the rows and
+  then looking each one up with the existing per-record service function.
+
+For each it reports the latency and the size of the JSON handed to the
+model, which is what the model reads back as tokens (about 4 bytes each).
+Each way must arrive at the same totals.
+
+Usage::
+
+    python -m benchmarks.bench_analytics
+    python -m benchmarks.bench_analytics --tickets 1000000 --invoices 500000
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import date, datetime
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+
+from benchmarks.common import seed_database, summarize
+from database import Invoice, Ticket, TicketStatus
+from db_session import session_scope
+from service_layer.analytics import (
+    count_tickets,
+    get_customer_balances,
+    get_overdue_invoices,
+)
+from service_layer.cache import invoice_cache, ticket_cache
+from service_layer.invoice_service import InvoiceDetails, get_invoice_infos
+from service_layer.ticket_service import TicketDetails, get_ticket_infos
+
+AS_OF = datetime(2025, 12, 1)
+MONTH = (date(2025, 11, 1), date(2025, 12, 1))
+
+
+def _json_size(value) -> int:
+    return len(TypeAdapter(type(value)).dump_json(value))
+
+
+def _rows_size(models: list) -> int:
+    return len(json.dumps([model.model_dump(mode="json") for model in models]))
+
+
+def balance_sql(customer_id: int) -> tuple[float, int]:
+    [balance] = get_customer_balances([str(customer_id)], AS_OF)
+    return balance.balance, _json_size(balance)
+
+
+def balance_rows(customer_id: int) -> tuple[float, int]:
+    with session_scope() as session:
+        rows = session.execute(
+            select(Invoice.invoice_number, Invoice.amount, Invoice.due_date).where(
+                Invoice.customer_id == customer_id
+            )
+        ).all()
+    return float(sum(row.amount for row in rows)), 0
+
+
+def balance_lookups(customer_id: int) -> tuple[float, int]:
+    with session_scope() as session:
+        numbers = session.scalars(
+            select(Invoice.invoice_number).where(Invoice.customer_id == customer_id)
+        ).all()
+    details = [get_invoice_infos(number) for number in numbers]
+    return sum(detail.amount for detail in details), _rows_size(details)
+
+
+def open_tickets_sql() -> tuple[int, int]:
+    counts = count_tickets(status="Open", since=MONTH[0], until=MONTH[1])
+    return counts.total, _json_size(counts)
+
+
+def open_tickets_rows() -> tuple[int, int]:
+    with session_scope() as session:
+        rows = session.execute(
+            select(Ticket.id, Ticket.status).where(
+                Ticket.created_at >= MONTH[0], Ticket.created_at < MONTH[1]
+            )
+        ).all()
+    return sum(row.status == TicketStatus.OPEN for row in rows), 0
+
+
+def open_tickets_lookups() -> tuple[int, int]:
+    with session_scope() as session:
+        numbers = session.scalars(
+            select(Ticket.ticket_number).where(
+                Ticket.created_at >= MONTH[0], Ticket.created_at < MONTH[1]
+            )
+        ).all()
+    details: list[TicketDetails] = [get_ticket_infos(number) for number in numbers]
+    open_tickets = [detail for detail in details if detail.status == "Open"]
+    return len(open_tickets), _rows_size(details)
+
+
+def overdue_sql() -> tuple[float, int]:
+    overdue = get_overdue_invoices(as_of=AS_OF)
+    return overdue.amount, _json_size(overdue)
+
+
+def overdue_rows() -> tuple[float, int]:
+    with session_scope() as session:
+        rows = session.execute(
+            select(Invoice.amount, Invoice.due_date).where(Invoice.due_date < AS_OF)
+        ).all()
+    return float(sum(row.amount for row in rows)), 0
+
+
+def overdue_lookups() -> tuple[float, int]:
+    with session_scope() as session:
+        numbers = session.scalars(select(Invoice.invoice_number)).all()
+    details: list[InvoiceDetails] = [get_invoice_infos(number) for number in numbers]
+    overdue = [detail for detail in details if detail.due_date < AS_OF]
+    return sum(detail.amount for detail in overdue), _rows_size(overdue)
+
+
+def measure(label: str, function, args_list: list, iterations: int) -> None:
+    """Print the latency and payload of ``function`` per argument tuple."""
+    latencies, results, sizes = [], [], []
+    for i in range(iterations):
+        args = args_list[i % len(args_list)]
+        invoice_cache.clear()
+        ticket_cache.clear()
+        start = time.perf_counter()
+        result, size = function(*args)
+        latencies.append(time.perf_counter() - start)
+        results.append(round(result, 2))
+        sizes.append(size)
+    stats = summarize(latencies)
+    payload = f"{sum(sizes) / len(sizes):10,.0f}" if any(sizes) else f"{'-':>10}"
+    print(
+        f"{label:<34} {stats['p50_ms']:10.2f} {stats['p95_ms']:10.2f} {payload}"
+        f"   total {results[0]:,}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=10_000)
+    parser.add_argument("--tickets", type=int, default=200_000)
+    parser.add_argument("--invoices", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    seed_database(args.customers, args.tickets, args.invoices)
+    print(f"seeded in {time.perf_counter() - start:.1f}s\n")
+
+    rng = random.Random(9)
+    customers = [(rng.randint(1, args.customers),) for _ in range(args.iterations)]
+    print(
+        f"{'question / approach':<34} {'p50 ms':>10} {'p95 ms':>10} "
+        f"{'JSON bytes':>10}"
+    )
+    for label, function, args_list, iterations in (
+        ("customer balance: sql", balance_sql, customers, args.iterations),
+        ("customer balance: rows", balance_rows, customers, args.iterations),
+        ("customer balance: lookups", balance_lookups, customers, args.iterations),
+        ("open tickets this month: sql", open_tickets_sql, [()], args.iterations),
+        ("open tickets this month: rows", open_tickets_rows, [()], args.iterations),
+        ("open tickets this month: lookups", open_tickets_lookups, [()], 3),
+        ("overdue invoices: sql", overdue_sql, [()], args.iterations),
+        ("overdue invoices: rows", overdue_rows, [()], args.iterations),
+        ("overdue invoices: lookups", overdue_lookups, [()], 1),
+    ):
+        measure(label, function, args_list, iterations)
+
+
+if __name__ == "__main__":
+    main()
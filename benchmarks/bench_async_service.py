@@ -0,0 +1,114 @@
+"""Concurrency benchmark: blocking vs async service-layer lookups on one event loop.
+
+Runs the same batch of invoice/ticket/customer lookups from concurrent asyncio
+tasks, once through the blocking ``get_*`` functions and once through their
+``*_async`` variants on aiosqlite. Besides throughput it reports the worst
+event-loop stall, which is what hurts concurrent agent runs.
+
+Usage::
+
+    DB_POOL_SIZE=5 DB_MAX_OVERFLOW=10 python -m benchmarks.bench_async_service
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import (
+    customer_email,
+    invoice_number,
+    seed_database,
+    summarize,
+    ticket_number,
+)
+from config import DB_MAX_OVERFLOW, DB_POOL_SIZE
+from database import get_async_engine
+from service_layer.customer_details import get_customer_info, get_customer_info_async
+from service_layer.invoice_service import get_invoice_infos, get_invoice_infos_async
+from service_layer.ticket_service import get_ticket_infos, get_ticket_infos_async
+
+
+def build_workload(num_requests: int, seed: int = 7) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    workload = []
+    for _ in range(num_requests):
+        kind = rng.choice(["invoice", "ticket", "customer"])
+        if kind == "invoice":
+            workload.append((kind, invoice_number(rng.randrange(500))))
+        elif kind == "ticket":
+            workload.append((kind, ticket_number(rng.randrange(1000))))
+        else:
+            workload.append((kind, customer_email(rng.randint(1, 200))))
+    return workload
+
+
+async def sync_lookup(kind: str, key: str):
+    if kind == "invoice":
+        return get_invoice_infos(key)
+    if kind == "ticket":
+        return get_ticket_infos(key)
+    return get_customer_info(None, key)
+
+
+async def async_lookup(kind: str, key: str):
+    if kind == "invoice":
+        return await get_invoice_infos_async(key)
+    if kind == "ticket":
+        return await get_ticket_infos_async(key)
+    return await get_customer_info_async(None, key)
+
+
+async def run_mode(lookup, workload, concurrency: int) -> dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    max_lag = 0.0
+    done = asyncio.Event()
+
+    async def heartbeat():
+        nonlocal max_lag
+        interval = 0.001
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            max_lag = max(max_lag, time.perf_counter() - start - interval)
+
+    async def one(kind, key):
+        async with semaphore:
+            start = time.perf_counter()
+            await lookup(kind, key)
+            latencies.append(time.perf_counter() - start)
+
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(one(kind, key) for kind, key in workload))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await beat
+    return {
+        "throughput_rps": len(workload) / elapsed,
+        "max_loop_stall_ms": max_lag * 1000,
+        **summarize(latencies),
+    }
+
+
+async def main(num_requests: int, concurrency: int) -> None:
+    seed_database()
+    workload = build_workload(num_requests)
+    print(
+        f"{num_requests} lookups, concurrency={concurrency}, "
+        f"pool_size={DB_POOL_SIZE}, max_overflow={DB_MAX_OVERFLOW}"
+    )
+    for name, lookup in (("blocking", sync_lookup), ("async", async_lookup)):
+        stats = await run_mode(lookup, workload, concurrency)
+        print(f"{name:>9}: " + "  ".join(f"{k}={v:.2f}" for k, v in stats.items()))
+    await get_async_engine().dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,83 @@
+"""Benchmark of the compact tool-result format against JSON.
+
+Seeds a small database, builds typical results of the worker tools and
+renders each as the JSON pydantic-ai would send and as the compact text of
+:mod:`compact`, reporting tokens, bytes and render time. Tokens are counted
+with tiktoken when it is installed, and estimated otherwise.
+
+Usage::
+
+    python -m benchmarks.bench_compact
+    python -m benchmarks.bench_compact --iterations 1000
+"""
+
+import argparse
+import time
+
+from pydantic_ai.messages import tool_return_ta
+
+from benchmarks.common import invoice_number, seed_database, ticket_number
+from compact import CompactFormat, _encoding, count_tokens
+from service_layer.customer_360 import get_customer_360, get_customer_360_many
+from service_layer.invoice_service import get_invoice_infos, get_invoice_infos_many
+from service_layer.listings import list_customer_invoices, list_customer_tickets
+from service_layer.ticket_service import get_ticket_infos, get_ticket_infos_many
+
+
+def tool_results() -> dict[str, object]:
+    """One result per kind of tool, as the tools return them."""
+    tickets = [ticket_number(i) for i in range(20)] + ["TKT-0"]
+    invoices = [invoice_number(i) for i in range(20)]
+    return {
+        "ticket details": get_ticket_infos(ticket_number(1)),
+        "invoice details": get_invoice_infos(invoice_number(1)),
+        "20 tickets + a miss": [
+            details or f"No database record found for Ticket ID: {number}"
+            for number, details in zip(tickets, get_ticket_infos_many(tickets))
+        ],
+        "20 invoices": get_invoice_infos_many(invoices),
+        "customer 360": get_customer_360("3", None),
+        "3 customers 360": get_customer_360_many(["3", "4", "5"]),
+        "ticket listing page (50)": list_customer_tickets("3", page_size=50),
+        "invoice listing page (10)": list_customer_invoices("3"),
+    }
+
+
+def _render_us(function, value, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function(value)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    seed_database(num_customers=20, num_tickets=2000, num_invoices=1000)
+    compact = CompactFormat()
+    tokenizer = "tiktoken" if _encoding() is not None else "estimated"
+    print(f"tokens: {tokenizer}\n")
+    print(
+        f"{'tool result':<28} {'JSON tok':>9} {'compact':>8} {'saved':>6} "
+        f"{'JSON B':>7} {'compact':>8} {'render us':>10}"
+    )
+    totals = [0, 0]
+    for label, value in tool_results().items():
+        as_json = tool_return_ta.dump_json(value).decode()
+        as_text = compact.dumps(value)
+        json_tokens, tokens = count_tokens(as_json), count_tokens(as_text)
+        totals[0] += json_tokens
+        totals[1] += tokens
+        print(
+            f"{label:<28} {json_tokens:9,} {tokens:8,} "
+            f"{1 - tokens / json_tokens:6.0%} {len(as_json):7,} {len(as_text):8,} "
+            f"{_render_us(compact.dumps, value, args.iterations):10.1f}"
+        )
+    saved = 1 - totals[1] / totals[0]
+    print(f"{'total':<28} {totals[0]:9,} {totals[1]:8,} {saved:6.0%}")
+
+
+if __name__ == "__main__":
+    main()
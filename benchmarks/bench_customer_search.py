@@ -0,0 +1,134 @@
+"""Benchmark of the fuzzy customer search index.
+
+Seeds ``--customers`` customers, then reports the time and memory it takes
+to build :data:`service_layer.customer_search.customer_index`. Query latency
+is measured for misspelled emails, partial names and phone fragments. For
+comparison the same queries are scored against every customer, which is what
+the index avoids. Finally it measures how long an ORM write takes to show up
+in search results.
+
+Usage::
+
+    python -m benchmarks.bench_customer_search --customers 100000
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from benchmarks.common import customer_email, seed_database, summarize
+from database import Customer
+from db_session import session_scope
+from service_layer.customer_search import (
+    FIELDS,
+    customer_index,
+    digit_trigrams,
+    load_customer_index,
+    similarity,
+    text_trigrams,
+)
+
+
+def _typo(text: str, rng: random.Random) -> str:
+    i = rng.randrange(1, len(text) - 1)
+    return text[:i] + text[i + 1 :]
+
+
+def build_queries(num_customers: int, count: int, seed: int = 3) -> list[tuple]:
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        i = rng.randint(1, num_customers)
+        queries += [
+            ("misspelled email", _typo(customer_email(i), rng), i),
+            ("partial name", f"Customer {i}", i),
+            ("phone fragment", f"555-{i:07d}"[-7:], i),
+        ]
+    return queries
+
+
+def brute_force(query: str, limit: int = 5) -> list[int]:
+    """Score every indexed customer, without the candidate step."""
+    queries = {
+        "name": text_trigrams(query),
+        "email": text_trigrams(query),
+        "phone_number": digit_trigrams(query),
+    }
+    scores = [
+        (
+            max(
+                similarity(queries[field], trigrams)
+                for field, trigrams in zip(FIELDS, entry.trigrams)
+            ),
+            customer_id,
+        )
+        for customer_id, entry in customer_index._entries.items()
+    ]
+    return [customer_id for _, customer_id in sorted(scores, reverse=True)[:limit]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--brute-force", type=int, default=10, dest="brute_force")
+    args = parser.parse_args()
+
+    seed_database(num_customers=args.customers, num_tickets=0, num_invoices=0)
+    customer_index.invalidate()
+    tracemalloc.start()
+    start = time.perf_counter()
+    load_customer_index()
+    build = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    retained = tracemalloc.take_snapshot().statistics("filename")
+    tracemalloc.stop()
+    print(
+        f"indexed {len(customer_index):,} customers in {build:.2f}s, "
+        f"{sum(stat.size for stat in retained) / 2**20:.1f} MiB retained, "
+        f"{peak / 2**20:.1f} MiB peak"
+    )
+
+    queries = build_queries(args.customers, args.queries)
+    by_kind: dict[str, list[float]] = {}
+    found: dict[str, int] = {}
+    for kind, query, expected in queries:
+        start = time.perf_counter()
+        matches = customer_index.search(query)
+        by_kind.setdefault(kind, []).append(time.perf_counter() - start)
+        found[kind] = found.get(kind, 0) + any(
+            match.customer_id == expected for match in matches
+        )
+    print(f"{'query':<18} {'p50 ms':>8} {'p95 ms':>8} {'top-5 recall':>13}")
+    for kind, latencies in by_kind.items():
+        stats = summarize(latencies)
+        recall = found[kind] / len(latencies)
+        print(
+            f"{kind:<18} {stats['p50_ms']:8.3f} {stats['p95_ms']:8.3f} "
+            f"{recall:13.0%}"
+        )
+
+    latencies = []
+    for _, query, _ in queries[: args.brute_force]:
+        start = time.perf_counter()
+        brute_force(query)
+        latencies.append(time.perf_counter() - start)
+    print(f"{'brute force':<18} {summarize(latencies)['p50_ms']:8.3f}")
+
+    start = time.perf_counter()
+    with session_scope() as session:
+        session.add(
+            Customer(
+                id=args.customers + 1, name="Sandra Wang", email="swang@example.net"
+            )
+        )
+    visible = bool(customer_index.search("sandra wnag"))
+    print(
+        f"insert + commit + re-index: {(time.perf_counter() - start) * 1000:.2f} ms, "
+        f"searchable: {visible}"
+    )
+
+
+if __name__ == "__main__":
+    main()
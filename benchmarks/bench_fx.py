@@ -0,0 +1,173 @@
+"""Benchmark of batch currency conversion against the in-memory rate table.
+
+Seeds ``--invoices`` invoices with a year of synthetic daily rates, then
+compares, for the same amounts and days:
+
+* :meth:`service_layer.fx_rates.RateTable.convert_batch`, one vectorised
+  pass, and :meth:`~service_layer.fx_rates.RateTable.convert`, which also
+  builds a ``Conversion`` model per amount;
+* a loop converting each amount with ``Decimal`` at rates from a dict, and
+  checks that all give exactly the same results;
+* :func:`service_layer.fx_rates.convert_invoices` against looking each
+  invoice's rates up with its own queries.
+
+Usage::
+
+    python -m benchmarks.bench_fx --invoices 100000
+"""
+
+import argparse
+import random
+import time
+from bisect import bisect_right
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from benchmarks.common import invoice_number, seed_database
+from database import FxRate, Invoice
+from db_session import session_scope
+from service_layer.fx_rates import (
+    MINOR_UNITS,
+    RATE_PLACES,
+    ROUNDING,
+    convert_invoices,
+    fx_rates,
+    load_fx_rates,
+)
+
+
+def decimal_loop(amounts: list, days: list[date], currency: str) -> list:
+    """The per-amount reference: find both rates, multiply and round in Decimal."""
+    with session_scope() as session:
+        rows = session.execute(
+            select(FxRate.rate_date, FxRate.currency, FxRate.units_per_eur)
+        ).all()
+    rates: dict[str, dict[date, Decimal]] = {}
+    for day, code, units in rows:
+        rates.setdefault(code, {})[day] = units
+    known = {code: sorted(by_day) for code, by_day in rates.items()}
+
+    def units(code: str, day: date) -> Decimal:
+        if code == "EUR":
+            return Decimal(1)
+        return rates[code][known[code][bisect_right(known[code], day) - 1]]
+
+    quantum = Decimal(1).scaleb(-MINOR_UNITS.get(currency, 2))
+    results = []
+    for amount, day in zip(amounts, days):
+        cross = units(currency, day) / units("USD", day)
+        converted = (Decimal(str(amount)) * cross).quantize(quantum, ROUNDING)
+        results.append((converted, cross.quantize(RATE_PLACES, ROUNDING)))
+    return results
+
+
+def query_per_invoice(numbers: list[str], currency: str) -> list[Decimal]:
+    """Row-by-row: load each invoice, then its two rates with their own queries."""
+
+    def units(session, code: str, day: date) -> Decimal:
+        if code == "EUR":
+            return Decimal(1)
+        return session.scalar(
+            select(FxRate.units_per_eur)
+            .where(FxRate.currency == code, FxRate.rate_date <= day)
+            .order_by(FxRate.rate_date.desc())
+            .limit(1)
+        )
+
+    quantum = Decimal(1).scaleb(-MINOR_UNITS.get(currency, 2))
+    results = []
+    with session_scope() as session:
+        for number in numbers:
+            invoice = session.scalars(
+                select(Invoice).where(Invoice.invoice_number == number)
+            ).one()
+            day = invoice.issued_date.date()
+            cross = units(session, currency, day) / units(session, "USD", day)
+            converted = Decimal(invoice.amount) * cross
+            results.append(converted.quantize(quantum, ROUNDING))
+    return results
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--invoices", type=int, default=100_000)
+    parser.add_argument("--amounts", type=int, default=100_000)
+    parser.add_argument("--currency", default="EUR")
+    parser.add_argument("--row-by-row", type=int, default=2000, dest="row_by_row")
+    args = parser.parse_args()
+
+    seed_database(num_customers=1000, num_tickets=0, num_invoices=args.invoices)
+    fx_rates.invalidate()
+    _, elapsed = _timed(load_fx_rates)
+    print(
+        f"loaded {len(fx_rates.dates):,} days x {len(fx_rates.currencies)} "
+        f"currencies in {elapsed * 1000:.1f} ms"
+    )
+
+    rng = random.Random(5)
+    first, last = fx_rates.dates[[0, -1]].tolist()
+    span = (last - first).days
+    # Cents, and a share of half-cent amounts that land near rounding ties.
+    amounts = [
+        round(rng.uniform(1, 10_000), rng.choice((2, 2, 2, 3)))
+        for _ in range(args.amounts)
+    ]
+    days = [first + timedelta(days=rng.randrange(span + 1)) for _ in amounts]
+    batch, batched = _timed(
+        fx_rates.convert_batch, amounts, "USD", args.currency, days
+    )
+    models, modelled = _timed(fx_rates.convert, amounts, "USD", args.currency, days)
+    reference, looped = _timed(decimal_loop, amounts, days, args.currency)
+    digits = MINOR_UNITS.get(args.currency, 2)
+    minor = [converted.scaleb(digits) for converted, _ in reference]
+    batch_mismatches = sum(
+        minor_units != expected
+        for minor_units, expected in zip(batch.minor_units.tolist(), minor)
+    )
+    model_mismatches = sum(
+        (conversion.converted, conversion.rate) != expected
+        for conversion, expected in zip(models, reference)
+    )
+    print(f"{'convert':<28} {'total ms':>10} {'us/amount':>10}")
+    for label, elapsed in (
+        ("convert_batch (arrays)", batched),
+        ("convert (models)", modelled),
+        ("Decimal loop", looped),
+    ):
+        print(
+            f"{label:<28} {elapsed * 1000:10.1f} "
+            f"{elapsed / len(amounts) * 1e6:10.2f}"
+        )
+    print(
+        f"{len(amounts):,} amounts; {batch_mismatches} batch and "
+        f"{model_mismatches} model results differ from the Decimal loop"
+    )
+
+    numbers = [
+        invoice_number(i) for i in rng.sample(range(args.invoices), args.row_by_row)
+    ]
+    batched, fast = _timed(convert_invoices, numbers, args.currency)
+    row_by_row, slow = _timed(query_per_invoice, numbers, args.currency)
+    mismatches = sum(
+        conversion.converted != expected
+        for conversion, expected in zip(batched, row_by_row)
+    )
+    print(f"\n{'convert invoices':<28} {'total ms':>10} {'us/invoice':>10}")
+    for label, elapsed in (("convert_invoices", fast), ("query per invoice", slow)):
+        print(
+            f"{label:<28} {elapsed * 1000:10.1f} "
+            f"{elapsed / len(numbers) * 1e6:10.2f}"
+        )
+    print(f"{len(numbers):,} invoices, {mismatches} differ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Cold-start benchmark: per-module import time and time to first agent.
+
+Every measurement runs in a fresh interpreter. Module import times come from
+``python -X importtime`` (cumulative time of the module's own line); the
+scenarios time a whole interpreter run, e.g. import plus building all agents.
+``DATABASE_URL`` is removed from the environment, so a module that needs the
+database at import time fails the run.
+
+Results are compared with ``benchmarks/baselines/import_time.json``; the
+script exits non-zero when a measurement is slower than its baseline by more
+than the tolerance. Baselines are machine specific: refresh them with
+``--update`` on the machine that runs the comparison.
+
+Usage::
+
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --update
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = ROOT / "benchmarks" / "baselines" / "import_time.json"
+
+MODULES = [
+    "config",
+    "database",
+    "db_session",
+    "dependencies",
+    "service_layer.invoice_service",
+    "agent_registry",
+    "planner_agent.router",
+    "batch",
+    "service",
+]
+
+SCENARIOS = {
+    "import router": "import planner_agent.router",
+    "build all agents": (
+        "import agent_registry as r\n"
+        "for name in r.AGENT_FACTORIES: r.get_agent(name)"
+    ),
+}
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def _env() -> dict[str, str]:
+    env = dict(os.environ)
+    env.pop("DATABASE_URL", None)
+    env.setdefault("MISTRAL_API_KEY", "benchmark")
+    return env
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """{module: (self us, cumulative us)} from ``-X importtime`` output."""
+    times = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            times[match[4]] = (int(match[1]), int(match[2]))
+    return times
+
+
+def import_time(module: str) -> tuple[float, list[tuple[str, float]]]:
+    """Cumulative import time of ``module`` in ms and its heaviest imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=_env(),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    times = parse_importtime(result.stderr)
+    heaviest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)[:5]
+    return times[module][1] / 1000, [(name, t[0] / 1000) for name, t in heaviest]
+
+
+def scenario_time(code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=_env(), check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def measure(repeat: int) -> tuple[dict, dict]:
+    results = {"python": sys.version.split()[0], "modules": {}, "scenarios": {}}
+    heaviest = {}
+    for module in MODULES:
+        runs = [import_time(module) for _ in range(repeat)]
+        results["modules"][module] = round(statistics.median(ms for ms, _ in runs), 1)
+        heaviest[module] = runs[-1][1]
+    for name, code in SCENARIOS.items():
+        results["scenarios"][name] = round(
+            statistics.median(scenario_time(code) for _ in range(repeat)), 1
+        )
+    return results, heaviest
+
+
+def compare(results: dict, baseline: dict, tolerance: float, slack_ms: float) -> bool:
+    ok = True
+    for section in ("modules", "scenarios"):
+        for name, ms in results[section].items():
+            before = baseline.get(section, {}).get(name)
+            if before is None:
+                print(f"{name:>32}: {ms:8.1f} ms  (no baseline)")
+                continue
+            limit = max(before * (1 + tolerance), before + slack_ms)
+            regressed = ms > limit
+            ok &= not regressed
+            print(
+                f"{name:>32}: {ms:8.1f} ms  baseline {before:8.1f} ms  "
+                f"{(ms - before) / before:+6.1%}{'  REGRESSION' if regressed else ''}"
+            )
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--slack-ms", type=float, default=20.0)
+    parser.add_argument("--update", action="store_true", help="rewrite the baseline")
+    parser.add_argument("--verbose", action="store_true", help="show heaviest imports")
+    args = parser.parse_args()
+
+    results, heaviest = measure(args.repeat)
+    if args.verbose:
+        for module, modules in heaviest.items():
+            top = ", ".join(f"{name} {ms:.0f} ms" for name, ms in modules)
+            print(f"{module}: {top}")
+    if args.update or not BASELINE_PATH.exists():
+        BASELINE_PATH.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+        return
+    baseline = json.loads(BASELINE_PATH.read_text())
+    ok = compare(results, baseline, args.tolerance, args.slack_ms)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
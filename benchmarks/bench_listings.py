@@ -0,0 +1,135 @@
+"""Benchmark of the keyset-paginated customer listings.
+
+Seeds ``--tickets`` tickets over ``--customers`` customers, so that each one
+has thousands, and for the first customer compares:
+
+* reading one page at increasing depths with the keyset cursor of
+  :func:`service_layer.listings.list_customer_tickets` against ``OFFSET``;
+* loading all of the customer's tickets into models at once against
+  streaming them with :func:`service_layer.listings.iter_customer_tickets`,
+  by time and peak Python memory;
+* the JSON handed to the model: the first page against the full listing.
+
+Usage::
+
+    python -m benchmarks.bench_listings
+    python -m benchmarks.bench_listings --customers 2 --tickets 500000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+
+from benchmarks.common import seed_database, summarize
+from config import LISTING_PAGE_SIZE
+from database import Ticket
+from db_session import session_scope
+from service_layer.customer_360 import TicketSummary
+from service_layer.listings import iter_customer_tickets, list_customer_tickets
+
+CUSTOMER = "1"
+SUMMARIES = TypeAdapter(list[TicketSummary])
+COLUMNS = (Ticket.ticket_number, Ticket.subject, Ticket.status, Ticket.created_at)
+
+
+def offset_page(depth: int) -> list[TicketSummary]:
+    """The page ``depth`` (1-based) with LIMIT/OFFSET, as a naive listing would."""
+    with session_scope() as session:
+        rows = session.execute(
+            select(*COLUMNS)
+            .where(Ticket.customer_id == int(CUSTOMER))
+            .order_by(Ticket.created_at.desc(), Ticket.id.desc())
+            .limit(LISTING_PAGE_SIZE)
+            .offset((depth - 1) * LISTING_PAGE_SIZE)
+        ).all()
+    return [TicketSummary.model_validate(row) for row in rows]
+
+
+def keyset_page(cursor: str | None) -> list[TicketSummary]:
+    return list_customer_tickets(CUSTOMER, cursor=cursor).tickets
+
+
+def load_all() -> list[TicketSummary]:
+    """Every ticket of the customer in one list."""
+    with session_scope() as session:
+        rows = session.execute(
+            select(*COLUMNS)
+            .where(Ticket.customer_id == int(CUSTOMER))
+            .order_by(Ticket.created_at.desc(), Ticket.id.desc())
+        ).all()
+    return [TicketSummary.model_validate(row) for row in rows]
+
+
+def stream_all() -> int:
+    """Walk every ticket of the customer page by page, keeping none of them."""
+    return sum(len(page.tickets) for page in iter_customer_tickets(CUSTOMER))
+
+
+def _profiled(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def _latency(function, *args, iterations: int) -> dict[str, float]:
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function(*args)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=20)
+    parser.add_argument("--tickets", type=int, default=200_000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    seed_database(args.customers, args.tickets, num_invoices=0)
+    print(f"seeded in {time.perf_counter() - start:.1f}s")
+
+    # The cursor at the start of every page, collected by walking the listing.
+    cursors = [None]
+    for page in iter_customer_tickets(CUSTOMER, page_size=LISTING_PAGE_SIZE):
+        cursors.append(page.next_cursor)
+    total = (len(cursors) - 2) * LISTING_PAGE_SIZE
+    print(f"customer {CUSTOMER} has about {total:,} tickets\n")
+
+    print(f"{'page depth':<12} {'keyset p50 ms':>14} {'offset p50 ms':>14}")
+    last = len(cursors) - 1
+    depths = [10**power for power in range(len(str(last))) if 10**power < last]
+    for depth in [*depths, last]:
+        assert keyset_page(cursors[depth - 1]) == offset_page(depth)
+        keyset = _latency(keyset_page, cursors[depth - 1], iterations=args.iterations)
+        offset = _latency(offset_page, depth, iterations=args.iterations)
+        print(f"{depth:<12,} {keyset['p50_ms']:14.2f} {offset['p50_ms']:14.2f}")
+
+    loaded, load_time, load_peak = _profiled(load_all)
+    streamed, stream_time, stream_peak = _profiled(stream_all)
+    assert streamed == len(loaded)
+    print(f"\n{'all tickets':<12} {'ms':>14} {'peak MiB':>14}")
+    for label, elapsed, peak in (
+        ("load all", load_time, load_peak),
+        ("stream", stream_time, stream_peak),
+    ):
+        print(f"{label:<12} {elapsed * 1000:14.1f} {peak / 2**20:14.1f}")
+
+    first_page = list_customer_tickets(CUSTOMER)
+    print(
+        f"\nJSON for the model: first page {len(first_page.model_dump_json()):,} "
+        f"bytes, full listing {len(SUMMARIES.dump_json(loaded)):,} bytes"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Offline end-to-end benchmark with scripted stand-in models.
+
+Runs representative prompts through the real router, agents, tools, service
+layer and a seeded SQLite database, with every LLM call replaced by the
+scripts in :mod:`benchmarks.scripted_model`. Reports per scenario:
+
+* latency (p50/p95/p99) of sequential runs,
+* estimated tokens per run (prompt size of the scripted requests),
+* per-stage time: SQL (cursor execution), model (time inside the scripts),
+  and framework = everything else (prompt building, tool dispatch, pydantic
+  validation, session handling),
+* allocations under tracemalloc (peak and retained KiB per run),
+* throughput of concurrent runs.
+
+Results are compared with ``benchmarks/baselines/offline.json``; the script
+exits non-zero when p50 latency or throughput regresses by more than the
+tolerance. Refresh the baseline with ``--update``.
+
+Usage::
+
+    python -m benchmarks.bench_offline --iterations 50 --concurrency 8
+"""
+
+import os
+
+os.environ["LLM_CACHE_ENABLED"] = "0"
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+import tracemalloc  # noqa: E402
+from dataclasses import dataclass, field  # noqa: E402
+from pathlib import Path  # noqa: E402
+from typing import Awaitable, Callable  # noqa: E402
+
+from sqlalchemy import event  # noqa: E402
+
+from benchmarks.common import (  # noqa: E402
+    customer_email,
+    invoice_number,
+    seed_database,
+    summarize,
+    ticket_number,
+)
+from benchmarks.scripted_model import script_stats, scripted_agents  # noqa: E402
+from agent_registry import PLANNER, get_agent  # noqa: E402
+from database import get_async_engine  # noqa: E402
+from dependencies import MyDeps, run_scope  # noqa: E402
+from planner_agent.router import route_async  # noqa: E402
+from service_layer.cache import (  # noqa: E402
+    customer_cache,
+    invoice_cache,
+    ticket_cache,
+)
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "offline.json"
+
+
+async def planner_only(prompt: str, deps: MyDeps):
+    """Skip the router's fast path and fan-out: always ask the planner."""
+    async with run_scope(deps):
+        return (await get_agent(PLANNER).run(prompt, deps=deps)).output
+
+
+@dataclass
+class Scenario:
+    name: str
+    template: Callable[[int], str]
+    run: Callable[[str, MyDeps], Awaitable] = route_async
+
+
+SCENARIOS = [
+    Scenario(
+        "invoice + EUR conversion",
+        lambda i: (
+            f"Retrieve {invoice_number(i)}. The customer is disputing the "
+            "conversion rate. Turn the invoice amount into EUR"
+        ),
+    ),
+    Scenario(
+        "ticket lookup (router)",
+        lambda i: f"What is the status of {ticket_number(i)}?",
+    ),
+    Scenario(
+        "ticket lookup (planner)",
+        lambda i: f"What is the status of {ticket_number(i)}?",
+        planner_only,
+    ),
+    Scenario(
+        "customer by email (router)",
+        lambda i: f"Give me all the infos on {customer_email(i)}",
+    ),
+    Scenario(
+        "customer by email (planner)",
+        lambda i: f"Give me all the infos on {customer_email(i)}",
+        planner_only,
+    ),
+    Scenario(
+        "invoice + ticket fan-out",
+        lambda i: f"Is {invoice_number(i)} the reason for {ticket_number(i)}? Explain.",
+    ),
+]
+
+
+@dataclass
+class SqlTimer:
+    statements: int = 0
+    seconds: float = 0.0
+    _started: dict = field(default_factory=dict)
+
+    def install(self, engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        self._started[id(cursor)] = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        started = self._started.pop(id(cursor), None)
+        if started is not None:
+            self.statements += 1
+            self.seconds += time.perf_counter() - started
+
+    def reset(self) -> None:
+        self.statements = 0
+        self.seconds = 0.0
+
+
+sql_timer = SqlTimer()
+
+
+def _clear_caches() -> None:
+    for cache in (invoice_cache, ticket_cache, customer_cache):
+        cache.clear()
+
+
+def _deps() -> MyDeps:
+    return MyDeps(db_name="benchmark", is_admin=False)
+
+
+async def measure_latency(scenario: Scenario, iterations: int) -> dict:
+    _clear_caches()
+    sql_timer.reset()
+    script_stats.reset()
+    latencies = []
+    tokens = 0
+    for i in range(iterations):
+        deps = _deps()
+        start = time.perf_counter()
+        await scenario.run(scenario.template(i), deps)
+        latencies.append(time.perf_counter() - start)
+        tokens += deps.usage.input_tokens + deps.usage.output_tokens
+    total = sum(latencies)
+    per_run = 1000 / iterations
+    return {
+        **summarize(latencies),
+        "sql_ms": sql_timer.seconds * per_run,
+        "sql_statements": sql_timer.statements / iterations,
+        "model_ms": script_stats.total_seconds * per_run,
+        "model_turns": sum(script_stats.turns.values()) / iterations,
+        "tokens": tokens / iterations,
+        "framework_ms": (total - sql_timer.seconds - script_stats.total_seconds)
+        * per_run,
+    }
+
+
+async def measure_allocations(scenario: Scenario, iterations: int) -> dict:
+    _clear_caches()
+    tracemalloc.start()
+    peaks, retained = [], []
+    try:
+        for i in range(iterations):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await scenario.run(scenario.template(i), _deps())
+            after, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(after - before)
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_kib": sum(peaks) / len(peaks) / 1024,
+        "retained_kib": sum(retained) / len(retained) / 1024,
+    }
+
+
+async def measure_throughput(
+    scenario: Scenario, iterations: int, concurrency: int
+) -> float:
+    _clear_caches()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with slots:
+            await scenario.run(scenario.template(i), _deps())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(iterations)))
+    return iterations / (time.perf_counter() - start)
+
+
+async def run_benchmarks(iterations: int, concurrency: int) -> dict:
+    results = {}
+    with scripted_agents():
+        # Warm up: build agents, open pooled connections, compile queries.
+        for scenario in SCENARIOS:
+            await scenario.run(scenario.template(0), _deps())
+        for scenario in SCENARIOS:
+            result = await measure_latency(scenario, iterations)
+            result.update(await measure_allocations(scenario, max(iterations // 5, 1)))
+            result["throughput_rps"] = await measure_throughput(
+                scenario, iterations, concurrency
+            )
+            results[scenario.name] = {key: round(v, 3) for key, v in result.items()}
+    return results
+
+
+def print_results(results: dict, baseline: dict, tolerance: float) -> bool:
+    ok = True
+    header = (
+        f"{'scenario':<28} {'p50 ms':>8} {'p95 ms':>8} {'sql ms':>7} {'model ms':>8} "
+        f"{'fw ms':>7} {'tokens':>7} {'peak KiB':>9} {'req/s':>8}  vs baseline"
+    )
+    print(header)
+    for name, r in results.items():
+        before = baseline.get(name)
+        verdict = "(no baseline)"
+        if before:
+            slower = r["p50_ms"] > before["p50_ms"] * (1 + tolerance)
+            fewer = r["throughput_rps"] < before["throughput_rps"] * (1 - tolerance)
+            p50_change = r["p50_ms"] / before["p50_ms"] - 1
+            rps_change = r["throughput_rps"] / before["throughput_rps"] - 1
+            verdict = f"p50 {p50_change:+.1%}, req/s {rps_change:+.1%}"
+            if slower or fewer:
+                verdict += "  REGRESSION"
+                ok = False
+        print(
+            f"{name:<28} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['sql_ms']:7.2f} "
+            f"{r['model_ms']:8.2f} {r['framework_ms']:7.2f} {r.get('tokens', 0):7.0f} "
+            f"{r['peak_kib']:9.1f} "
+            f"{r['throughput_rps']:8.1f}  {verdict}"
+        )
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--update", action="store_true", help="rewrite the baseline")
+    parser.add_argument("--json", action="store_true", help="print raw results")
+    args = parser.parse_args()
+
+    seed_database()
+    sql_timer.install(get_async_engine().sync_engine)
+    results = asyncio.run(run_benchmarks(args.iterations, args.concurrency))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    if args.update or not BASELINE_PATH.exists():
+        BASELINE_PATH.write_text(json.dumps(results, indent=2) + "\n")
+        print_results(results, {}, args.tolerance)
+        print(f"Baseline written to {BASELINE_PATH}")
+        return
+    baseline = json.loads(BASELINE_PATH.read_text())
+    sys.exit(0 if print_results(results, baseline, args.tolerance) else 1)
+
+
+if __name__ == "__main__":
+    main()
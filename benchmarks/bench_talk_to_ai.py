@@ -0,0 +1,86 @@
+"""Client benchmark for ``utils.talk_to_ai`` against a local stub.
+
+Starts :mod:`benchmarks.stub_chat_server` in-process and compares a new
+connection per call (what the old ``requests.post`` did) with the pooled
+client, sync and async. Retries and streaming are tested in
+``tests/test_utils.py``.
+
+Usage::
+
+    python -m benchmarks.bench_talk_to_ai --requests 200 --latency 0.002
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.stub_chat_server import StubChatServer
+
+SERVER = StubChatServer().start()
+os.environ["MISTRAL_API_URL"] = SERVER.url
+
+import httpx  # noqa: E402
+
+import utils  # noqa: E402
+from benchmarks.common import summarize  # noqa: E402
+
+ARGS = ("What is the status?", "stub-model", "You are a stub.", 0)
+
+
+def unpooled_call() -> str:
+    body = utils._request_body(*ARGS)
+    response = httpx.post(SERVER.url, json=body, headers=utils._headers())
+    return response.json()["choices"][0]["message"]["content"]
+
+
+def pooled_call() -> str:
+    return utils.talk_to_ai(*ARGS)
+
+
+def timed(call, num_requests: int) -> tuple[float, list[float]]:
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(num_requests):
+        call_start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - call_start)
+    return time.perf_counter() - start, latencies
+
+
+async def timed_async(num_requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            await utils.talk_to_ai_async(*ARGS)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(num_requests)))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    SERVER.latency = args.latency
+
+    clients = (("new connection", unpooled_call), ("pooled", pooled_call))
+    for name, call in clients:
+        SERVER.clients.clear()
+        elapsed, latencies = timed(call, args.requests)
+        stats = summarize(latencies)
+        print(
+            f"{name:>15}: {args.requests / elapsed:8.1f} req/s  "
+            f"p50 {stats['p50_ms']:.2f} ms  p99 {stats['p99_ms']:.2f} ms  "
+            f"connections {len(SERVER.clients)}"
+        )
+    elapsed = asyncio.run(timed_async(args.requests, args.concurrency))
+    print(f"{'async pooled':>15}: {args.requests / elapsed:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
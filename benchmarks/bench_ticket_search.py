@@ -0,0 +1,170 @@
+"""Latency benchmark for full-text ticket search on a large ticket table.
+
+Seeds ``--tickets`` tickets (1M by default) whose subjects and descriptions
+are drawn from a support vocabulary with a skewed word frequency, so queries
+range from very common to rare words. It then times
+:func:`service_layer.ticket_search.search_tickets` for a set of queries,
+filters and pages. The same queries also run through the unindexed ``LIKE``
+fallback, for comparison on smaller tables.
+
+Usage::
+
+    python -m benchmarks.bench_ticket_search
+    python -m benchmarks.bench_ticket_search --tickets 100000 --like
+    python -m benchmarks.bench_ticket_search --reuse   # keep the seeded tables
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from benchmarks.common import customer_email, seed_database, summarize, ticket_number
+from database import Ticket, TicketStatus, get_engine
+from db_session import session_scope
+from service_layer.ticket_search import search_query, search_terms, search_tickets
+
+VOCABULARY = """
+    payment refund invoice charge card login password account email delivery
+    order shipping address subscription cancel upgrade plan discount coupon error
+    crash slow timeout sync export import report dashboard notification mobile
+    android iphone browser chrome safari upload download attachment pdf billing
+    tax receipt currency conversion euro dispute chargeback fraud locked reset
+    verification two factor sms token api webhook integration calendar invite
+    permission admin role team workspace storage quota backup restore migration
+    duplicate missing wrong late damaged return exchange warranty contract renewal
+""".split()
+
+QUERIES = [
+    ("common word", "payment", {}),
+    ("two common words", "refund payment", {}),
+    ("rare word", "warranty", {}),
+    ("rare pair", "webhook chargeback", {}),
+    ("stemmed", "refunds crashing", {}),
+    ("status filter", "login", {"status": "Open"}),
+    ("customer filter", "invoice", {"customer": customer_email(42)}),
+    ("deep page", "payment", {"page": 50}),
+]
+
+CHUNK_SIZE = 20_000
+
+
+def _filler_words(rng: random.Random, count: int) -> list[str]:
+    syllables = "ka lo mi ne ru sa te vo pa di fu go ha je ki".split()
+    return list(
+        {"".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(count)}
+    )
+
+
+def _text(rng: random.Random, fillers: list[str], topics: int, words: int) -> str:
+    # Zipf-like weights: the first vocabulary words are by far the most common.
+    chosen = rng.choices(VOCABULARY, TOPIC_WEIGHTS, k=topics)
+    chosen += rng.choices(fillers, k=words - topics)
+    rng.shuffle(chosen)
+    return " ".join(chosen)
+
+
+TOPIC_WEIGHTS = [1 / rank for rank in range(1, len(VOCABULARY) + 1)]
+
+
+def seed_tickets(num_tickets: int, num_customers: int, seed: int = 42) -> float:
+    """Insert ``num_tickets`` tickets with searchable text; returns seconds taken.
+
+    Every ticket mentions one topic word in its subject and two in its
+    description, among filler words. "payment" ends up in about a third of
+    the tickets, the rarest topic words in well under one percent.
+    """
+    rng = random.Random(seed)
+    fillers = _filler_words(rng, 20_000)
+    subjects = [_text(rng, fillers, 1, 5) for _ in range(5000)]
+    descriptions = [_text(rng, fillers, 2, 30) for _ in range(50_000)]
+    statuses = list(TicketStatus)
+    now = datetime(2025, 12, 1)
+    seed_database(num_customers=num_customers, num_tickets=0, num_invoices=0)
+    start = time.perf_counter()
+    with get_engine().begin() as conn:
+        for offset in range(0, num_tickets, CHUNK_SIZE):
+            conn.execute(
+                insert(Ticket),
+                [
+                    {
+                        "ticket_number": ticket_number(i),
+                        "subject": rng.choice(subjects),
+                        "description": rng.choice(descriptions),
+                        "status": rng.choice(statuses),
+                        "created_at": now - timedelta(minutes=i),
+                        "updated_at": now - timedelta(minutes=i),
+                        "customer_id": rng.randint(1, num_customers),
+                    }
+                    for i in range(offset, min(offset + CHUNK_SIZE, num_tickets))
+                ],
+            )
+    return time.perf_counter() - start
+
+
+def ticket_count() -> int:
+    with session_scope() as session:
+        return session.scalar(select(func.count(Ticket.id)))
+
+
+def time_search(text: str, options: dict, iterations: int) -> tuple[dict, int]:
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        page = search_tickets(text, **options)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies), len(page.hits)
+
+
+def time_like(text: str, options: dict, iterations: int) -> dict:
+    """Same query through the LIKE fallback that backends without FTS use."""
+    query = search_query("fallback", search_terms(text), **_fallback_options(options))
+    latencies = []
+    with session_scope() as session:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            session.execute(query).all()
+            latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+def _fallback_options(options: dict) -> dict:
+    options = dict(options)
+    if "status" in options:
+        options["status"] = TicketStatus(options["status"])
+    return options
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickets", type=int, default=1_000_000)
+    parser.add_argument("--customers", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--reuse", action="store_true", help="skip seeding if sized")
+    parser.add_argument("--like", action="store_true", help="also time LIKE scans")
+    args = parser.parse_args()
+
+    if args.reuse and ticket_count() == args.tickets:
+        print(f"reusing {args.tickets:,} seeded tickets")
+    else:
+        elapsed = seed_tickets(args.tickets, args.customers)
+        print(
+            f"seeded {args.tickets:,} tickets in {elapsed:.1f}s "
+            f"({args.tickets / elapsed:,.0f} rows/s, including the FTS triggers)"
+        )
+
+    header = f"{'query':<18} {'hits':>5} {'p50 ms':>8} {'p95 ms':>8}"
+    print(header + (f" {'LIKE p50 ms':>12}" if args.like else ""))
+    for name, text, options in QUERIES:
+        stats, hits = time_search(text, options, args.iterations)
+        line = f"{name:<18} {hits:>5} {stats['p50_ms']:8.2f} {stats['p95_ms']:8.2f}"
+        if args.like:
+            like = time_like(text, options, max(1, args.iterations // 10))
+            line += f" {like['p50_ms']:12.2f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Memory and latency benchmark of the similar-ticket vector index.
+
+Seeds ``--tickets`` tickets with the corpus of :mod:`benchmarks.bench_ticket_search`
+(100k by default; use ``--tickets 1000000`` for the large case) and builds
+:data:`service_layer.ticket_similarity.ticket_index`. It reports:
+
+* build time, the bytes held by the index and the peak process memory;
+* recall@5 of paraphrased tickets (a share of their words dropped and new ones
+  added), for the dense vectors alone and after the exact rescoring;
+* latency of dense top-k queries in batches, and of the whole lookup;
+* the time to index updated tickets, to compact, to save and to memory-map
+  the index back.
+
+Usage::
+
+    python -m benchmarks.bench_ticket_similarity
+    python -m benchmarks.bench_ticket_similarity --tickets 1000000 --reuse
+"""
+
+import argparse
+import os
+import random
+import resource
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import select, update
+
+from benchmarks.bench_ticket_search import seed_tickets, ticket_count
+from benchmarks.common import summarize
+from database import Ticket, get_engine
+from db_session import session_scope
+from service_layer import ticket_similarity
+from service_layer.ticket_similarity import (
+    TicketVectorIndex,
+    find_similar_tickets_many,
+    refresh_ticket_index,
+    ticket_index,
+)
+
+
+def paraphrase(subject: str, description: str, rng: random.Random) -> str:
+    """Keep the subject and 60% of the description, add a few other words."""
+    words = description.split()
+    kept = [word for word in words if rng.random() < 0.6]
+    extra = ["customer", "again", "please", "help", "urgent"]
+    return " ".join(subject.split() + kept + rng.sample(extra, 3))
+
+
+def sample_tickets(count: int, seed: int = 7) -> list:
+    with session_scope() as session:
+        total = session.scalar(select(Ticket.id).order_by(Ticket.id.desc()).limit(1))
+        ids = random.Random(seed).sample(range(1, total + 1), count)
+        statement = select(
+            Ticket.id, Ticket.ticket_number, Ticket.subject, Ticket.description
+        ).where(Ticket.id.in_(ids))
+        return session.execute(statement).all()
+
+
+def build_index(dimensions: int) -> TicketVectorIndex:
+    index = TicketVectorIndex(dimensions)
+    start = time.perf_counter()
+    with session_scope() as session:
+        index.build(
+            lambda: ticket_similarity._chunks(
+                session, ticket_similarity._all_tickets_query()
+            )
+        )
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+    print(
+        f"built {len(index):,} vectors of {dimensions} dimensions in {elapsed:.1f}s "
+        f"({len(index) / elapsed:,.0f} tickets/s); index {index.nbytes / 2**20:.0f} "
+        f"MiB, process peak RSS {peak:.0f} MiB"
+    )
+    return index
+
+
+def recall(samples: list, rng: random.Random) -> None:
+    queries = [paraphrase(row.subject, row.description, rng) for row in samples]
+    vectors = ticket_index.vectorize([("", query) for query in queries])
+    dense = ticket_index.search(vectors, 5, min_score=0.0)
+    dense_hits = sum(
+        row.id in {ticket_id for ticket_id, _ in hits}
+        for row, hits in zip(samples, dense)
+    )
+    rescored = find_similar_tickets_many(queries)
+    rescored_hits = sum(
+        row.ticket_number in {match.ticket_number for match in matches}
+        for row, matches in zip(samples, rescored)
+    )
+    print(
+        f"paraphrase recall@5: dense {dense_hits / len(samples):.0%}, "
+        f"rescored {rescored_hits / len(samples):.0%}"
+    )
+
+
+def query_latency(samples: list, iterations: int) -> None:
+    documents = [(row.subject, row.description) for row in samples]
+    print(f"{'query':<26} {'p50 ms':>8} {'p95 ms':>8} {'per query':>10}")
+    for batch in (1, 16, 64):
+        latencies = []
+        for i in range(iterations):
+            chosen = [documents[(i * batch + j) % len(documents)] for j in range(batch)]
+            start = time.perf_counter()
+            ticket_index.search(ticket_index.vectorize(chosen), 5)
+            latencies.append(time.perf_counter() - start)
+        stats = summarize(latencies)
+        print(
+            f"{f'dense top-5, batch {batch}':<26} {stats['p50_ms']:8.2f} "
+            f"{stats['p95_ms']:8.2f} {stats['p50_ms'] / batch:10.2f}"
+        )
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        find_similar_tickets_many([samples[i % len(samples)].ticket_number])
+        latencies.append(time.perf_counter() - start)
+    stats = summarize(latencies)
+    print(
+        f"{'lookup by ticket number':<26} {stats['p50_ms']:8.2f} "
+        f"{stats['p95_ms']:8.2f} {stats['p50_ms']:10.2f}"
+    )
+
+
+def incremental(samples: list, directory: Path) -> None:
+    ids = [row.id for row in samples]
+    with get_engine().begin() as connection:
+        connection.execute(
+            update(Ticket)
+            .where(Ticket.id.in_(ids))
+            .values(
+                description=Ticket.description + " reopened",
+                updated_at=datetime.utcnow(),
+            )
+        )
+    start = time.perf_counter()
+    refresh_ticket_index(force=True)
+    print(
+        f"refresh after {len(ids):,} updates: "
+        f"{(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+    start = time.perf_counter()
+    ticket_index.compact()
+    print(f"compact: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    ticket_index.save(directory)
+    size = sum(path.stat().st_size for path in directory.iterdir())
+    print(
+        f"save: {time.perf_counter() - start:.2f}s, {size / 2**20:.0f} MiB on disk"
+    )
+    loaded = TicketVectorIndex(ticket_index.dimensions)
+    start = time.perf_counter()
+    loaded.load(directory)
+    print(f"memory-mapped load: {(time.perf_counter() - start) * 1000:.1f} ms")
+    query = loaded.vectorize([(samples[0].subject, samples[0].description)])
+    start = time.perf_counter()
+    loaded.search(query, 5)
+    print(f"first query after load: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickets", type=int, default=100_000)
+    parser.add_argument("--customers", type=int, default=10_000)
+    parser.add_argument("--dimensions", type=int, default=ticket_index.dimensions)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--index-dir", default="/tmp/slm_ticket_index")
+    parser.add_argument("--reuse", action="store_true", help="skip seeding if sized")
+    args = parser.parse_args()
+
+    if args.reuse and ticket_count() == args.tickets:
+        print(f"reusing {args.tickets:,} seeded tickets")
+    else:
+        elapsed = seed_tickets(args.tickets, args.customers)
+        print(f"seeded {args.tickets:,} tickets in {elapsed:.1f}s")
+
+    ticket_index._replace(build_index(args.dimensions))
+    ticket_index.refreshed_at = time.monotonic()
+    samples = sample_tickets(max(args.queries, args.updates))
+    rng = random.Random(11)
+    recall(samples[: args.queries], rng)
+    query_latency(samples[: args.queries], args.iterations)
+    os.makedirs(args.index_dir, exist_ok=True)
+    incremental(samples[: args.updates], Path(args.index_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Query-plan regression check for the service-layer queries.
+
+Runs the EXPLAIN plan tests in ``tests/test_query_plans.py`` at a given
+scale, printing every plan with ``--show``. Exits non-zero if a query scans
+a whole table instead of using an index.
+
+Usage::
+
+    python -m benchmarks.check_query_plans --scale 100
+    python -m benchmarks.check_query_plans --show
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+TESTS = Path(__file__).resolve().parent.parent / "tests" / "test_query_plans.py"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=100)
+    parser.add_argument("--show", action="store_true", help="print every plan")
+    args = parser.parse_args()
+    os.environ["QUERY_PLAN_SCALE"] = str(args.scale)
+    # -rA reports the plans the tests print, passed or not.
+    options = ["-q", "-rA"] if args.show else ["-q"]
+    sys.exit(pytest.main([str(TESTS), *options]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Helpers shared by the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite database so they never touch the
+database configured in ``.env``. Import this module before anything that
+builds the engine, because it is created from ``DATABASE_URL``.
+"""
+
+import os
+import random
+import statistics
+import tempfile
+from datetime import datetime, timedelta
+
+BENCH_DB_PATH = os.path.join(tempfile.gettempdir(), "slm_benchmark.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{BENCH_DB_PATH}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+from sqlalchemy import insert  # noqa: E402
+
+from database import (  # noqa: E402
+    Base,
+    Customer,
+    CustomerDetail,
+    FxRate,
+    Invoice,
+    Ticket,
+    TicketStatus,
+    get_engine,
+)
+from seed_data import synthetic_fx_rates  # noqa: E402
+
+
+def seed_database(
+    num_customers: int = 200,
+    num_tickets: int = 1000,
+    num_invoices: int = 500,
+    seed: int = 42,
+    create_schema: bool = True,
+) -> None:
+    """Recreate the benchmark schema and fill it with deterministic rows.
+
+    Ticket numbers are TKT-1000.., invoice numbers INV-00000-BM.. and emails
+    customer<N>@example.org, so benchmarks can address rows without querying.
+    """
+    rng = random.Random(seed)
+    now = datetime(2025, 12, 1)
+    engine = get_engine()
+    if create_schema:
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        _insert(
+            conn,
+            Customer,
+            [
+                {"id": i, "name": f"Customer {i}", "email": customer_email(i)}
+                for i in range(1, num_customers + 1)
+            ],
+        )
+        _insert(
+            conn,
+            CustomerDetail,
+            [
+                {
+                    "address": f"{i} Benchmark Street",
+                    "phone_number": f"+1-555-{i:07d}",
+                    "country": "Germany",
+                    "city": "Berlin",
+                    "is_vip": i % 2,
+                    "customer_id": i,
+                }
+                for i in range(1, num_customers + 1)
+            ],
+        )
+        _insert(
+            conn,
+            Ticket,
+            [
+                {
+                    "ticket_number": ticket_number(i),
+                    "subject": f"Benchmark ticket {i}",
+                    "description": "Generated for benchmarking.",
+                    "status": rng.choice(list(TicketStatus)),
+                    "created_at": now - timedelta(hours=i),
+                    "updated_at": now - timedelta(hours=i),
+                    "customer_id": rng.randint(1, num_customers),
+                }
+                for i in range(num_tickets)
+            ],
+        )
+        _insert(
+            conn,
+            Invoice,
+            [
+                {
+                    "invoice_number": invoice_number(i),
+                    "amount": rng.randint(500, 10000),
+                    "issued_date": now - timedelta(days=i % 365),
+                    "due_date": now - timedelta(days=i % 365) + timedelta(days=30),
+                    "customer_id": rng.randint(1, num_customers),
+                }
+                for i in range(num_invoices)
+            ],
+        )
+        _insert(
+            conn,
+            FxRate,
+            synthetic_fx_rates((now - timedelta(days=370)).date(), 371, seed),
+        )
+
+
+def _insert(conn, model, rows: list[dict]) -> None:
+    # An executemany with no rows would insert a single row of defaults.
+    if rows:
+        conn.execute(insert(model), rows)
+
+
+def customer_email(i: int) -> str:
+    return f"customer{i}@example.org"
+
+
+def ticket_number(i: int) -> str:
+    return f"TKT-{1000 + i}"
+
+
+def invoice_number(i: int) -> str:
+    return f"INV-{i:05d}-BM"
+
+
+def summarize(latencies: list[float]) -> dict[str, float]:
+    """p50/p95/p99 and mean of a list of latencies in seconds, reported in ms."""
+    ordered = sorted(latencies)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+    return {
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+    }
@@ -0,0 +1,221 @@
+"""Scripted stand-ins for the Mistral model, for offline benchmarks.
+
+Each agent gets a ``FunctionModel`` that plays the part of the LLM: it reads
+the identifiers out of the prompt and emits the tool calls a well-behaved
+model would make (planner: one ``delegate_*`` call per identifier, or an
+answer straight from the worker results of a fan-out; invoice worker:
+``get_invoice_details`` then ``convert_invoices`` when EUR is asked for;
+ticket and customer workers: one lookup each), then answers through the
+output tool. Everything else — prompt building, tool dispatch,
+the service layer, the database and pydantic validation — is the real code,
+so a benchmark run measures our own overhead.
+"""
+
+import os
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agent_registry import PLANNER, get_agent
+from planner_agent.agent import AgentNames
+from planner_agent.fan_out import WORKER_RESULTS_HEADER
+from planner_agent.identifiers import extract_identifiers
+
+# Building the agents builds the real model first; it is never called.
+os.environ.setdefault("MISTRAL_API_KEY", "offline-benchmark")
+
+Script = Callable[[list[ModelMessage], AgentInfo], ModelResponse]
+
+
+@dataclass
+class ScriptStats:
+    """Model turns and time spent inside the scripts, per agent."""
+
+    turns: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    seconds: dict[str, float] = field(default_factory=lambda: defaultdict(float))
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(self.seconds.values())
+
+    def reset(self) -> None:
+        self.turns.clear()
+        self.seconds.clear()
+
+
+script_stats = ScriptStats()
+
+
+def _prompt(messages: list[ModelMessage]) -> str:
+    for part in messages[0].parts:
+        if isinstance(part, UserPromptPart):
+            return part.content
+    return ""
+
+
+def _tool_returns(messages: list[ModelMessage]) -> list[ToolReturnPart]:
+    last = messages[-1]
+    if not isinstance(last, ModelRequest):
+        return []
+    return [part for part in last.parts if isinstance(part, ToolReturnPart)]
+
+
+def _answer(info: AgentInfo, **output) -> ModelResponse:
+    return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, output)])
+
+
+def _worker_answer(info: AgentInfo, messages: list[ModelMessage]) -> ModelResponse:
+    details = [part.model_response_str() for part in _tool_returns(messages)]
+    found = bool(details) and not any(d.startswith("No database") for d in details)
+    return _answer(info, found=found, details="\n".join(details) or None)
+
+
+def planner_script(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+    returns = _tool_returns(messages)
+    prompt = _prompt(messages)
+    if WORKER_RESULTS_HEADER in prompt:
+        return _answer(
+            info,
+            decision="Answered from the results the workers gathered up front.",
+            target_agent=AgentNames.NONE,
+            final_summary=prompt.split(WORKER_RESULTS_HEADER, 1)[1].strip(),
+        )
+    if len(messages) == 1:
+        ids = extract_identifiers(prompt)
+        calls = [
+            *(
+                ToolCallPart(
+                    "delegate_to_invoice_search_worker", {"invoice_number": number}
+                )
+                for number in ids.invoice_numbers
+            ),
+            *(
+                ToolCallPart(
+                    "delegate_to_ticket_search_worker", {"ticket_number": number}
+                )
+                for number in ids.ticket_numbers
+            ),
+            *(
+                ToolCallPart(
+                    "delegate_to_customer_detail_worker",
+                    {"customer_id": None, "email_address": email},
+                )
+                for email in ids.email_addresses
+            ),
+        ]
+        if calls:
+            return ModelResponse(parts=calls)
+    tools_called = [part.tool_name for part in returns]
+    targets = {
+        "delegate_to_invoice_search_worker": AgentNames.INVOICE_AGENT,
+        "delegate_to_ticket_search_worker": AgentNames.TICKET_AGENT,
+        "delegate_to_customer_detail_worker": AgentNames.CUSTOMER_DETAIL_AGENT,
+    }
+    target_agents = {targets[name] for name in tools_called}
+    return _answer(
+        info,
+        decision="Delegated each identifier to the worker that owns it.",
+        target_agent=(
+            target_agents.pop() if len(target_agents) == 1 else AgentNames.NONE
+        ),
+        tools_called=tools_called,
+        final_summary="\n".join(part.model_response_str() for part in returns)
+        or "There was nothing to look up.",
+    )
+
+
+def invoice_script(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+    prompt = _prompt(messages)
+    returns = _tool_returns(messages)
+    if len(messages) == 1:
+        ids = extract_identifiers(prompt)
+        if ids.invoice_numbers:
+            return ModelResponse(
+                parts=[
+                    ToolCallPart(
+                        "get_invoice_details",
+                        {"invoice_number": ids.invoice_numbers[0]},
+                    )
+                ]
+            )
+    if "EUR" in prompt and returns and returns[0].tool_name == "get_invoice_details":
+        text = returns[0].model_response_str()
+        if not text.startswith("No database"):
+            invoice_number = extract_identifiers(text).invoice_numbers[0]
+            arguments = {"invoice_numbers": [invoice_number], "currency": "EUR"}
+            return ModelResponse(parts=[ToolCallPart("convert_invoices", arguments)])
+    return _worker_answer(info, messages)
+
+
+def ticket_script(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+    if len(messages) == 1:
+        ids = extract_identifiers(_prompt(messages))
+        if ids.ticket_numbers:
+            return ModelResponse(
+                parts=[
+                    ToolCallPart(
+                        "get_ticket_details", {"ticket_number": ids.ticket_numbers[0]}
+                    )
+                ]
+            )
+    return _worker_answer(info, messages)
+
+
+def customer_script(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+    if len(messages) == 1:
+        ids = extract_identifiers(_prompt(messages))
+        if ids.email_addresses:
+            return ModelResponse(
+                parts=[
+                    ToolCallPart(
+                        "get_customer_details",
+                        {"customer_id": None, "email_address": ids.email_addresses[0]},
+                    )
+                ]
+            )
+    return _worker_answer(info, messages)
+
+
+SCRIPTS: dict[str, Script] = {
+    PLANNER: planner_script,
+    AgentNames.INVOICE_AGENT: invoice_script,
+    AgentNames.TICKET_AGENT: ticket_script,
+    AgentNames.CUSTOMER_DETAIL_AGENT: customer_script,
+}
+
+
+def _timed(name: str, script: Script) -> Script:
+    def run(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        start = time.perf_counter()
+        try:
+            return script(messages, info)
+        finally:
+            script_stats.turns[name] += 1
+            script_stats.seconds[name] += time.perf_counter() - start
+
+    return run
+
+
+def scripted_model(name: str) -> FunctionModel:
+    return FunctionModel(_timed(name, SCRIPTS[name]), model_name=f"scripted-{name}")
+
+
+@contextmanager
+def scripted_agents() -> Iterator[None]:
+    """Swap every registered agent's model for its script inside this block."""
+    with ExitStack() as stack:
+        for name in SCRIPTS:
+            stack.enter_context(get_agent(name).override(model=scripted_model(name)))
+        yield
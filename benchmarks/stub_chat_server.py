@@ -0,0 +1,142 @@
+"""Local stand-in for the chat completions endpoint.
+
+Answers ``POST /v1/chat/completions`` like the Mistral API, either as one JSON
+body or, with ``"stream": true``, as server-sent events. It can also throttle
+the first requests with 429 + ``Retry-After`` to exercise client retries, and
+drop the connection in the middle of the first streamed answers.
+
+Usage::
+
+    python -m benchmarks.stub_chat_server --port 8765 --throttle 2
+    MISTRAL_API_URL=http://127.0.0.1:8765/v1/chat/completions python app.py
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = "The stub server says hello from a local chat completions endpoint."
+DROP_AFTER_TOKENS = 2
+
+
+class StubChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "StubChatServer"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.record_request(self.client_address)
+        if self.server.take_throttle():
+            self._send(429, {"message": "rate limited"}, {"Retry-After": "0.05"})
+            return
+        time.sleep(self.server.latency)
+        if body.get("stream"):
+            self._stream(body)
+        else:
+            self._send(
+                200,
+                {
+                    "model": body["model"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": ANSWER},
+                        }
+                    ],
+                },
+            )
+
+    def _send(self, status: int, payload: dict, headers: dict | None = None) -> None:
+        encoded = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def _stream(self, body: dict) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        drop = self.server.take_drop()
+        for i, token in enumerate(ANSWER.split(" ")):
+            if drop and i == DROP_AFTER_TOKENS:
+                # Hang up without the terminating chunk, as a lost peer would.
+                self.close_connection = True
+                return
+            chunk = {"choices": [{"index": 0, "delta": {"content": token + " "}}]}
+            self._chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class StubChatServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self, port: int = 0, latency: float = 0.0, throttle: int = 0, drop: int = 0
+    ):
+        super().__init__(("127.0.0.1", port), StubChatHandler)
+        self.latency = latency
+        self.throttle = throttle
+        self.drop = drop
+        self.requests = 0
+        self.clients: set[tuple[str, int]] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def record_request(self, client_address) -> None:
+        with self._lock:
+            self.requests += 1
+            self.clients.add(client_address)
+
+    def take_throttle(self) -> bool:
+        with self._lock:
+            if self.throttle > 0:
+                self.throttle -= 1
+                return True
+            return False
+
+    def take_drop(self) -> bool:
+        with self._lock:
+            if self.drop > 0:
+                self.drop -= 1
+                return True
+            return False
+
+    def start(self) -> "StubChatServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--throttle", type=int, default=0)
+    parser.add_argument("--drop", type=int, default=0)
+    args = parser.parse_args()
+    server = StubChatServer(args.port, args.latency, args.throttle, args.drop)
+    print(f"Serving {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""Seed the database at load-testing scale, in chunks and in parallel.
+
+Unlike ``seed_data.py``, no ORM object is built and nothing is held beyond
+one chunk. Every table is split into chunks of ``--chunk-size`` rows and each
+chunk is generated from its own random generator, seeded with ``--seed``, the
+table and the chunk number. For a given seed and chunk size the data is
+therefore the same whatever the number of workers or the order the chunks run
+in. Chunks are inserted with
+Core ``executemany`` or, on PostgreSQL through psycopg, with ``COPY``.
+
+Keys come from the row number rather than from Faker's ``unique`` set, so
+they are unique at any scale without remembering past values:
+
+* customer ``i``: id ``i``, email ``<first>.<last><i>@<domain>``;
+* ticket ``i``: id ``i``, number ``TKT-<1000 + i>``;
+* invoice ``i``: id ``i``, number ``INV-<i, 5+ digits>-<2 letters>``.
+
+Names, addresses and texts are drawn from pools generated once per process by
+a seeded Faker. Scale 1 is the size of ``seed_data.py``: 200 customers, 1,000
+tickets and 500 invoices, plus the synthetic exchange rates of ``seed_data.py``
+over the invoice dates. Customers and their details are loaded before the
+tickets and invoices that reference them. The full-text search triggers are
+dropped while tickets load, and the search index is rebuilt once at the end.
+
+The tables must be empty; ``--reset`` drops and recreates the schema first.
+On SQLite the workers overlap generating chunks with the single writer.
+
+Usage::
+
+    python bulk_seed.py --scale 1000 --workers 4
+    python bulk_seed.py --scale 10 --tickets 5000000 --reset
+"""
+
+import argparse
+import enum
+import random
+import re
+import string
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import cache
+from multiprocessing import get_context
+
+from faker import Faker
+from sqlalchemy import event, func, insert, inspect, select, text
+
+from database import (
+    TICKET_SEARCH_DDL,
+    Base,
+    Customer,
+    CustomerDetail,
+    FxRate,
+    Invoice,
+    Ticket,
+    TicketStatus,
+    get_engine,
+)
+from seed_data import synthetic_fx_rates
+
+ROWS_PER_SCALE = {"customers": 200, "tickets": 1000, "invoices": 500}
+# Every customer comes with one customer detail row.
+ROWS_PER_ITEM = {"customers": 2, "tickets": 1, "invoices": 1}
+CHUNK_SIZE = 10_000
+POOL_SIZE = 2000
+START_DATE = datetime(2024, 1, 1)
+DAYS = 730
+PROGRESS_SECONDS = 2.0
+NON_EMAIL_RE = re.compile(r"[^a-z0-9.]")
+
+# Drop the search index triggers before loading tickets, then index them all at
+# once and restore the triggers. Used if the search index exists.
+SEARCH_INDEX_DEFERRAL = {
+    "sqlite": (
+        ["DROP TRIGGER IF EXISTS tickets_fts_insert"],
+        [
+            "INSERT INTO tickets_fts (tickets_fts) VALUES ('rebuild')",
+            TICKET_SEARCH_DDL["sqlite"][1],
+        ],
+    ),
+    "postgresql": (
+        ["ALTER TABLE tickets DISABLE TRIGGER tickets_search_vector_update"],
+        [
+            "ALTER TABLE tickets ENABLE TRIGGER tickets_search_vector_update",
+            # Fires the trigger once per ticket loaded without it.
+            "UPDATE tickets SET subject = subject WHERE search_vector IS NULL",
+        ],
+    ),
+}
+
+
+@dataclass(frozen=True)
+class SeedPlan:
+    customers: int
+    tickets: int
+    invoices: int
+    seed: int = 42
+    chunk_size: int = CHUNK_SIZE
+
+    @classmethod
+    def at_scale(cls, scale: float, **overrides) -> "SeedPlan":
+        counts = {
+            table: int(rows * scale) for table, rows in ROWS_PER_SCALE.items()
+        }
+        counts.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**counts)
+
+    def chunks(self, table: str) -> range:
+        return range(0, getattr(self, table), self.chunk_size)
+
+
+@dataclass
+class Pools:
+    first_names: list[str]
+    last_names: list[str]
+    domains: list[str]
+    streets: list[str]
+    places: list[tuple[str, str]]
+    subjects: list[str]
+    descriptions: list[str]
+
+
+@cache
+def pools(seed: int) -> Pools:
+    """Faker values to draw from; the same in every process for a seed."""
+    fake = Faker()
+    fake.seed_instance(seed)
+    return Pools(
+        first_names=[fake.first_name() for _ in range(POOL_SIZE)],
+        last_names=[fake.last_name() for _ in range(POOL_SIZE)],
+        domains=[fake.free_email_domain() for _ in range(20)],
+        streets=[fake.street_address() for _ in range(POOL_SIZE)],
+        places=[(fake.country(), fake.city()) for _ in range(POOL_SIZE)],
+        subjects=[fake.sentence(nb_words=4) for _ in range(POOL_SIZE)],
+        descriptions=[fake.paragraph(nb_sentences=2) for _ in range(POOL_SIZE)],
+    )
+
+
+def _customer_rows(plan: SeedPlan, start: int, stop: int, rng: random.Random):
+    p = pools(plan.seed)
+    customers, details = [], []
+    for i in range(start + 1, stop + 1):
+        first, last = rng.choice(p.first_names), rng.choice(p.last_names)
+        local_part = NON_EMAIL_RE.sub("", f"{first}.{last}".lower())
+        country, city = rng.choice(p.places)
+        customers.append(
+            {
+                "id": i,
+                "name": f"{first} {last}",
+                "email": f"{local_part}{i}@{rng.choice(p.domains)}",
+            }
+        )
+        details.append(
+            {
+                "id": i,
+                "address": rng.choice(p.streets),
+                "phone_number": f"+1-{rng.randint(200, 999)}-"
+                f"{rng.randint(200, 999)}-{rng.randint(0, 9999):04d}",
+                "country": country,
+                "city": city,
+                "is_vip": int(rng.random() < 0.1),
+                "customer_id": i,
+            }
+        )
+    return [(Customer, customers), (CustomerDetail, details)]
+
+
+def _ticket_rows(plan: SeedPlan, start: int, stop: int, rng: random.Random):
+    p = pools(plan.seed)
+    statuses = list(TicketStatus)
+    rows = []
+    for i in range(start + 1, stop + 1):
+        created_at = START_DATE + timedelta(minutes=rng.randrange(DAYS * 24 * 60))
+        rows.append(
+            {
+                "id": i,
+                "ticket_number": f"TKT-{1000 + i}",
+                "subject": rng.choice(p.subjects),
+                "description": rng.choice(p.descriptions),
+                "status": rng.choice(statuses),
+                "created_at": created_at,
+                "updated_at": created_at + timedelta(hours=rng.randrange(72)),
+                "customer_id": rng.randint(1, plan.customers),
+            }
+        )
+    return [(Ticket, rows)]
+
+
+def _invoice_rows(plan: SeedPlan, start: int, stop: int, rng: random.Random):
+    rows = []
+    for i in range(start + 1, stop + 1):
+        issued_date = START_DATE + timedelta(days=rng.randrange(DAYS))
+        suffix = "".join(rng.choices(string.ascii_uppercase, k=2))
+        rows.append(
+            {
+                "id": i,
+                "invoice_number": f"INV-{i:05d}-{suffix}",
+                "amount": rng.randint(500, 10000),
+                "issued_date": issued_date,
+                "due_date": issued_date + timedelta(days=rng.randint(14, 30)),
+                "customer_id": rng.randint(1, plan.customers),
+            }
+        )
+    return [(Invoice, rows)]
+
+
+ROW_GENERATORS = {
+    "customers": _customer_rows,
+    "tickets": _ticket_rows,
+    "invoices": _invoice_rows,
+}
+
+
+def _copy(connection, model, rows: list[dict]) -> None:
+    """Load rows with PostgreSQL ``COPY`` through the psycopg connection."""
+    columns = list(rows[0])
+    statement = f"COPY {model.__tablename__} ({', '.join(columns)}) FROM STDIN"
+    cursor = connection.connection.driver_connection.cursor()
+    with cursor.copy(statement) as copy:
+        for row in rows:
+            # Enum columns store the member name, as SQLAlchemy writes them.
+            copy.write_row(
+                [
+                    value.name if isinstance(value, enum.Enum) else value
+                    for value in row.values()
+                ]
+            )
+
+
+def seed_chunk(plan: SeedPlan, table: str, start: int) -> int:
+    """Generate and insert one chunk of ``table``; returns the rows inserted."""
+    rng = random.Random(f"{plan.seed}:{table}:{start}")
+    stop = min(start + plan.chunk_size, getattr(plan, table))
+    batches = ROW_GENERATORS[table](plan, start, stop, rng)
+    engine = get_engine()
+    use_copy = engine.dialect.driver == "psycopg"
+    with engine.begin() as connection:
+        for model, rows in batches:
+            if use_copy:
+                _copy(connection, model, rows)
+            else:
+                connection.execute(insert(model), rows)
+    return sum(len(rows) for _, rows in batches)
+
+
+def _init_worker() -> None:
+    engine = get_engine()
+    if engine.dialect.name == "sqlite":
+        # Writers take turns; wait for the lock instead of failing after 5s.
+        @event.listens_for(engine, "connect")
+        def _busy_timeout(dbapi_connection, connection_record) -> None:
+            dbapi_connection.execute("PRAGMA busy_timeout = 600000")
+
+
+class Progress:
+    """Prints rows done and rows/s of a phase at most every few seconds."""
+
+    def __init__(self, name: str, total: int) -> None:
+        self.name, self.total, self.done = name, total, 0
+        self.start = self.printed = time.perf_counter()
+
+    def add(self, rows: int) -> None:
+        self.done += rows
+        now = time.perf_counter()
+        if now - self.printed >= PROGRESS_SECONDS or self.done == self.total:
+            self.printed = now
+            rate = self.done / max(now - self.start, 1e-9)
+            print(
+                f"{self.name}: {self.done:,}/{self.total:,} rows ({rate:,.0f} rows/s)",
+                flush=True,
+            )
+
+
+def _run_phase(plan: SeedPlan, tables: list[str], executor) -> int:
+    tasks = [(table, start) for table in tables for start in plan.chunks(table)]
+    rows = sum(getattr(plan, table) * ROWS_PER_ITEM[table] for table in tables)
+    progress = Progress(" + ".join(tables), rows)
+    if executor is None:
+        for table, start in tasks:
+            progress.add(seed_chunk(plan, table, start))
+    else:
+        futures = [
+            executor.submit(seed_chunk, plan, table, start) for table, start in tasks
+        ]
+        for future in as_completed(futures):
+            progress.add(future.result())
+    return rows
+
+
+def _check_empty() -> None:
+    with get_engine().connect() as connection:
+        for model in (Customer, CustomerDetail, Ticket, Invoice, FxRate):
+            if connection.scalar(select(func.count()).select_from(model)):
+                sys.exit(
+                    f"{model.__tablename__} is not empty; "
+                    "run with --reset to drop and recreate the schema"
+                )
+
+
+def _execute(statements: list[str]) -> None:
+    with get_engine().begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+
+
+def _search_index_deferral(engine) -> tuple[list[str], list[str]]:
+    inspector = inspect(engine)
+    if engine.dialect.name == "sqlite" and inspector.has_table("tickets_fts"):
+        return SEARCH_INDEX_DEFERRAL["sqlite"]
+    columns = {column["name"] for column in inspector.get_columns("tickets")}
+    if engine.dialect.name == "postgresql" and "search_vector" in columns:
+        return SEARCH_INDEX_DEFERRAL["postgresql"]
+    return [], []
+
+
+def _reset_sequences(engine) -> None:
+    """Move PostgreSQL id sequences past the ids inserted explicitly."""
+    if engine.dialect.name != "postgresql":
+        return
+    _execute(
+        [
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"coalesce(max(id), 1)) FROM {table}"
+            for table in (
+                "customers",
+                "customer_details",
+                "tickets",
+                "invoices",
+                "fx_rates",
+            )
+        ]
+    )
+
+
+def seed(plan: SeedPlan, workers: int = 1, reset: bool = False) -> None:
+    """Load ``plan`` into the database configured by ``DATABASE_URL``.
+
+    :param plan: rows per table, seed and chunk size
+    :type plan: SeedPlan
+    :param workers: processes generating and inserting chunks; 1 runs inline
+    :type workers: int
+    :param reset: drop and recreate the schema first
+    :type reset: bool
+    """
+    engine = get_engine()
+    if reset:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    _check_empty()
+    _init_worker()
+    defer_before, defer_after = _search_index_deferral(engine)
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(
+            workers, mp_context=get_context("spawn"), initializer=_init_worker
+        )
+    start = time.perf_counter()
+    try:
+        rows = _run_phase(plan, ["customers"], executor)
+        rates = synthetic_fx_rates(START_DATE.date(), DAYS, plan.seed)
+        with engine.begin() as connection:
+            connection.execute(insert(FxRate), rates)
+        rows += len(rates)
+        _execute(defer_before)
+        try:
+            rows += _run_phase(plan, ["tickets", "invoices"], executor)
+        finally:
+            index_start = time.perf_counter()
+            _execute(defer_after)
+        print(f"search index: {time.perf_counter() - index_start:.1f}s")
+        _reset_sequences(engine)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    elapsed = time.perf_counter() - start
+    print(f"seeded {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scale", type=float, default=1, help="multiple of seed_data.py's row counts"
+    )
+    parser.add_argument("--customers", type=int, help="override the scaled count")
+    parser.add_argument("--tickets", type=int, help="override the scaled count")
+    parser.add_argument("--invoices", type=int, help="override the scaled count")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--reset", action="store_true", help="recreate the schema")
+    args = parser.parse_args()
+
+    plan = SeedPlan.at_scale(
+        args.scale,
+        customers=args.customers,
+        tickets=args.tickets,
+        invoices=args.invoices,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+    )
+    print(
+        f"seeding {plan.customers:,} customers, {plan.tickets:,} tickets and "
+        f"{plan.invoices:,} invoices with {args.workers} worker(s)"
+    )
+    seed(plan, args.workers, args.reset)
+
+
+if __name__ == "__main__":
+    main()
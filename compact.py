@@ -0,0 +1,222 @@
+"""Compact text rendering of tool results for the model's context.
+
+Worker tools return pydantic models, lists of them and "not found" strings,
+which pydantic-ai would send to the model as JSON: every field name repeated
+on every row, quotes around every value and full ISO timestamps. Each tool
+result is input tokens on every later turn of the run. The
+:class:`CompactResults` capability renders them as text instead:
+
+* a model becomes one ``field: value`` line per field, with nested models and
+  tables indented under a ``field:`` line;
+* a list of flat models becomes a table: a tab-separated header line, then
+  one line per row, with "not found" strings kept in place on lines of their
+  own; lists of nested models become records separated by blank lines;
+* timestamps lose zero seconds and midnight times, whole floats their
+  ``.0``, and None becomes an empty value.
+
+``COMPACT_FIELDS`` projects models onto some of their fields, by class name;
+text values are cut at ``COMPACT_MAX_CHARS`` characters and tables at
+``COMPACT_MAX_ROWS`` rows, saying how many were left out.
+
+Each rendered result is counted in tokens, as sent and as the JSON it
+replaces, on the request's :class:`~accounting.UsageReport`. Tokens are
+counted with tiktoken when it is installed, and estimated otherwise.
+"""
+
+import enum
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Iterator
+
+from pydantic import BaseModel
+from pydantic_ai.capabilities import AbstractCapability
+from pydantic_ai.messages import tool_return_ta
+
+from accounting import request_usage
+from config import (
+    COMPACT_FIELDS,
+    COMPACT_MAX_CHARS,
+    COMPACT_MAX_ROWS,
+    TOKENIZER_ENCODING,
+    TOOL_RESULT_FORMAT,
+)
+
+try:
+    import tiktoken
+except ImportError:  # optional: token counts are estimated without it
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+INDENT = "  "
+# Roughly how a BPE tokenizer splits text: short runs of letters, numbers in
+# groups of up to three digits, each line break and each other symbol.
+TOKEN_ESTIMATE_RE = re.compile(r"[^\W\d_]{1,8}|\d{1,3}|\n|[^\w\s]")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception:  # the encoding is downloaded on first use
+        logger.warning("tiktoken encoding %s unavailable", TOKENIZER_ENCODING)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in ``text``: exact with tiktoken, otherwise an estimate."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(TOKEN_ESTIMATE_RE.findall(text))
+
+
+def _is_model_list(value: Any) -> bool:
+    return isinstance(value, (list, tuple)) and any(
+        isinstance(item, BaseModel) for item in value
+    )
+
+
+@dataclass(frozen=True)
+class CompactFormat:
+    """How :meth:`dumps` renders tool results; defaults come from config."""
+
+    fields: dict[str, tuple[str, ...]] = field(
+        default_factory=lambda: dict(COMPACT_FIELDS)
+    )
+    max_chars: int = COMPACT_MAX_CHARS
+    max_rows: int = COMPACT_MAX_ROWS
+
+    def dumps(self, value: Any) -> str:
+        """Render a tool result as compact text.
+
+        :param value: a model, a list of models and strings, or a scalar
+        :type value: Any
+        :return: the text to hand to the model
+        :rtype: str
+        """
+        if isinstance(value, str):
+            return value
+        return "\n".join(self._lines(value, ""))
+
+    def field_names(self, model: BaseModel) -> list[str]:
+        names = list(type(model).model_fields)
+        keep = self.fields.get(type(model).__name__)
+        return [name for name in names if name in keep] if keep else names
+
+    def _lines(self, value: Any, indent: str) -> Iterator[str]:
+        if isinstance(value, BaseModel):
+            yield from self._record(value, indent)
+        elif _is_model_list(value):
+            yield from self._rows(value, indent)
+        else:
+            yield indent + self.scalar(value)
+
+    def _record(self, model: BaseModel, indent: str) -> Iterator[str]:
+        for name in self.field_names(model):
+            value = getattr(model, name)
+            if isinstance(value, BaseModel):
+                yield f"{indent}{name}:"
+                yield from self._record(value, indent + INDENT)
+            elif _is_model_list(value):
+                yield f"{indent}{name} ({len(value)}):"
+                yield from self._rows(value, indent + INDENT)
+            else:
+                yield f"{indent}{name}: {self.scalar(value)}"
+
+    def _flat(self, model: BaseModel) -> bool:
+        return not any(
+            isinstance(getattr(model, name), BaseModel)
+            or _is_model_list(getattr(model, name))
+            for name in self.field_names(model)
+        )
+
+    def _rows(self, items: list, indent: str) -> Iterator[str]:
+        shown = items[: self.max_rows]
+        models = [item for item in shown if isinstance(item, BaseModel)]
+        if all(self._flat(model) for model in models):
+            yield from self._table(shown, indent)
+        else:
+            for i, item in enumerate(shown):
+                if i:
+                    yield ""
+                yield from self._lines(item, indent)
+        if len(items) > len(shown):
+            yield f"{indent}... {len(items) - len(shown)} more not shown"
+
+    def _table(self, items: list, indent: str) -> Iterator[str]:
+        header = None
+        for item in items:
+            if not isinstance(item, BaseModel):
+                yield indent + self.scalar(item)
+                continue
+            names = self.field_names(item)
+            # A header before the first row, and again if the columns change.
+            if names != header:
+                header = names
+                yield indent + "\t".join(names)
+            yield indent + "\t".join(
+                self.scalar(getattr(item, name)) for name in names
+            )
+
+    def scalar(self, value: Any) -> str:
+        """A single value as short text, without tabs or line breaks."""
+        if value is None:
+            return ""
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        if isinstance(value, enum.Enum):
+            return self.scalar(value.value)
+        if isinstance(value, datetime):
+            if value.tzinfo is not None:
+                return value.isoformat(sep=" ", timespec="seconds")
+            if value.time() == time():
+                return value.date().isoformat()
+            if value.second == 0 and value.microsecond == 0:
+                return value.strftime("%Y-%m-%d %H:%M")
+            return value.isoformat(sep=" ", timespec="seconds")
+        if isinstance(value, date):
+            return value.isoformat()
+        if isinstance(value, float):
+            return str(int(value)) if value.is_integer() else repr(value)
+        if isinstance(value, (int, Decimal)):
+            return str(value)
+        if isinstance(value, (list, tuple, set)):
+            return "[" + ", ".join(self.scalar(item) for item in value) + "]"
+        if isinstance(value, BaseModel):
+            return "; ".join(f"{key}={self.scalar(item)}" for key, item in value)
+        text = " ".join(str(value).split())
+        if len(text) > self.max_chars:
+            return text[: self.max_chars - 1] + "…"
+        return text
+
+
+@dataclass
+class CompactResults(AbstractCapability):
+    """Capability that hands the agent's tool results to the model compactly."""
+
+    compact_format: CompactFormat = field(default_factory=CompactFormat)
+    enabled: bool = TOOL_RESULT_FORMAT == "compact"
+
+    async def wrap_tool_execute(self, ctx, *, call, tool_def, args, handler):
+        result = await handler(args)
+        if not self.enabled or tool_def.kind != "function" or isinstance(result, str):
+            return result
+        text = self.compact_format.dumps(result)
+        report = request_usage(ctx)
+        if report is not None:
+            tokens = count_tokens(text)
+            json_tokens = count_tokens(tool_return_ta.dump_json(result).decode())
+            usage = report.tool(call.tool_name)
+            usage.result_tokens += tokens
+            usage.json_tokens += json_tokens
+            logger.debug(
+                "%s result: %d tokens, %d as JSON", call.tool_name, tokens, json_tokens
+            )
+        return text
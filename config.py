@@ -1,9 +1,151 @@
+import os
+
 AI_MODEL = "ministral-14b-2512"
 
 
 TEMPERATURE = 0
 
 
+# Connection pool of the async engine used by the agent tools.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Log every SQL statement; off by default because it is costly and noisy.
+# Tracing times statements per request at a fraction of the cost.
+DB_ECHO = os.getenv("DB_ECHO", "0") == "1"
+
+
+# Worker agents run concurrently per request, each bounded by a timeout.
+PLANNER_MAX_CONCURRENCY = 3
+WORKER_TIMEOUT_SECONDS = 60
+
+
+# Cache of validated service-layer lookups; not-found keys expire sooner.
+LOOKUP_CACHE_MAXSIZE = 1024
+LOOKUP_CACHE_TTL_SECONDS = 300
+LOOKUP_CACHE_NEGATIVE_TTL_SECONDS = 30
+
+
+# Rows per section of the customer 360 view; tools may ask for up to the max.
+CUSTOMER_360_TICKET_LIMIT = 5
+CUSTOMER_360_INVOICE_LIMIT = 5
+CUSTOMER_360_MAX_LIMIT = 50
+
+
+# Fuzzy customer search: candidates below the score are dropped, and only the
+# customers sharing the most rare trigrams with the query are scored exactly.
+CUSTOMER_SEARCH_LIMIT = 5
+CUSTOMER_SEARCH_MIN_SCORE = 0.3
+CUSTOMER_SEARCH_CANDIDATES = 256
+# The index is rebuilt from the database at most this often, to pick up
+# customers written by other processes (batch runs, seeding, admin tools).
+CUSTOMER_SEARCH_RELOAD_SECONDS = int(os.getenv("CUSTOMER_SEARCH_RELOAD_SECONDS", "300"))
+
+
+# Full-text ticket search results per page.
+TICKET_SEARCH_PAGE_SIZE = 10
+TICKET_SEARCH_MAX_PAGE_SIZE = 50
+
+
+# Customer ticket and invoice listings return this many rows per page by
+# default, and never more than the maximum, whatever the model asks for.
+LISTING_PAGE_SIZE = 10
+LISTING_MAX_PAGE_SIZE = 50
+
+
+# Similar-ticket vector index: hashed TF-IDF vectors of this many dimensions,
+# brought up to date with the tickets changed since at most every refresh
+# interval. With TICKET_SIMILARITY_INDEX_DIR set, the index is saved there
+# once built and memory-mapped back on the next start.
+TICKET_SIMILARITY_DIMENSIONS = 256
+TICKET_SIMILARITY_LIMIT = 5
+TICKET_SIMILARITY_MAX_LIMIT = 20
+TICKET_SIMILARITY_MIN_SCORE = 0.05
+TICKET_SIMILARITY_REFRESH_SECONDS = 30
+TICKET_SIMILARITY_INDEX_DIR = os.getenv("TICKET_SIMILARITY_INDEX_DIR")
+
+
+# Currency conversion: invoice amounts are in INVOICE_CURRENCY, and the
+# in-memory rate table is reloaded from the fx_rates table at most this often.
+INVOICE_CURRENCY = "USD"
+FX_RATES_RELOAD_SECONDS = int(os.getenv("FX_RATES_RELOAD_SECONDS", "3600"))
+
+
+# Analytics tools list at most this many groups of a count, and by default
+# this many of the longest overdue invoices; totals always cover every row.
+# Overdue invoices are bucketed by days past due, up to each bound in turn.
+ANALYTICS_MAX_GROUPS = 31
+ANALYTICS_OVERDUE_LIMIT = 10
+ANALYTICS_AGING_DAYS = (30, 60, 90)
+
+
+# On-disk cache of temperature-0 model responses.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3")
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+# Worker tool results reach the model as compact text (see compact.py) rather
+# than JSON; TOOL_RESULT_FORMAT=json turns that off. Text values are cut at
+# COMPACT_MAX_CHARS characters and tables at COMPACT_MAX_ROWS rows, and
+# COMPACT_FIELDS keeps only the listed fields of a model, by class name, e.g.
+# {"TicketDetails": ("ticket_number", "status")}. Tokens are counted with this
+# tiktoken encoding if tiktoken is installed, and estimated otherwise.
+TOOL_RESULT_FORMAT = os.getenv("TOOL_RESULT_FORMAT", "compact")
+COMPACT_MAX_CHARS = 300
+COMPACT_MAX_ROWS = 50
+COMPACT_FIELDS: dict[str, tuple[str, ...]] = {}
+TOKENIZER_ENCODING = "cl100k_base"
+
+
+# Tracing (see tracing.py): this share of requests is traced, and their spans
+# appended to TRACE_PATH as JSON lines; off by default. SQL statements are
+# recorded up to TRACE_STATEMENT_CHARS characters.
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_PATH = os.getenv("TRACE_PATH", "traces.jsonl")
+TRACE_STATEMENT_CHARS = 500
+
+
+# Token budgets per agent, summed over one user request (see accounting.py).
+# "input_tokens_per_request" caps the prompt size of a single model request.
+# Going over warns, or raises TokenBudgetExceeded with TOKEN_BUDGET_ACTION=fail.
+TOKEN_BUDGET_ACTION = os.getenv("TOKEN_BUDGET_ACTION", "warn")
+AGENT_TOKEN_BUDGETS = {
+    "planner": {"input_tokens_per_request": 4000, "total_tokens": 16000},
+    "invoice_worker": {"input_tokens_per_request": 3000, "total_tokens": 8000},
+    "ticket_worker": {"input_tokens_per_request": 3000, "total_tokens": 8000},
+    "customer_detail_worker": {"input_tokens_per_request": 3000, "total_tokens": 8000},
+}
+
+
+# Raw chat completions client in utils.py.
+MISTRAL_API_URL = os.getenv(
+    "MISTRAL_API_URL", "https://api.mistral.ai/v1/chat/completions"
+)
+HTTP_TIMEOUT_SECONDS = 30.0
+HTTP_MAX_RETRIES = 3
+HTTP_BACKOFF_BASE_SECONDS = 0.5
+HTTP_BACKOFF_MAX_SECONDS = 30.0
+HTTP_MAX_CONNECTIONS = 20
+
+
+# Batch mode (batch.py): prompts processed at the same time.
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+
+# HTTP service (service.py): runs in flight, runs waiting for a slot before
+# requests are rejected with 503, and how long shutdown waits for runs to end.
+SERVICE_MAX_CONCURRENCY = int(os.getenv("SERVICE_MAX_CONCURRENCY", "16"))
+SERVICE_MAX_QUEUE = int(os.getenv("SERVICE_MAX_QUEUE", "64"))
+SERVICE_DRAIN_TIMEOUT_SECONDS = float(
+    os.getenv("SERVICE_DRAIN_TIMEOUT_SECONDS", "30")
+)
+# The service has no authentication, so the database and privileges of its
+# runs are set here for the whole deployment, never by the request.
+SERVICE_DB_NAME = os.getenv("SERVICE_DB_NAME", "Production_SQL_Azure")
+SERVICE_IS_ADMIN = os.getenv("SERVICE_IS_ADMIN", "0") == "1"
+
+
 USER_PROMPT = "Retrieve INV-38559-FH. The customer is disputing the conversion rate . Turn the invoice amount into EUR"
 
 USER_PROMPT_OLD = "Give me all the infos on wangsandra@example.org"
@@ -3,10 +3,17 @@ from typing import Optional
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent
 
-from ai_model import model
+from accounting import Accounting
+from ai_model import get_model
+from compact import CompactResults
 from customer_detail_agent.prompt import customer_detail_prompt
-from customer_detail_agent.tools import get_customer_details
+from customer_detail_agent.tools import (
+    find_customers,
+    get_customer_details,
+    get_customer_details_many,
+)
 from dependencies import MyDeps
+from tracing import Tracing
 
 
 class CustomerDetailsAgentOutput(BaseModel):
@@ -18,12 +25,21 @@ class CustomerDetailsAgentOutput(BaseModel):
     details: Optional[str] = Field(description="Details about customer")
 
 
-customer_detail_agent = Agent(
-    model,
-    system_prompt=customer_detail_prompt,
-    deps_type=MyDeps,
-    output_type=CustomerDetailsAgentOutput,
-)
-
-
-customer_detail_agent.tool(get_customer_details)
+def build_customer_detail_agent() -> Agent:
+    customer_detail_agent = Agent(
+        get_model(),
+        name="customer_detail_worker",
+        capabilities=[
+            CompactResults(),
+            Accounting("customer_detail_worker"),
+            Tracing("customer_detail_worker"),
+        ],
+        system_prompt=customer_detail_prompt,
+        deps_type=MyDeps,
+        output_type=CustomerDetailsAgentOutput,
+    )
+
+    customer_detail_agent.tool(get_customer_details)
+    customer_detail_agent.tool(get_customer_details_many)
+    customer_detail_agent.tool(find_customers)
+    return customer_detail_agent
@@ -1,23 +1,110 @@
 from pydantic_ai import RunContext
 
+from config import (
+    CUSTOMER_360_INVOICE_LIMIT,
+    CUSTOMER_360_TICKET_LIMIT,
+    CUSTOMER_SEARCH_LIMIT,
+)
 from dependencies import MyDeps
-from service_layer.customer_details import get_customer_info
+from service_layer.customer_360 import (
+    Customer360,
+    get_customer_360_async,
+    get_customer_360_many_async,
+)
+from service_layer.customer_search import CustomerMatch, search_customers_async
 
+# Candidates offered with a "not found" answer, so the model can retry right away.
+MISS_SUGGESTIONS = 3
 
-def get_customer_details(
-    ctx: RunContext[MyDeps], customer_id: str | None, email_address: str | None
-) -> str:
+
+async def _not_found(ctx: RunContext[MyDeps], identifier: str) -> str:
+    message = f"No database record found for Customer: {identifier}"
+    matches = await search_customers_async(
+        identifier, MISS_SUGGESTIONS, ctx.deps.async_session
+    )
+    if not matches:
+        return message
+    candidates = "; ".join(
+        f"{match.name} <{match.email}> (ID {match.customer_id}, score {match.score})"
+        for match in matches
+    )
+    return f"{message}. Closest customers: {candidates}"
+
+
+async def get_customer_details(
+    ctx: RunContext[MyDeps],
+    customer_id: str | None,
+    email_address: str | None,
+    ticket_limit: int = CUSTOMER_360_TICKET_LIMIT,
+    invoice_limit: int = CUSTOMER_360_INVOICE_LIMIT,
+) -> Customer360 | str:
     """Fetches customer details including invoice and ticket information from the customer database.
-    Use this to get extended customer information
+    Use this to get extended customer information: contact and address details,
+    the most recent tickets and the open invoices, all in one call.
 
     :param ctx: context injected into chat
     :type ctx: RunContext[MyDeps]
     :param customer_id: customer ID provided by the user
     :type customer_id: str
+    :param email_address: customer email address provided by the user
+    :type email_address: str
+    :param ticket_limit: how many of the most recent tickets to include
+    :type ticket_limit: int
+    :param invoice_limit: how many open invoices to include
+    :type invoice_limit: int
     :return: customer detail
-    :rtype: str
+    :rtype: Customer360 | str
     """
-    db_data = get_customer_info(customer_id, email_address)
+    db_data = await get_customer_360_async(
+        customer_id, email_address, ticket_limit, invoice_limit, ctx.deps.async_session
+    )
     if not db_data:
-        return f"No database record found for Customer ID: {customer_id}"
+        return await _not_found(ctx, email_address or str(customer_id))
     return db_data
+
+
+async def get_customer_details_many(
+    ctx: RunContext[MyDeps],
+    identifiers: list[str],
+    ticket_limit: int = CUSTOMER_360_TICKET_LIMIT,
+    invoice_limit: int = CUSTOMER_360_INVOICE_LIMIT,
+) -> list[Customer360 | str]:
+    """Fetches details, recent tickets and open invoices of several customers at once.
+    Each identifier is either a customer ID or an email address.
+
+    :param ctx: context injected into chat
+    :type ctx: RunContext[MyDeps]
+    :param identifiers: customer IDs and/or email addresses provided by the user
+    :type identifiers: list[str]
+    :param ticket_limit: how many of the most recent tickets to include per customer
+    :type ticket_limit: int
+    :param invoice_limit: how many open invoices to include per customer
+    :type invoice_limit: int
+    :return: customer detail per identifier, in the same order
+    :rtype: list[Customer360 | str]
+    """
+    db_data = await get_customer_360_many_async(
+        identifiers, ticket_limit, invoice_limit, ctx.deps.async_session
+    )
+    return [
+        details or await _not_found(ctx, identifier)
+        for identifier, details in zip(identifiers, db_data)
+    ]
+
+
+async def find_customers(
+    ctx: RunContext[MyDeps], query: str, limit: int = CUSTOMER_SEARCH_LIMIT
+) -> list[CustomerMatch]:
+    """Finds customers by a partial name, a misspelled email address or part of a phone number.
+    Use this when the exact customer ID or email is unknown, then look up the best match.
+
+    :param ctx: context injected into chat
+    :type ctx: RunContext[MyDeps]
+    :param query: name, email or phone number as given by the user
+    :type query: str
+    :param limit: maximum number of candidates
+    :type limit: int
+    :return: candidate customers with a similarity score from 0 to 1, best first
+    :rtype: list[CustomerMatch]
+    """
+    return await search_customers_async(query, limit, ctx.deps.async_session)
@@ -1,28 +1,130 @@
 import enum
 import os
 from datetime import datetime
+from functools import cache
+from typing import TYPE_CHECKING
 
 from dotenv import load_dotenv
 from sqlalchemy import (
+    DDL,
     Column,
+    Date,
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
+    Numeric,
     String,
     Text,
+    UniqueConstraint,
     create_engine,
+    event,
+    make_url,
 )
-from sqlalchemy.orm import declarative_base, relationship, scoped_session, sessionmaker
+from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+
+from config import DB_ECHO, DB_MAX_OVERFLOW, DB_POOL_SIZE, DB_POOL_TIMEOUT
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
 
 load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Async drivers used when ASYNC_DATABASE_URL is not set explicitly.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
 
 
-engine = create_engine(DATABASE_URL, echo=True)
 Base = declarative_base()
-session_factory = sessionmaker(bind=engine)
-Session = scoped_session(session_factory)
+
+
+def database_url() -> str:
+    """``DATABASE_URL`` from the environment or ``.env``.
+
+    :raises RuntimeError: if ``DATABASE_URL`` is not set
+    :return: sync SQLAlchemy URL
+    :rtype: str
+    """
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise RuntimeError("DATABASE_URL is not set (see .env)")
+    return url
+
+
+@cache
+def get_engine() -> "Engine":
+    """Create (once) the sync engine.
+
+    Importing this module only defines the models; the engine and its pool are
+    built on first use, so tools that never touch the database start faster.
+    """
+    from tracing import instrument_engine
+
+    engine = create_engine(database_url(), echo=DB_ECHO)
+    instrument_engine(engine)
+    return engine
+
+
+@cache
+def get_session_factory() -> sessionmaker:
+    return sessionmaker(bind=get_engine())
+
+
+def to_async_url(url: str) -> str:
+    """Swap the driver of a sync database URL for its async counterpart.
+
+    :param url: sync SQLAlchemy URL, e.g. postgresql+psycopg2://...
+    :type url: str
+    :return: the same URL with an async driver, e.g. postgresql+asyncpg://...
+    :rtype: str
+    """
+    sync_url = make_url(url)
+    backend = sync_url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        return url
+    return sync_url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(
+        hide_password=False
+    )
+
+
+@cache
+def get_async_engine(
+    pool_size: int = DB_POOL_SIZE,
+    max_overflow: int = DB_MAX_OVERFLOW,
+    pool_timeout: int = DB_POOL_TIMEOUT,
+) -> "AsyncEngine":
+    """Create (once) the async engine backing the async service layer.
+
+    Built on first use so that processes without greenlet or an async driver
+    installed can still import the models.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from tracing import instrument_engine
+
+    url = os.getenv("ASYNC_DATABASE_URL") or to_async_url(database_url())
+    engine = create_async_engine(
+        url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_pre_ping=True,
+        echo=DB_ECHO,
+    )
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+@cache
+def get_async_session_factory() -> "async_sessionmaker":
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    return async_sessionmaker(bind=get_async_engine(), expire_on_commit=False)
 
 
 class TicketStatus(enum.Enum):
@@ -54,12 +156,108 @@ class Ticket(Base):
 
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Indexed for the incremental refresh of the similar-ticket index.
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True
+    )
 
     # Foreign Key
     customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
     customer = relationship("Customer", back_populates="tickets")
 
+    # Also serves as the index on the customer_id foreign key.
+    __table_args__ = (
+        Index(
+            "ix_tickets_customer_id_status_created_at",
+            "customer_id",
+            "status",
+            "created_at",
+        ),
+        # Covers ticket counts over a creation period, per status.
+        Index("ix_tickets_created_at_status", "created_at", "status"),
+        # Keyset pages of a customer's tickets, newest first.
+        Index(
+            "ix_tickets_customer_id_created_at_id", "customer_id", "created_at", "id"
+        ),
+    )
+
+
+# Full-text index over ticket subjects and descriptions, kept in sync by
+# triggers. The alembic migration add_ticket_full_text_search creates the same
+# objects; these listeners cover schemas built with ``create_all``.
+TICKET_SEARCH_DDL = {
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts USING fts5(
+            subject, description,
+            content='tickets', content_rowid='id', tokenize='porter unicode61'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tickets_fts_insert AFTER INSERT ON tickets
+        BEGIN
+            INSERT INTO tickets_fts (rowid, subject, description)
+            VALUES (new.id, new.subject, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tickets_fts_delete AFTER DELETE ON tickets
+        BEGIN
+            INSERT INTO tickets_fts (tickets_fts, rowid, subject, description)
+            VALUES ('delete', old.id, old.subject, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tickets_fts_update
+        AFTER UPDATE OF subject, description ON tickets
+        BEGIN
+            INSERT INTO tickets_fts (tickets_fts, rowid, subject, description)
+            VALUES ('delete', old.id, old.subject, old.description);
+            INSERT INTO tickets_fts (rowid, subject, description)
+            VALUES (new.id, new.subject, new.description);
+        END
+        """,
+    ],
+    "postgresql": [
+        "ALTER TABLE tickets ADD COLUMN IF NOT EXISTS search_vector tsvector",
+        """
+        CREATE OR REPLACE FUNCTION tickets_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('english', coalesce(NEW.subject, '')), 'A')
+                || setweight(
+                    to_tsvector('english', coalesce(NEW.description, '')), 'B'
+                );
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER tickets_search_vector_update
+        BEFORE INSERT OR UPDATE OF subject, description ON tickets
+        FOR EACH ROW EXECUTE FUNCTION tickets_search_vector_update()
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS ix_tickets_search_vector
+        ON tickets USING gin (search_vector)
+        """,
+    ],
+}
+
+for _dialect, _statements in TICKET_SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(
+            Ticket.__table__,
+            "after_create",
+            DDL(_statement).execute_if(dialect=_dialect),
+        )
+# The external-content FTS table is not dropped together with tickets.
+event.listen(
+    Ticket.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS tickets_fts").execute_if(dialect="sqlite"),
+)
+
 
 class Invoice(Base):
     __tablename__ = "invoices"
@@ -68,12 +266,24 @@ class Invoice(Base):
     invoice_number = Column(String(20), unique=True, nullable=False)
     amount = Column(Integer, nullable=False)
     issued_date = Column(DateTime, default=datetime.utcnow)
-    due_date = Column(DateTime, nullable=False)
+    # Indexed for overdue invoice reports, which scan and sort by due date.
+    due_date = Column(DateTime, nullable=False, index=True)
 
     # Foreign Key
     customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
     customer = relationship("Customer")
 
+    # Keyset pages of a customer's invoices, newest first. Also serves as the
+    # index on the customer_id foreign key.
+    __table_args__ = (
+        Index(
+            "ix_invoices_customer_id_issued_date_id",
+            "customer_id",
+            "issued_date",
+            "id",
+        ),
+    )
+
 
 class CustomerDetail(Base):
     __tablename__ = "customer_details"
@@ -86,5 +296,22 @@ class CustomerDetail(Base):
     is_vip = Column(Integer, default=0)  # 0 = No, 1 = Yes
 
     # Foreign Key
-    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
+    customer_id = Column(
+        Integer, ForeignKey("customers.id"), nullable=False, index=True
+    )
     customer = relationship("Customer")
+
+
+class FxRate(Base):
+    """Reference exchange rate of a currency on a day, as units per euro."""
+
+    __tablename__ = "fx_rates"
+
+    id = Column(Integer, primary_key=True)
+    rate_date = Column(Date, nullable=False)
+    currency = Column(String(3), nullable=False)  # ISO 4217, e.g. USD
+    units_per_eur = Column(Numeric(18, 6), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("rate_date", "currency", name="uq_fx_rates_date_currency"),
+    )
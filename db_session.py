@@ -0,0 +1,256 @@
+"""Session lifecycle for the service layer.
+
+Every database access goes through :func:`session_scope` or
+:func:`async_session_scope`, which open a session, commit or roll back, and
+always close it so its connection goes back to the pool. Agent runs open a
+run-level scope (see :func:`dependencies.run_scope`) and hand its session to
+the tools through ``MyDeps``; sessions opened inside a run are tagged with the
+run id so the leak detector can flag any that are still open when it ends.
+"""
+
+import asyncio
+import threading
+import time
+import warnings
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AsyncIterator, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from database import (
+    get_async_engine,
+    get_async_session_factory,
+    get_engine,
+    get_session_factory,
+)
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+current_run_id: ContextVar[str | None] = ContextVar("current_run_id", default=None)
+
+
+@dataclass
+class PoolStats:
+    """Connection pool counters for one engine."""
+
+    engine: Engine = field(repr=False)
+    connects: int = 0
+    checkouts: int = 0
+    checkins: int = 0
+    peak_checked_out: int = 0
+    waits: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def checked_out(self) -> int:
+        return self.checkouts - self.checkins
+
+    @property
+    def overflow(self) -> int:
+        """Connections currently open beyond ``pool_size`` (QueuePool only)."""
+        overflow = getattr(self.engine.pool, "overflow", None)
+        return max(overflow(), 0) if overflow else 0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.waits if self.waits else 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.waits += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    def snapshot(self) -> dict[str, float]:
+        return {
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checked_out": self.checked_out,
+            "peak_checked_out": self.peak_checked_out,
+            "overflow": self.overflow,
+            "mean_wait_ms": self.mean_wait * 1000,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+_pool_stats: dict[Engine, PoolStats] = {}
+
+
+def instrument_pool(target: Engine) -> PoolStats:
+    """Attach pool listeners to an engine once and return its counters.
+
+    :param target: sync engine, or ``AsyncEngine.sync_engine``
+    :type target: Engine
+    :return: live counters for the engine's pool
+    :rtype: PoolStats
+    """
+    if target in _pool_stats:
+        return _pool_stats[target]
+    stats = _pool_stats[target] = PoolStats(engine=target)
+
+    @event.listens_for(target, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        with stats._lock:
+            stats.connects += 1
+
+    @event.listens_for(target, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        with stats._lock:
+            stats.checkouts += 1
+            stats.peak_checked_out = max(stats.peak_checked_out, stats.checked_out)
+
+    @event.listens_for(target, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        with stats._lock:
+            stats.checkins += 1
+
+    return stats
+
+
+def pool_stats() -> dict[str, dict[str, float]]:
+    """Snapshot of every instrumented pool, keyed by engine URL."""
+    return {
+        target.url.render_as_string(): stats.snapshot()
+        for target, stats in _pool_stats.items()
+    }
+
+
+# Connection wait time: from the moment a session starts its transaction until
+# it holds a connection, i.e. queueing on the pool plus connecting.
+@event.listens_for(Session, "after_transaction_create")
+def _start_connection_wait(session, transaction):
+    if transaction.parent is None:
+        session.info["connection_wait_started"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_begin")
+def _end_connection_wait(session, transaction, connection):
+    started = session.info.pop("connection_wait_started", None)
+    stats = _pool_stats.get(connection.engine)
+    if started is not None and stats is not None:
+        stats.record_wait(time.perf_counter() - started)
+
+
+@dataclass
+class SessionLeak:
+    run_id: str | None
+    age: float
+    session: str
+
+
+class SessionLeakDetector:
+    """Keeps track of open sessions and flags those that outlive their run."""
+
+    def __init__(self) -> None:
+        self._open: dict[int, tuple[str, str | None, float]] = {}
+        self._lock = threading.Lock()
+        self.leaks: list[SessionLeak] = []
+
+    def track(self, session) -> None:
+        with self._lock:
+            self._open[id(session)] = (
+                repr(session),
+                current_run_id.get(),
+                time.monotonic(),
+            )
+
+    def untrack(self, session) -> None:
+        with self._lock:
+            self._open.pop(id(session), None)
+
+    def open_sessions(self, run_id: str | None = None) -> list[SessionLeak]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                SessionLeak(run_id=owner, age=now - opened, session=name)
+                for name, owner, opened in self._open.values()
+                if run_id is None or owner == run_id
+            ]
+
+    def check_run(self, run_id: str) -> list[SessionLeak]:
+        """Flag sessions opened during a run that are still open after it ended.
+
+        :param run_id: id of the run that just finished
+        :type run_id: str
+        :return: the leaked sessions, also appended to :attr:`leaks`
+        :rtype: list[SessionLeak]
+        """
+        leaks = self.open_sessions(run_id)
+        for leak in leaks:
+            warnings.warn(
+                f"{leak.session} outlived run {run_id} by being open {leak.age:.2f}s",
+                ResourceWarning,
+                stacklevel=2,
+            )
+        self.leaks.extend(leaks)
+        return leaks
+
+    def stale(self, max_age: float) -> list[SessionLeak]:
+        """Sessions open for longer than ``max_age`` seconds, whatever their run."""
+        return [leak for leak in self.open_sessions() if leak.age > max_age]
+
+
+leak_detector = SessionLeakDetector()
+
+
+@contextmanager
+def session_scope(session: Session | None = None) -> Iterator[Session]:
+    """Unit of work around a sync session.
+
+    :param session: an existing session to reuse, e.g. the run's session;
+        it is yielded untouched and left for its owner to close
+    :type session: Session | None
+    :return: a session that is committed, rolled back and closed on exit
+    :rtype: Iterator[Session]
+    """
+    if session is not None:
+        yield session
+        return
+    instrument_pool(get_engine())
+    session = get_session_factory()()
+    leak_detector.track(session)
+    try:
+        yield session
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+        leak_detector.untrack(session)
+
+
+@asynccontextmanager
+async def async_session_scope(
+    session: "AsyncSession | None" = None,
+) -> AsyncIterator["AsyncSession"]:
+    """Async counterpart of :func:`session_scope`.
+
+    A shared run session is handed out to one caller at a time: pydantic_ai
+    executes the tool calls of a model response concurrently, and an
+    ``AsyncSession`` does not allow concurrent operations.
+    """
+    if session is not None:
+        lock = session.info.setdefault("run_lock", asyncio.Lock())
+        async with lock:
+            yield session
+        return
+    instrument_pool(get_async_engine().sync_engine)
+    session = get_async_session_factory()()
+    leak_detector.track(session)
+    try:
+        yield session
+        await session.commit()
+    except BaseException:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+        leak_detector.untrack(session)
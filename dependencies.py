@@ -1,7 +1,86 @@
-from dataclasses import dataclass
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AsyncIterator, Iterator
+from uuid import uuid4
+
+from sqlalchemy.orm import Session
+
+from accounting import UsageReport
+from config import PLANNER_MAX_CONCURRENCY
+from db_session import (
+    async_session_scope,
+    current_run_id,
+    leak_detector,
+    session_scope,
+)
+from llm_cache import bypass_llm_cache
+from tracing import trace
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 
 @dataclass
 class MyDeps:
     db_name: str
     is_admin: bool
+    run_id: str = field(default_factory=lambda: uuid4().hex)
+    # Send every model request of this run to the provider, even if cached.
+    bypass_llm_cache: bool = False
+    # Set by run_scope / run_scope_sync for the duration of one agent run.
+    session: Session | None = field(default=None, repr=False)
+    async_session: "AsyncSession | None" = field(default=None, repr=False)
+    # Tokens, requests and wall time of every agent and tool in this request.
+    usage: UsageReport = field(default_factory=UsageReport, repr=False)
+    # Caps how many worker agents one request runs at the same time.
+    worker_slots: asyncio.Semaphore = field(
+        default_factory=lambda: asyncio.Semaphore(PLANNER_MAX_CONCURRENCY),
+        repr=False,
+    )
+
+
+@contextmanager
+def run_scope_sync(deps: MyDeps) -> Iterator[MyDeps]:
+    """Tie a sync session to one agent run.
+
+    :param deps: dependencies of the run; ``deps.session`` is set while inside
+    :type deps: MyDeps
+    :return: the same deps, carrying the run's session
+    :rtype: Iterator[MyDeps]
+    """
+    token = current_run_id.set(deps.run_id)
+    try:
+        with (
+            trace(deps.run_id, "run", db_name=deps.db_name),
+            session_scope() as session,
+            bypass_llm_cache(deps.bypass_llm_cache),
+        ):
+            deps.session = session
+            yield deps
+    finally:
+        deps.session = None
+        current_run_id.reset(token)
+        leak_detector.check_run(deps.run_id)
+
+
+@asynccontextmanager
+async def run_scope(deps: MyDeps) -> AsyncIterator[MyDeps]:
+    """Tie an async session to one agent run.
+
+    :param deps: dependencies of the run; ``deps.async_session`` is set while inside
+    :type deps: MyDeps
+    :return: the same deps, carrying the run's async session
+    :rtype: AsyncIterator[MyDeps]
+    """
+    token = current_run_id.set(deps.run_id)
+    try:
+        with trace(deps.run_id, "run", db_name=deps.db_name):
+            async with async_session_scope() as session:
+                with bypass_llm_cache(deps.bypass_llm_cache):
+                    deps.async_session = session
+                    yield deps
+    finally:
+        deps.async_session = None
+        current_run_id.reset(token)
+        leak_detector.check_run(deps.run_id)
@@ -3,10 +3,21 @@ from typing import Optional
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent
 
-from ai_model import model
+from accounting import Accounting
+from ai_model import get_model
+from compact import CompactResults
 from dependencies import MyDeps
 from invoice_agent.prompt import invoice_agent_prompt
-from invoice_agent.tools import USD_to_EUR_converter, get_invoice_details
+from invoice_agent.tools import (
+    convert_currency,
+    convert_invoices,
+    get_customer_balances,
+    get_invoice_details,
+    get_invoice_details_many,
+    get_overdue_invoices,
+    list_customer_invoices,
+)
+from tracing import Tracing
 
 
 class InvoiceOutputModel(BaseModel):
@@ -16,12 +27,25 @@ class InvoiceOutputModel(BaseModel):
     details: Optional[str] = Field(description="Details about the invoice")
 
 
-invoice_agent = Agent(
-    model,
-    system_prompt=(invoice_agent_prompt),
-    deps_type=MyDeps,
-    output_type=InvoiceOutputModel,
-)
-
-invoice_agent.tool(get_invoice_details)
-invoice_agent.tool_plain(USD_to_EUR_converter)
+def build_invoice_agent() -> Agent:
+    invoice_agent = Agent(
+        get_model(),
+        name="invoice_worker",
+        capabilities=[
+            CompactResults(),
+            Accounting("invoice_worker"),
+            Tracing("invoice_worker"),
+        ],
+        system_prompt=(invoice_agent_prompt),
+        deps_type=MyDeps,
+        output_type=InvoiceOutputModel,
+    )
+
+    invoice_agent.tool(get_invoice_details)
+    invoice_agent.tool(get_invoice_details_many)
+    invoice_agent.tool(convert_invoices)
+    invoice_agent.tool(convert_currency)
+    invoice_agent.tool(get_customer_balances)
+    invoice_agent.tool(get_overdue_invoices)
+    invoice_agent.tool(list_customer_invoices)
+    return invoice_agent
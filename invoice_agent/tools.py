@@ -1,17 +1,31 @@
-from dataclasses import dataclass
+from datetime import date
 
-from pydantic_ai import RunContext
+from pydantic_ai import ModelRetry, RunContext
 
-from service_layer.invoice_service import get_invoice_infos
+from config import ANALYTICS_OVERDUE_LIMIT, INVOICE_CURRENCY, LISTING_PAGE_SIZE
+from dependencies import MyDeps
+from service_layer.analytics import (
+    CustomerBalance,
+    OverdueInvoices,
+    get_customer_balances_async,
+    get_overdue_invoices_async,
+)
+from service_layer.fx_rates import (
+    Conversion,
+    InvoiceConversion,
+    MissingRateError,
+    convert_amounts_async,
+    convert_invoices_async,
+)
+from service_layer.invoice_service import (
+    InvoiceDetails,
+    get_invoice_infos_async,
+    get_invoice_infos_many_async,
+)
+from service_layer.listings import CustomerInvoicePage, list_customer_invoices_async
 
 
-@dataclass
-class MyDeps:
-    db_name: str
-    is_admin: bool
-
-
-def get_invoice_details(ctx: RunContext[MyDeps], invoice_number: str) -> str:
+async def get_invoice_details(ctx: RunContext[MyDeps], invoice_number: str) -> str:
     """Fetches invoice details from the billing system.
 
     :param ctx: Context injected into chat
@@ -22,7 +36,7 @@ def get_invoice_details(ctx: RunContext[MyDeps], invoice_number: str) -> str:
     :rtype: str
     """
     # Simulate fetching invoice details
-    db_data = get_invoice_infos(invoice_number)
+    db_data = await get_invoice_infos_async(invoice_number, ctx.deps.async_session)
 
     if not db_data:
         return f"No database record found for Invoice ID: {invoice_number}"
@@ -30,14 +44,167 @@ def get_invoice_details(ctx: RunContext[MyDeps], invoice_number: str) -> str:
     return db_data
 
 
-def USD_to_EUR_converter(amount_usd: float) -> float:
-    """Converts an amount from USD to EUR.
+async def get_invoice_details_many(
+    ctx: RunContext[MyDeps], invoice_numbers: list[str]
+) -> list[InvoiceDetails | str]:
+    """Fetches several invoices from the billing system in a single call.
+    Use this instead of repeated lookups when the user asks about more than one invoice.
+
+    :param ctx: Context injected into chat
+    :type ctx: RunContext[MyDeps]
+    :param invoice_numbers: Invoice numbers provided by the user
+    :type invoice_numbers: list[str]
+    :return: invoice details per invoice number, in the same order
+    :rtype: list[InvoiceDetails | str]
+    """
+    db_data = await get_invoice_infos_many_async(
+        invoice_numbers, ctx.deps.async_session
+    )
+    return [
+        details or f"No database record found for Invoice ID: {invoice_number}"
+        for invoice_number, details in zip(invoice_numbers, db_data)
+    ]
+
+
+async def convert_invoices(
+    ctx: RunContext[MyDeps], invoice_numbers: list[str], currency: str = "EUR"
+) -> list[InvoiceConversion | str]:
+    """Converts invoice amounts into another currency at the rate of each invoice's issue date.
+    Use this when the user wants an invoice amount in EUR, GBP, CHF or another currency.
+
+    :param ctx: Context injected into chat
+    :type ctx: RunContext[MyDeps]
+    :param invoice_numbers: Invoice numbers provided by the user
+    :type invoice_numbers: list[str]
+    :param currency: currency code to convert to, e.g. EUR
+    :type currency: str
+    :raises ModelRetry: if the currency is not a known currency code
+    :return: conversion with the rate and its date per invoice number, in the same order
+    :rtype: list[InvoiceConversion | str]
+    """
+    try:
+        conversions = await convert_invoices_async(
+            invoice_numbers, currency, ctx.deps.async_session
+        )
+    except ValueError as exc:
+        raise ModelRetry(str(exc)) from exc
+    return [
+        str(conversion)
+        if isinstance(conversion, MissingRateError)
+        else conversion or f"No database record found for Invoice ID: {invoice_number}"
+        for invoice_number, conversion in zip(invoice_numbers, conversions)
+    ]
+
+
+async def convert_currency(
+    ctx: RunContext[MyDeps],
+    amounts: list[float],
+    from_currency: str = INVOICE_CURRENCY,
+    to_currency: str = "EUR",
+    on_date: date | None = None,
+) -> list[Conversion] | str:
+    """Converts amounts between currencies at the reference rate of a day.
+    Use convert_invoices instead for invoice amounts, so the invoice's issue date is used.
+
+    :param ctx: Context injected into chat
+    :type ctx: RunContext[MyDeps]
+    :param amounts: amounts to convert
+    :type amounts: list[float]
+    :param from_currency: currency code of the amounts, e.g. USD
+    :type from_currency: str
+    :param to_currency: currency code to convert to, e.g. EUR
+    :type to_currency: str
+    :param on_date: day of the rate; the latest rate if omitted
+    :type on_date: date | None
+    :raises ModelRetry: if a currency is not a known currency code
+    :return: one conversion per amount, with the rate and its date
+    :rtype: list[Conversion] | str
+    """
+    try:
+        return await convert_amounts_async(
+            amounts, from_currency, to_currency, on_date, ctx.deps.async_session
+        )
+    except MissingRateError as exc:
+        return str(exc)
+    except ValueError as exc:
+        raise ModelRetry(str(exc)) from exc
+
+
+async def get_customer_balances(
+    ctx: RunContext[MyDeps], customers: list[str]
+) -> list[CustomerBalance | str]:
+    """Totals what customers owe over their unpaid invoices, and how much of it is overdue.
+    Use this for "how much does this customer owe" instead of adding up invoices yourself.
+
+    :param ctx: Context injected into chat
+    :type ctx: RunContext[MyDeps]
+    :param customers: customer IDs or email addresses
+    :type customers: list[str]
+    :return: balance per customer, in the same order
+    :rtype: list[CustomerBalance | str]
+    """
+    balances = await get_customer_balances_async(
+        customers, session=ctx.deps.async_session
+    )
+    return [
+        balance or f"No database record found for customer: {customer}"
+        for customer, balance in zip(customers, balances)
+    ]
+
+
+async def get_overdue_invoices(
+    ctx: RunContext[MyDeps],
+    customer: str | None = None,
+    limit: int = ANALYTICS_OVERDUE_LIMIT,
+) -> OverdueInvoices:
+    """Summarises the invoices past their due date: count, total, age and the oldest ones.
+    Use this for "which invoices are overdue", for everyone or for one customer.
 
-    :param amount_usd: Amount in USD
-    :type amount_usd: float
-    :return: Equivalent amount in EUR
-    :rtype: float
+    :param ctx: Context injected into chat
+    :type ctx: RunContext[MyDeps]
+    :param customer: only invoices of this customer ID or email address
+    :type customer: str | None
+    :param limit: number of the longest overdue invoices to list
+    :type limit: int
+    :raises ModelRetry: if the customer is neither an ID nor an email address
+    :return: totals by days past due and the longest overdue invoices
+    :rtype: OverdueInvoices
+    """
+    try:
+        return await get_overdue_invoices_async(
+            customer, limit, session=ctx.deps.async_session
+        )
+    except ValueError as exc:
+        raise ModelRetry(str(exc)) from exc
+
+
+async def list_customer_invoices(
+    ctx: RunContext[MyDeps],
+    customer: str,
+    cursor: str | None = None,
+    page_size: int = LISTING_PAGE_SIZE,
+) -> CustomerInvoicePage | str:
+    """Lists a customer's invoices, most recently issued first, one page at a time.
+    Fetch the next page with next_cursor only if the question needs older invoices.
+
+    :param ctx: Context injected into chat
+    :type ctx: RunContext[MyDeps]
+    :param customer: customer ID or email address
+    :type customer: str
+    :param cursor: next_cursor of the previous page; omit for the first page
+    :type cursor: str | None
+    :param page_size: number of invoices per page
+    :type page_size: int
+    :raises ModelRetry: if the customer or cursor is not valid
+    :return: a page of invoices and the cursor of the next page
+    :rtype: CustomerInvoicePage | str
     """
-    conversion_rate = 0.85
-    amount_eur = amount_usd * conversion_rate
-    return round(amount_eur, 2)
+    try:
+        page = await list_customer_invoices_async(
+            customer, cursor, page_size, ctx.deps.async_session
+        )
+    except ValueError as exc:
+        raise ModelRetry(str(exc)) from exc
+    if page is None:
+        return f"No database record found for customer: {customer}"
+    return page
@@ -0,0 +1,245 @@
+"""Content-addressed on-disk cache of model responses.
+
+With ``temperature`` 0 the same model, system prompt, message history, tool
+definitions and settings produce the same response, so :class:`CachedModel`
+stores each response in a SQLite file under the SHA-256 of those inputs and
+replays it instead of calling the provider. Volatile fields (timestamps, run
+ids, provider ids, usage) are left out of the key and tool call ids are
+renumbered, so replayed runs hit the cache on every turn.
+
+Replayed responses report zero usage because no tokens were spent.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from typing import Any, Iterator
+
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter, ModelResponse
+from pydantic_ai.models import Model, ModelRequestParameters
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+from pydantic_ai.usage import RequestUsage
+from pydantic_core import to_jsonable_python
+
+from config import LLM_CACHE_MAX_BYTES, LLM_CACHE_PATH
+
+VOLATILE_KEYS = frozenset(
+    {
+        "timestamp",
+        "run_id",
+        "conversation_id",
+        "provider_response_id",
+        "provider_details",
+        "provider_url",
+        "usage",
+    }
+)
+
+bypass_cache: ContextVar[bool] = ContextVar("bypass_llm_cache", default=False)
+
+
+@contextmanager
+def bypass_llm_cache(bypass: bool = True) -> Iterator[None]:
+    """Skip the response cache for model requests made inside this block."""
+    token = bypass_cache.set(bypass)
+    try:
+        yield
+    finally:
+        bypass_cache.reset(token)
+
+
+def _canonical(value: Any, tool_call_ids: dict[str, str]) -> Any:
+    if isinstance(value, dict):
+        canonical = {}
+        for key, item in value.items():
+            if key in VOLATILE_KEYS:
+                continue
+            if key == "tool_call_id" and isinstance(item, str):
+                item = tool_call_ids.setdefault(item, f"call_{len(tool_call_ids)}")
+            canonical[key] = _canonical(item, tool_call_ids)
+        return canonical
+    if isinstance(value, list):
+        return [_canonical(item, tool_call_ids) for item in value]
+    return value
+
+
+def cache_key(
+    model_name: str,
+    messages: list[ModelMessage],
+    model_settings: ModelSettings | None,
+    model_request_parameters: ModelRequestParameters,
+) -> str:
+    """SHA-256 over everything that determines a temperature-0 response.
+
+    :param model_name: name of the wrapped model
+    :type model_name: str
+    :param messages: message history including system prompt
+    :type messages: list[ModelMessage]
+    :param model_settings: merged settings of the request
+    :type model_settings: ModelSettings | None
+    :param model_request_parameters: tool definitions and output mode
+    :type model_request_parameters: ModelRequestParameters
+    :return: hex digest
+    :rtype: str
+    """
+    payload = {
+        "model": model_name,
+        "messages": _canonical(
+            ModelMessagesTypeAdapter.dump_python(messages, mode="json"), {}
+        ),
+        "settings": to_jsonable_python(model_settings or {}),
+        "parameters": to_jsonable_python(model_request_parameters),
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ResponseStore:
+    """SQLite table of serialized responses with least-recently-used eviction."""
+
+    def __init__(
+        self, path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_MAX_BYTES
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS ix_responses_last_access "
+            "ON responses (last_access)"
+        )
+        self._db.commit()
+
+    def get(self, key: str) -> ModelResponse | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            self._db.execute(
+                "UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?",
+                (time.time(), key),
+            )
+            self._db.commit()
+            self.stats.hits += 1
+        return ModelMessagesTypeAdapter.validate_json(row[0])[0]
+
+    def put(self, key: str, model_name: str, response: ModelResponse) -> None:
+        blob = ModelMessagesTypeAdapter.dump_json([response])
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, response, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, blob, len(blob), now, now),
+            )
+            self.stats.stores += 1
+            self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Shrink to 90% so that eviction does not run on every insert.
+        excess = total - int(self.max_bytes * 0.9)
+        for key, size in self._db.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ).fetchall():
+            if excess <= 0:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            excess -= size
+            self.stats.evictions += 1
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+
+class CachedModel(WrapperModel):
+    """Wraps a model and replays stored responses for deterministic requests.
+
+    Requests are only cached when the effective temperature is 0; streamed
+    requests always go to the wrapped model.
+    """
+
+    def __init__(self, wrapped: Model, store: ResponseStore | None = None) -> None:
+        super().__init__(wrapped)
+        self.store = store or ResponseStore()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.store.stats
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        deterministic = (model_settings or {}).get("temperature") == 0
+        if bypass_cache.get() or not deterministic:
+            self.store.stats.bypassed += 1
+            return await super().request(
+                messages, model_settings, model_request_parameters
+            )
+
+        key = cache_key(
+            self.model_name, messages, model_settings, model_request_parameters
+        )
+        cached = self.store.get(key)
+        if cached is not None:
+            return replace(cached, usage=RequestUsage())
+
+        response = await super().request(
+            messages, model_settings, model_request_parameters
+        )
+        self.store.put(key, self.model_name, response)
+        return response
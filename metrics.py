@@ -0,0 +1,77 @@
+import bisect
+import math
+import statistics
+import threading
+from collections import deque
+
+
+def percentile(ordered: list[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list.
+
+    :param ordered: sorted values
+    :type ordered: list[float]
+    :param p: percentile between 0 and 100
+    :type p: float
+    :return: the value at that rank, or 0.0 for an empty list
+    :rtype: float
+    """
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(latencies: list[float]) -> dict[str, float]:
+    """Count, mean and p50/p95/p99 of latencies given in seconds, in ms."""
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+    }
+
+
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram plus a window of recent samples.
+
+    Buckets count every observation since start; percentiles are computed over
+    the last ``window`` observations.
+    """
+
+    def __init__(
+        self, buckets: tuple[float, ...] = DEFAULT_BUCKETS, window: int = 10_000
+    ) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.recent: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.total += seconds
+            self.recent.append(seconds)
+
+    def snapshot(self) -> dict:
+        """Cumulative bucket counts (``le`` in seconds), sum and recent percentiles."""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.total
+            recent = list(self.recent)
+        cumulative = 0
+        buckets = []
+        for bound, count in zip([*self.buckets, "+Inf"], counts):
+            cumulative += count
+            buckets.append({"le": bound, "count": cumulative})
+        return {
+            "buckets": buckets,
+            "count": cumulative,
+            "sum_seconds": total,
+            "recent": latency_summary(recent),
+        }
@@ -4,14 +4,11 @@ from typing import List
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent
 
-from ai_model import model
+from accounting import Accounting
+from ai_model import get_model
 from dependencies import MyDeps
 from planner_agent.prompt import planner_agent_prompt
-from planner_agent.tools import (
-    delegate_to_customer_detail_worker,
-    delegate_to_invoice_search_worker,
-    delegate_to_ticket_search_worker,
-)
+from tracing import Tracing
 
 
 class AgentNames(StrEnum):
@@ -39,14 +36,24 @@ class PlannerOutput(BaseModel):
     )
 
 
-planner_agent = Agent(
-    model,
-    system_prompt=planner_agent_prompt,
-    deps_type=MyDeps,
-    output_type=PlannerOutput,
-)
+def build_planner_agent() -> Agent:
+    # The delegate tools reference AgentNames, so they are imported here.
+    from planner_agent.tools import (
+        delegate_to_customer_detail_worker,
+        delegate_to_invoice_search_worker,
+        delegate_to_ticket_search_worker,
+    )
 
+    planner_agent = Agent(
+        get_model(),
+        name="planner",
+        capabilities=[Accounting("planner"), Tracing("planner")],
+        system_prompt=planner_agent_prompt,
+        deps_type=MyDeps,
+        output_type=PlannerOutput,
+    )
 
-planner_agent.tool(delegate_to_customer_detail_worker)
-planner_agent.tool(delegate_to_ticket_search_worker)
-planner_agent.tool(delegate_to_invoice_search_worker)
+    planner_agent.tool(delegate_to_customer_detail_worker)
+    planner_agent.tool(delegate_to_ticket_search_worker)
+    planner_agent.tool(delegate_to_invoice_search_worker)
+    return planner_agent
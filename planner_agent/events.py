@@ -0,0 +1,105 @@
+"""Progress events of a request, for callers that stream them to a user.
+
+Code deep inside a run (worker delegation, tool calls) reports progress with
+:func:`emit`. Events go to the listener installed with :func:`listen_progress`
+for the current context and are dropped when nobody listens.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+
+from pydantic_ai import Agent
+from pydantic_ai.messages import FunctionToolCallEvent
+
+
+@dataclass
+class WorkerStarted:
+    worker: str
+    instruction: str
+
+
+@dataclass
+class WorkerFinished:
+    worker: str
+    elapsed: float
+    error: str | None = None
+
+
+@dataclass
+class ToolCalled:
+    agent: str
+    tool_name: str
+    args: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class SummaryDelta:
+    """New characters of ``PlannerOutput.final_summary``."""
+
+    text: str
+
+
+@dataclass
+class OutputUpdated:
+    """The planner output as validated so far; fields may still be growing."""
+
+    output: Any
+
+
+@dataclass
+class RunFinished:
+    """The final, fully validated ``PlannerOutput``."""
+
+    output: Any
+
+
+ProgressEvent = (
+    WorkerStarted
+    | WorkerFinished
+    | ToolCalled
+    | SummaryDelta
+    | OutputUpdated
+    | RunFinished
+)
+
+progress_listener: ContextVar[Callable[[ProgressEvent], None] | None] = ContextVar(
+    "progress_listener", default=None
+)
+
+
+def emit(event: ProgressEvent) -> None:
+    listener = progress_listener.get()
+    if listener is not None:
+        listener(event)
+
+
+@contextmanager
+def listen_progress(listener: Callable[[ProgressEvent], None]) -> Iterator[None]:
+    """Send progress events emitted inside this block to ``listener``."""
+    token = progress_listener.set(listener)
+    try:
+        yield
+    finally:
+        progress_listener.reset(token)
+
+
+async def emit_tool_calls(agent_name: str, node, ctx) -> None:
+    """Run a ``CallToolsNode`` of an agent run, emitting a :class:`ToolCalled` per call.
+
+    :param agent_name: agent the node belongs to
+    :type agent_name: str
+    :param node: node yielded by ``Agent.iter``
+    :param ctx: ``ctx`` of the agent run
+    """
+    if not Agent.is_call_tools_node(node):
+        return
+    async with node.stream(ctx) as tool_events:
+        async for event in tool_events:
+            if isinstance(event, FunctionToolCallEvent):
+                emit(
+                    ToolCalled(
+                        agent_name, event.part.tool_name, event.part.args_as_dict()
+                    )
+                )
@@ -0,0 +1,212 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from agent_registry import PLANNER, get_agent
+from config import WORKER_TIMEOUT_SECONDS
+from dependencies import MyDeps
+from planner_agent.agent import AgentNames, PlannerOutput
+from planner_agent.events import SummaryDelta, emit
+from planner_agent.identifiers import Identifiers, is_pure_lookup
+from planner_agent.tools import (
+    delegate_to_customer_detail_worker,
+    delegate_to_invoice_search_worker,
+    delegate_to_ticket_search_worker,
+    run_worker,
+)
+
+WORKER_RESULTS_HEADER = (
+    "The workers have already looked up every identifier in the request. "
+    "Answer from their results below without delegating again:"
+)
+
+
+@dataclass
+class WorkerTask:
+    """One independent sub-task of a request, handled by a single worker."""
+
+    target_agent: AgentNames
+    tool_name: str
+    instruction: str
+
+
+@dataclass
+class WorkerResult:
+    task: WorkerTask
+    output: object | None = None
+    error: str | None = None
+    elapsed: float = 0.0
+
+    @property
+    def summary(self) -> str:
+        if self.error:
+            return f"{self.task.target_agent}: {self.error}"
+        details = getattr(self.output, "details", None) or self.output
+        return f"{self.task.target_agent}: {details}"
+
+
+def plan_worker_tasks(prompt: str, identifiers: Identifiers) -> list[WorkerTask]:
+    """Split a request into one task per identifier kind.
+
+    Invoices, tickets and customers are looked up independently, so their
+    workers can run at the same time. Each worker gets the original request
+    for context, e.g. so the invoice worker still converts to EUR.
+
+    :param prompt: free text user request
+    :type prompt: str
+    :param identifiers: identifiers found in the prompt
+    :type identifiers: Identifiers
+    :return: worker tasks, at most one per worker agent
+    :rtype: list[WorkerTask]
+    """
+    kinds = [
+        (
+            identifiers.invoice_numbers,
+            AgentNames.INVOICE_AGENT,
+            delegate_to_invoice_search_worker,
+            "invoice(s)",
+        ),
+        (
+            identifiers.ticket_numbers,
+            AgentNames.TICKET_AGENT,
+            delegate_to_ticket_search_worker,
+            "ticket(s)",
+        ),
+        (
+            identifiers.email_addresses,
+            AgentNames.CUSTOMER_DETAIL_AGENT,
+            delegate_to_customer_detail_worker,
+            "customer email(s)",
+        ),
+    ]
+    return [
+        WorkerTask(
+            target_agent=target_agent,
+            tool_name=delegate.__name__,
+            instruction=f"{prompt}\n\nOnly handle the {label}: {', '.join(keys)}",
+        )
+        for keys, target_agent, delegate, label in kinds
+        if keys
+    ]
+
+
+async def _run_task(task: WorkerTask, deps: MyDeps, timeout: float) -> WorkerResult:
+    start = time.perf_counter()
+    try:
+        output = await run_worker(
+            get_agent(task.target_agent), task.instruction, deps, timeout
+        )
+    except TimeoutError:
+        return WorkerResult(
+            task,
+            error=f"timed out after {timeout}s",
+            elapsed=time.perf_counter() - start,
+        )
+    except Exception as exc:
+        return WorkerResult(task, error=repr(exc), elapsed=time.perf_counter() - start)
+    return WorkerResult(task, output=output, elapsed=time.perf_counter() - start)
+
+
+async def run_workers(
+    tasks: list[WorkerTask],
+    deps: MyDeps,
+    timeout: float = WORKER_TIMEOUT_SECONDS,
+) -> list[WorkerResult]:
+    """Run worker tasks concurrently under the request's concurrency cap.
+
+    A failing or slow worker only affects its own result; the others still
+    complete.
+
+    :param tasks: independent worker tasks
+    :type tasks: list[WorkerTask]
+    :param deps: dependencies of the request
+    :type deps: MyDeps
+    :param timeout: per-worker timeout in seconds
+    :type timeout: float
+    :return: one result per task, in task order
+    :rtype: list[WorkerResult]
+    """
+    return await asyncio.gather(*(_run_task(task, deps, timeout) for task in tasks))
+
+
+def merge_results(results: list[WorkerResult]) -> PlannerOutput:
+    """Fold the worker results into a single planner output.
+
+    :param results: results of the fanned out workers
+    :type results: list[WorkerResult]
+    :return: combined planner output
+    :rtype: PlannerOutput
+    """
+    target_agents = {result.task.target_agent for result in results}
+    target_agent = target_agents.pop() if len(target_agents) == 1 else AgentNames.NONE
+    return PlannerOutput(
+        decision=(
+            f"Fan-out: {len(results)} independent sub-tasks were handled "
+            "by their workers concurrently."
+        ),
+        target_agent=target_agent,
+        tools_called=[result.task.tool_name for result in results],
+        final_summary="\n".join(result.summary for result in results),
+    )
+
+
+def planner_prompt(prompt: str, results: list[WorkerResult]) -> str:
+    """The request with the workers' results, for the planner to answer from.
+
+    :param prompt: free text user request
+    :type prompt: str
+    :param results: results of the fanned out workers
+    :type results: list[WorkerResult]
+    :return: prompt for the planner LLM
+    :rtype: str
+    """
+    lines = [f"- {result.summary}" for result in results]
+    return "\n".join([prompt, "", WORKER_RESULTS_HEADER, *lines])
+
+
+def _with_worker_tools(output: PlannerOutput, results: list[WorkerResult]):
+    tools_called = [result.task.tool_name for result in results]
+    return output.model_copy(
+        update={"tools_called": list(dict.fromkeys(tools_called + output.tools_called))}
+    )
+
+
+async def run_planner(prompt: str, deps: MyDeps) -> PlannerOutput:
+    return (await get_agent(PLANNER).run(prompt, deps=deps)).output
+
+
+async def try_fan_out(
+    prompt: str,
+    identifiers: Identifiers,
+    deps: MyDeps,
+    planner: Callable[[str, MyDeps], Awaitable[PlannerOutput]] = run_planner,
+) -> PlannerOutput | None:
+    """Answer a request that spans several workers, running them concurrently.
+
+    A pure lookup is answered by merging the worker results. Any other request
+    may need the results together, e.g. "is this invoice the reason for that
+    ticket?", so the planner LLM writes the answer from them, without having
+    to delegate the lookups one by one.
+
+    :param prompt: free text user request
+    :type prompt: str
+    :param identifiers: identifiers found in the prompt
+    :type identifiers: Identifiers
+    :param deps: dependencies of the request
+    :type deps: MyDeps
+    :param planner: runs the planner LLM on a prompt, e.g. streaming its output
+    :type planner: Callable[[str, MyDeps], Awaitable[PlannerOutput]]
+    :return: the answer, or None if there are fewer than two sub-tasks
+    :rtype: PlannerOutput | None
+    """
+    tasks = plan_worker_tasks(prompt, identifiers)
+    if len(tasks) < 2:
+        return None
+    results = await run_workers(tasks, deps)
+    if is_pure_lookup(prompt, identifiers):
+        output = merge_results(results)
+        emit(SummaryDelta(output.final_summary))
+        return output
+    output = await planner(planner_prompt(prompt, results), deps)
+    return _with_worker_tools(output, results)
@@ -0,0 +1,75 @@
+import re
+from dataclasses import dataclass, field
+
+from service_layer.invoice_service import INVOICE_NUMBER_PATTERN
+from service_layer.ticket_service import TICKET_NUMBER_PATTERN
+
+
+def _unanchored(pattern: str) -> re.Pattern:
+    """Turn a full-match field pattern into one that finds identifiers inside free text."""
+    return re.compile(r"\b" + pattern.removeprefix("^").removesuffix("$") + r"\b")
+
+
+INVOICE_RE = _unanchored(INVOICE_NUMBER_PATTERN)
+TICKET_RE = _unanchored(TICKET_NUMBER_PATTERN)
+EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+WORD_RE = re.compile(r"[a-z']+")
+
+# Words that may surround an identifier in a plain lookup. Anything outside this
+# vocabulary (e.g. "disputing", "convert", "EUR") means the request needs reasoning
+# and is handed to the planner LLM.
+LOOKUP_VOCABULARY = frozenset(
+    """
+    a about address all an and any can check customer customers data detail details
+    email fetch find for get give i info infos information invoice invoices is it look
+    lookup me need of on please pull record records retrieve show status tell the
+    ticket tickets to up what what's whats with you
+    """.split()
+)
+
+
+@dataclass
+class Identifiers:
+    invoice_numbers: list[str] = field(default_factory=list)
+    ticket_numbers: list[str] = field(default_factory=list)
+    email_addresses: list[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.invoice_numbers or self.ticket_numbers or self.email_addresses)
+
+
+def _unique(values: list[str]) -> list[str]:
+    return list(dict.fromkeys(values))
+
+
+def extract_identifiers(prompt: str) -> Identifiers:
+    """Pull invoice numbers, ticket numbers and email addresses out of a prompt.
+
+    :param prompt: free text user request
+    :type prompt: str
+    :return: identifiers in order of appearance, without duplicates
+    :rtype: Identifiers
+    """
+    return Identifiers(
+        invoice_numbers=_unique(INVOICE_RE.findall(prompt)),
+        ticket_numbers=_unique(TICKET_RE.findall(prompt)),
+        email_addresses=_unique(EMAIL_RE.findall(prompt)),
+    )
+
+
+def is_pure_lookup(prompt: str, identifiers: Identifiers) -> bool:
+    """Check whether a prompt asks for nothing more than the records it names.
+
+    :param prompt: free text user request
+    :type prompt: str
+    :param identifiers: identifiers found in the prompt
+    :type identifiers: Identifiers
+    :return: True if every remaining word is plain lookup vocabulary
+    :rtype: bool
+    """
+    if not identifiers:
+        return False
+    remainder = prompt
+    for pattern in (INVOICE_RE, TICKET_RE, EMAIL_RE):
+        remainder = pattern.sub(" ", remainder)
+    return all(word in LOOKUP_VOCABULARY for word in WORD_RE.findall(remainder.lower()))
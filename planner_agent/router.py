@@ -0,0 +1,283 @@
+import asyncio
+import atexit
+import threading
+from dataclasses import dataclass, field
+from functools import partial
+from typing import AsyncIterator, Iterator
+
+from dependencies import MyDeps, run_scope
+from planner_agent.agent import AgentNames, PlannerOutput
+from planner_agent.events import (
+    ProgressEvent,
+    RunFinished,
+    SummaryDelta,
+    ToolCalled,
+    emit,
+    listen_progress,
+)
+from planner_agent.fan_out import run_planner, try_fan_out
+from planner_agent.identifiers import Identifiers, extract_identifiers, is_pure_lookup
+from planner_agent.streaming import stream_planner
+from service_layer.customer_details import (
+    get_customer_info_many,
+    get_customer_info_many_async,
+)
+from service_layer.invoice_service import (
+    get_invoice_infos_many,
+    get_invoice_infos_many_async,
+)
+from service_layer.ticket_service import (
+    get_ticket_infos_many,
+    get_ticket_infos_many_async,
+)
+
+@dataclass
+class RouterStats:
+    """Counts how many prompts the fast path answered without the planner LLM."""
+
+    hits: int = 0
+    misses: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @property
+    def total(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.total if self.total else 0.0
+
+    @property
+    def miss_rate(self) -> float:
+        return self.misses / self.total if self.total else 0.0
+
+    def reset(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+router_stats = RouterStats()
+
+
+def _target_agent(identifiers: Identifiers) -> AgentNames:
+    kinds = [
+        (identifiers.invoice_numbers, AgentNames.INVOICE_AGENT),
+        (identifiers.ticket_numbers, AgentNames.TICKET_AGENT),
+        (identifiers.email_addresses, AgentNames.CUSTOMER_DETAIL_AGENT),
+    ]
+    present = [name for values, name in kinds if values]
+    return present[0] if len(present) == 1 else AgentNames.NONE
+
+
+def _lookups(identifiers: Identifiers) -> list[tuple]:
+    """(tool name, not-found label, keys, sync lookup, async lookup) per identifier kind.
+
+    Each lookup resolves all keys of its kind in one query.
+    """
+    return [
+        (
+            get_invoice_infos_many.__name__,
+            "Invoice ID",
+            identifiers.invoice_numbers,
+            get_invoice_infos_many,
+            get_invoice_infos_many_async,
+        ),
+        (
+            get_ticket_infos_many.__name__,
+            "Ticket ID",
+            identifiers.ticket_numbers,
+            get_ticket_infos_many,
+            get_ticket_infos_many_async,
+        ),
+        (
+            get_customer_info_many.__name__,
+            "Customer email",
+            identifiers.email_addresses,
+            get_customer_info_many,
+            get_customer_info_many_async,
+        ),
+    ]
+
+
+def _format_lookup(label: str, key: str, details) -> str:
+    if not details:
+        return f"No database record found for {label}: {key}"
+    return details.model_dump_json()
+
+
+def _lookup_output(identifiers: Identifiers, tools_called, lines) -> PlannerOutput:
+    return PlannerOutput(
+        decision="Fast path: the request is a plain lookup of known identifiers.",
+        target_agent=_target_agent(identifiers),
+        tools_called=tools_called,
+        final_summary="\n".join(lines),
+    )
+
+
+def answer_lookup(identifiers: Identifiers, session=None) -> PlannerOutput:
+    """Answer a pure lookup straight from the service layer.
+
+    :param identifiers: identifiers to resolve
+    :type identifiers: Identifiers
+    :param session: the run's session, if any
+    :type session: Session | None
+    :return: planner shaped output built without any LLM call
+    :rtype: PlannerOutput
+    """
+    tools_called = []
+    lines = []
+    for tool_name, label, keys, lookup, _ in _lookups(identifiers):
+        if not keys:
+            continue
+        tools_called.append(tool_name)
+        results = lookup(keys, session)
+        lines.extend(map(partial(_format_lookup, label), keys, results))
+    return _lookup_output(identifiers, tools_called, lines)
+
+
+async def answer_lookup_async(identifiers: Identifiers, session=None) -> PlannerOutput:
+    """Async counterpart of :func:`answer_lookup`."""
+    tools_called = []
+    lines = []
+    for tool_name, label, keys, _, lookup in _lookups(identifiers):
+        if not keys:
+            continue
+        tools_called.append(tool_name)
+        results = await lookup(keys, session)
+        lines.extend(map(partial(_format_lookup, label), keys, results))
+    return _lookup_output(identifiers, tools_called, lines)
+
+
+def _fast_path_identifiers(prompt: str) -> Identifiers | None:
+    identifiers = extract_identifiers(prompt)
+    hit = is_pure_lookup(prompt, identifiers)
+    router_stats.record(hit=hit)
+    return identifiers if hit else None
+
+
+def try_fast_path(prompt: str, session=None) -> PlannerOutput | None:
+    """Answer the prompt deterministically if it is a pure lookup.
+
+    :param prompt: free text user request
+    :type prompt: str
+    :param session: the run's session, if any
+    :type session: Session | None
+    :return: the answer, or None if the planner LLM is needed
+    :rtype: PlannerOutput | None
+    """
+    identifiers = _fast_path_identifiers(prompt)
+    if identifiers is None:
+        return None
+    return answer_lookup(identifiers, session)
+
+
+async def try_fast_path_async(prompt: str, session=None) -> PlannerOutput | None:
+    """Async counterpart of :func:`try_fast_path`."""
+    identifiers = _fast_path_identifiers(prompt)
+    if identifiers is None:
+        return None
+    return await answer_lookup_async(identifiers, session)
+
+
+async def _run_agents(prompt: str, deps: MyDeps) -> PlannerOutput:
+    """Fan out to the workers up front when possible, else ask the planner LLM."""
+    output = await try_fan_out(prompt, extract_identifiers(prompt), deps)
+    if output is None:
+        output = await run_planner(prompt, deps)
+    return output
+
+
+# One event loop for every sync call, so the async engine's pooled connections
+# stay bound to the loop they were opened on.
+_runner = asyncio.Runner()
+atexit.register(_runner.close)
+
+
+def route(prompt: str, deps: MyDeps) -> PlannerOutput:
+    """Run a request through the fast path, falling back to the agents.
+
+    :param prompt: free text user request
+    :type prompt: str
+    :param deps: dependencies handed to the agents
+    :type deps: MyDeps
+    :return: planner output
+    :rtype: PlannerOutput
+    """
+    # One run scope for the whole request: a single session, leak check and
+    # trace, whichever way the request is answered.
+    return _runner.run(route_async(prompt, deps))
+
+
+async def route_async(prompt: str, deps: MyDeps) -> PlannerOutput:
+    """Async counterpart of :func:`route`."""
+    async with run_scope(deps):
+        output = await try_fast_path_async(prompt, deps.async_session)
+        if output is None:
+            output = await _run_agents(prompt, deps)
+    return output
+
+
+async def _route_streaming(prompt: str, deps: MyDeps) -> PlannerOutput:
+    async with run_scope(deps):
+        output = await try_fast_path_async(prompt, deps.async_session)
+        if output is not None:
+            for tool_name in output.tools_called:
+                emit(ToolCalled("router", tool_name))
+            emit(SummaryDelta(output.final_summary))
+            return output
+        identifiers = extract_identifiers(prompt)
+        output = await try_fan_out(prompt, identifiers, deps, stream_planner)
+        if output is None:
+            output = await stream_planner(prompt, deps)
+        return output
+
+
+async def route_stream(prompt: str, deps: MyDeps) -> AsyncIterator[ProgressEvent]:
+    """Streaming counterpart of :func:`route_async`.
+
+    Yields progress events (worker started/finished, tool called) while the
+    request runs and ``final_summary`` text as soon as it is generated. Fast
+    path and merged fan-out answers arrive as a single :class:`SummaryDelta`.
+    The last event is always :class:`RunFinished` with the validated output.
+
+    :param prompt: free text user request
+    :type prompt: str
+    :param deps: dependencies handed to the agents
+    :type deps: MyDeps
+    :return: progress events in the order they happened
+    :rtype: AsyncIterator[ProgressEvent]
+    """
+    events: asyncio.Queue[ProgressEvent | None] = asyncio.Queue()
+    with listen_progress(events.put_nowait):
+        task = asyncio.create_task(_route_streaming(prompt, deps))
+    task.add_done_callback(lambda _: events.put_nowait(None))
+    try:
+        while (event := await events.get()) is not None:
+            yield event
+        yield RunFinished(task.result())
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+async def _next_event(events: AsyncIterator[ProgressEvent]) -> ProgressEvent | None:
+    return await anext(events, None)
+
+
+def route_stream_sync(prompt: str, deps: MyDeps) -> Iterator[ProgressEvent]:
+    """Blocking iterator over :func:`route_stream`, on the router's event loop."""
+    events = route_stream(prompt, deps)
+    try:
+        while (event := _runner.run(_next_event(events))) is not None:
+            yield event
+    finally:
+        _runner.run(events.aclose())
@@ -0,0 +1,44 @@
+from pydantic_ai import Agent
+
+from agent_registry import PLANNER, get_agent
+from dependencies import MyDeps
+from planner_agent.agent import PlannerOutput
+from planner_agent.events import OutputUpdated, SummaryDelta, emit, emit_tool_calls
+
+
+async def _stream_model_request(node, ctx, summary: str) -> str:
+    async with node.stream(ctx) as stream:
+        # Partial outputs are validated as they arrive; ones that do not validate
+        # yet (e.g. a required field still missing) are skipped by pydantic_ai.
+        async for partial in stream.stream_output(debounce_by=None):
+            emit(OutputUpdated(partial))
+            text = partial.final_summary or ""
+            if text.startswith(summary) and len(text) > len(summary):
+                emit(SummaryDelta(text[len(summary) :]))
+                summary = text
+    return summary
+
+
+async def stream_planner(prompt: str, deps: MyDeps) -> PlannerOutput:
+    """Run the planner LLM, streaming its output as progress events.
+
+    Emits :class:`ToolCalled` for every delegation, :class:`OutputUpdated` for
+    each partially validated ``PlannerOutput`` and :class:`SummaryDelta` for
+    new ``final_summary`` text.
+
+    :param prompt: free text user request
+    :type prompt: str
+    :param deps: dependencies of the request
+    :type deps: MyDeps
+    :return: the fully validated planner output
+    :rtype: PlannerOutput
+    """
+    planner_agent = get_agent(PLANNER)
+    summary = ""
+    async with planner_agent.iter(prompt, deps=deps) as run:
+        async for node in run:
+            if Agent.is_model_request_node(node):
+                summary = await _stream_model_request(node, run.ctx, summary)
+            else:
+                await emit_tool_calls(planner_agent.name, node, run.ctx)
+    return run.result.output
@@ -1,9 +1,71 @@
-from pydantic_ai import RunContext
+import asyncio
+import time
 
-from customer_detail_agent.agent import customer_detail_agent
+from pydantic_ai import Agent, RunContext
+
+from agent_registry import get_agent
+from config import WORKER_TIMEOUT_SECONDS
 from dependencies import MyDeps
-from invoice_agent.agent import invoice_agent
-from ticket_agent.agent import ticket_agent
+from planner_agent.agent import AgentNames
+from planner_agent.events import (
+    WorkerFinished,
+    WorkerStarted,
+    emit,
+    emit_tool_calls,
+    progress_listener,
+)
+
+
+async def _run_agent(agent: Agent, instruction: str, deps: MyDeps):
+    if progress_listener.get() is None:
+        return (await agent.run(instruction, deps=deps)).output
+    async with agent.iter(instruction, deps=deps) as run:
+        async for node in run:
+            await emit_tool_calls(agent.name, node, run.ctx)
+    return run.result.output
+
+
+async def run_worker(
+    agent: Agent,
+    instruction: str,
+    deps: MyDeps,
+    timeout: float = WORKER_TIMEOUT_SECONDS,
+):
+    """Run a worker agent within the request's concurrency cap and a timeout.
+
+    :param agent: worker agent to run
+    :type agent: Agent
+    :param instruction: prompt for the worker
+    :type instruction: str
+    :param deps: dependencies of the request, shared with the worker
+    :type deps: MyDeps
+    :param timeout: seconds before the worker run is cancelled
+    :type timeout: float
+    :raises TimeoutError: if the worker does not finish in time
+    :return: output from the worker agent
+    """
+    async with deps.worker_slots:
+        emit(WorkerStarted(agent.name, instruction))
+        start = time.perf_counter()
+        try:
+            output = await asyncio.wait_for(
+                _run_agent(agent, instruction, deps), timeout
+            )
+        except BaseException as exc:
+            emit(WorkerFinished(agent.name, time.perf_counter() - start, repr(exc)))
+            raise
+        emit(WorkerFinished(agent.name, time.perf_counter() - start))
+    return output
+
+
+async def _delegate(worker: AgentNames, instruction: str, deps: MyDeps):
+    try:
+        return await run_worker(get_agent(worker), instruction, deps)
+    except TimeoutError:
+        return f"Worker did not answer within {WORKER_TIMEOUT_SECONDS}s"
+    except Exception as exc:
+        # Only this delegation fails; the planner keeps the other results.
+        return f"Worker failed: {exc!r}"
 
 
 async def delegate_to_customer_detail_worker(
@@ -23,14 +85,15 @@ async def delegate_to_customer_detail_worker(
     else:
         instruction = f"Retrieve details for customer ID: {customer_id}"
     # The planner hands over the context to the worker
-    result = await customer_detail_agent.run(instruction, deps=ctx.deps)
-    return result.output
+    return await _delegate(AgentNames.CUSTOMER_DETAIL_AGENT, instruction, ctx.deps)
 
 
 async def delegate_to_ticket_search_worker(
     ctx: RunContext[MyDeps], ticket_number: str
 ) -> str:
     """Delegates the task of searching for a ticket to a specialized worker.
+    This worker also counts tickets by status, customer or period,
+    and lists a customer's tickets, newest first.
 
     :param ctx: context injected into chat
     :type ctx: RunContext[MyDeps]
@@ -40,15 +103,16 @@ async def delegate_to_ticket_search_worker(
     :rtype: str
     """
     # The planner hands over the context to the worker
-    result = await ticket_agent.run(ticket_number, deps=ctx.deps)
-    return result.output
+    return await _delegate(AgentNames.TICKET_AGENT, ticket_number, ctx.deps)
 
 
 async def delegate_to_invoice_search_worker(
     ctx: RunContext[MyDeps], invoice_number: str
 ) -> str:
     """Delegates the task of searching for an invoice starting with INV- to a specialized worker.
-    This worker also converts currency from USD to EUR if needed.
+    This worker also converts invoice amounts into EUR or other currencies if needed,
+    reports what a customer owes and which invoices are overdue,
+    and lists a customer's invoices, most recent first.
 
     :param ctx: context injected into chat
     :type ctx: RunContext[MyDeps]
@@ -58,5 +122,4 @@ async def delegate_to_invoice_search_worker(
     :rtype: str
     """
     # The planner hands over the context to the worker
-    result = await invoice_agent.run(invoice_number, deps=ctx.deps)
-    return result.output
+    return await _delegate(AgentNames.INVOICE_AGENT, invoice_number, ctx.deps)
@@ -1,5 +1,6 @@
 import random
-from datetime import timedelta
+from datetime import date, timedelta
+from decimal import Decimal
 
 from faker import Faker
 from sqlalchemy.orm import Session
@@ -7,17 +8,46 @@ from sqlalchemy.orm import Session
 from database import (
     Customer,
     CustomerDetail,
+    FxRate,
     Invoice,
     Ticket,
     TicketStatus,
-    engine,
+    get_engine,
 )
 
 fake = Faker()
 
+# Units per euro the synthetic rates start from.
+SYNTHETIC_UNITS_PER_EUR = {"CHF": 0.95, "GBP": 0.86, "JPY": 160.0, "USD": 1.08}
+
+
+def synthetic_fx_rates(start: date, days: int, seed: int = 0) -> list[dict]:
+    """Made-up daily rates per euro on business days, as a random walk.
+
+    They let conversions run on a seeded database; load real ones with
+    ``python -m service_layer.fx_rates eurofxref-hist.csv``.
+    """
+    rng = random.Random(seed)
+    units = dict(SYNTHETIC_UNITS_PER_EUR)
+    rows = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        if day.weekday() >= 5:
+            continue
+        for currency, value in units.items():
+            units[currency] = value * (1 + rng.gauss(0, 0.004))
+            rows.append(
+                {
+                    "rate_date": day,
+                    "currency": currency,
+                    "units_per_eur": Decimal(f"{units[currency]:.6f}"),
+                }
+            )
+    return rows
+
 
 def seed_data(num_tickets=1000, num_invoices=500):
-    session = Session(bind=engine)
+    session = Session(bind=get_engine())
 
     # 1. Create Customers & Their Details
     print("Generating 200 customers and their details...")
@@ -74,9 +104,18 @@ def seed_data(num_tickets=1000, num_invoices=500):
         )
         invoices.append(inv)
 
+    # 4. Create exchange rates covering the invoice dates
+    print("Generating synthetic exchange rates...")
+    start = date(date.today().year - 1, 12, 1)
+    rates = [
+        FxRate(**row)
+        for row in synthetic_fx_rates(start, (date.today() - start).days + 1)
+    ]
+
     # Final batch add and commit
     session.add_all(tickets)
     session.add_all(invoices)
+    session.add_all(rates)
     session.commit()
     print("Seeding Complete!")
 
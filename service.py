@@ -0,0 +1,244 @@
+"""Long-lived ASGI service in front of the planner.
+
+The agents, the model client, the async engine, the fuzzy customer index, the
+similar-ticket index and the exchange rate table are built once at startup and
+shared by all requests; each request gets its own ``MyDeps``. Requests are
+not authenticated, so ``db_name`` and ``is_admin`` come from the server's
+configuration (``SERVICE_DB_NAME``, ``SERVICE_IS_ADMIN``), never from the body.
+
+Endpoints::
+
+    POST /route            {"prompt": ...}
+    GET  /metrics/latency  latency histogram of /route
+    GET  /healthz
+
+At most ``SERVICE_MAX_CONCURRENCY`` runs execute at once and up to
+``SERVICE_MAX_QUEUE`` more wait for a slot; beyond that requests get 503. On
+shutdown new requests get 503 while in-flight runs are drained for up to
+``SERVICE_DRAIN_TIMEOUT_SECONDS``.
+
+Run with any ASGI server, e.g. ``uvicorn service:app``.
+"""
+
+import asyncio
+import json
+import logging
+import time
+
+from sqlalchemy import text
+
+from agent_registry import AGENT_FACTORIES, get_agent
+from config import (
+    SERVICE_DB_NAME,
+    SERVICE_DRAIN_TIMEOUT_SECONDS,
+    SERVICE_IS_ADMIN,
+    SERVICE_MAX_CONCURRENCY,
+    SERVICE_MAX_QUEUE,
+)
+from database import get_async_engine
+from dependencies import MyDeps
+from metrics import LatencyHistogram
+from planner_agent.router import route_async
+from service_layer.customer_search import load_customer_index_async
+from service_layer.fx_rates import load_fx_rates_async
+from service_layer.ticket_similarity import refresh_ticket_index_async
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+# Settings of the server that a request body must not try to choose.
+SERVER_FIELDS = ("db_name", "is_admin")
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class SupportService:
+    """ASGI application handling lifespan and the three endpoints."""
+
+    def __init__(
+        self,
+        max_concurrency: int = SERVICE_MAX_CONCURRENCY,
+        max_queue: int = SERVICE_MAX_QUEUE,
+        drain_timeout: float = SERVICE_DRAIN_TIMEOUT_SECONDS,
+        db_name: str = SERVICE_DB_NAME,
+        is_admin: bool = SERVICE_IS_ADMIN,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.drain_timeout = drain_timeout
+        self.db_name = db_name
+        self.is_admin = is_admin
+        self.latency = LatencyHistogram()
+        self.rejected = 0
+        self.failed = 0
+        self.pending = 0
+        self.draining = False
+        self._slots: asyncio.Semaphore | None = None
+        self._idle: asyncio.Event | None = None
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def startup(self) -> None:
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        for name in AGENT_FACTORIES:
+            get_agent(name)
+        # Open the first pooled connection now instead of on the first request.
+        async with get_async_engine().connect() as connection:
+            await connection.execute(text("SELECT 1"))
+        # Build the fuzzy customer index now; tools consult it on every miss.
+        await load_customer_index_async()
+        # Load or build the similar-ticket index rather than on first use.
+        await refresh_ticket_index_async()
+        await load_fx_rates_async()
+
+    async def shutdown(self) -> None:
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.drain_timeout)
+        except TimeoutError:
+            logger.warning(
+                "Shutting down with %d runs still in flight after %.0fs",
+                self.pending,
+                self.drain_timeout,
+            )
+        await get_async_engine().dispose()
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as exc:
+                    await send(
+                        {"type": "lifespan.startup.failed", "message": repr(exc)}
+                    )
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send) -> None:
+        endpoints = {
+            ("POST", "/route"): self._route,
+            ("GET", "/metrics/latency"): self._latency,
+            ("GET", "/healthz"): self._health,
+        }
+        handler = endpoints.get((scope["method"], scope["path"]))
+        headers = {}
+        try:
+            if handler is None:
+                raise HTTPError(404, "not found")
+            status, body = await handler(receive)
+        except HTTPError as exc:
+            status, body = exc.status, {"error": exc.message}
+            if status == 503:
+                headers["retry-after"] = "1"
+        await _send_json(send, status, body, headers)
+
+    async def _health(self, receive) -> tuple[int, dict]:
+        if self.draining:
+            raise HTTPError(503, "draining")
+        return 200, {"status": "ok", "pending": self.pending}
+
+    async def _latency(self, receive) -> tuple[int, dict]:
+        return 200, {
+            "route": self.latency.snapshot(),
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
+
+    async def _route(self, receive) -> tuple[int, dict]:
+        if self.draining:
+            raise HTTPError(503, "shutting down")
+        if self.pending >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            raise HTTPError(503, "too many requests in flight")
+        self.pending += 1
+        self._idle.clear()
+        try:
+            return await self._run(await _read_json(receive))
+        finally:
+            self.pending -= 1
+            if self.pending == 0:
+                self._idle.set()
+
+    async def _run(self, payload: dict) -> tuple[int, dict]:
+        prompt = payload.get("prompt")
+        if not isinstance(prompt, str) or not prompt.strip():
+            raise HTTPError(400, "'prompt' must be a non-empty string")
+        chosen = [name for name in SERVER_FIELDS if name in payload]
+        if chosen:
+            raise HTTPError(400, f"{', '.join(chosen)} cannot be set by the request")
+        deps = MyDeps(db_name=self.db_name, is_admin=self.is_admin)
+        start = time.perf_counter()
+        try:
+            async with self._slots:
+                output = await route_async(prompt, deps)
+        except Exception as exc:
+            self.failed += 1
+            logger.exception("Run %s failed", deps.run_id)
+            raise HTTPError(500, "internal error") from exc
+        finally:
+            self.latency.observe(time.perf_counter() - start)
+        return 200, {
+            "run_id": deps.run_id,
+            "output": output.model_dump(mode="json"),
+            "usage": deps.usage.to_dict(),
+        }
+
+
+async def _read_json(receive) -> dict:
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise HTTPError(400, "client disconnected")
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_BYTES:
+            raise HTTPError(413, "request body too large")
+        if not message.get("more_body"):
+            break
+    try:
+        payload = json.loads(body)
+    except json.JSONDecodeError as exc:
+        raise HTTPError(400, f"invalid JSON: {exc}") from exc
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "expected a JSON object")
+    return payload
+
+
+async def _send_json(send, status: int, body: dict, headers: dict) -> None:
+    encoded = json.dumps(body).encode()
+    raw_headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(encoded)).encode()),
+        *((name.encode(), value.encode()) for name, value in headers.items()),
+    ]
+    await send(
+        {"type": "http.response.start", "status": status, "headers": raw_headers}
+    )
+    await send({"type": "http.response.body", "body": encoded})
+
+
+app = SupportService()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="127.0.0.1", port=8000)
@@ -0,0 +1,521 @@
+"""Ticket and invoice aggregates computed by the database.
+
+"How much does this customer owe", "how many open tickets this month" and
+"which invoices are overdue" have answers of a few numbers, so the ``SUM``,
+``COUNT`` and ``GROUP BY`` run in SQL and only the totals come back, in
+small models that tools hand to the model as they are. Lists of groups and
+invoices are capped, but totals always cover every matching row.
+
+Invoices carry no payment status yet: every invoice counts as unpaid (see
+:func:`service_layer.customer_360.open_invoice_filter`) and as overdue once
+its due date has passed. Amounts are in ``INVOICE_CURRENCY``.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import Select, case, func, or_, select
+from sqlalchemy.orm import Session
+
+from config import (
+    ANALYTICS_AGING_DAYS,
+    ANALYTICS_MAX_GROUPS,
+    ANALYTICS_OVERDUE_LIMIT,
+    INVOICE_CURRENCY,
+)
+from database import Customer, Invoice, Ticket
+from db_session import async_session_scope, session_scope
+from service_layer.customer_360 import open_invoice_filter
+from service_layer.customer_details import customer_filter
+from service_layer.invoice_service import INVOICE_NUMBER_PATTERN
+from service_layer.ticket_search import parse_status
+from tracing import traced
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+PERIODS = (
+    "today",
+    "this_week",
+    "this_month",
+    "last_month",
+    "this_year",
+    "last_30_days",
+)
+# strftime format on SQLite and to_char format elsewhere, giving the same keys.
+DATE_GROUPS = {"day": ("%Y-%m-%d", "YYYY-MM-DD"), "month": ("%Y-%m", "YYYY-MM")}
+GROUPS = ("status", "customer", *DATE_GROUPS)
+
+
+class GroupCount(BaseModel):
+    key: str = Field(
+        description="The status, customer email, day (YYYY-MM-DD) or month (YYYY-MM)."
+    )
+    count: int = Field(description="Number of tickets in the group.")
+
+
+class TicketCounts(BaseModel):
+    total: int = Field(description="Number of tickets matching the filters.")
+    since: date | None = Field(description="First creation day counted, if limited.")
+    until: date | None = Field(
+        description="Day after the last creation day counted, if limited."
+    )
+    groups: list[GroupCount] = Field(
+        description="Counts per group, largest first; days and months latest first."
+    )
+    more_groups: int = Field(description="Groups left out of the list.")
+
+
+class CustomerBalance(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    customer_id: int = Field(description="Customer ID")
+    name: str = Field(description="The customer's full name.")
+    email: str = Field(description="The customer's contact email.")
+    currency: str = Field(description="Currency of the amounts.")
+    invoice_count: int = Field(description="Number of unpaid invoices.")
+    balance: float = Field(description="Total owed over all unpaid invoices.")
+    overdue_count: int = Field(description="Unpaid invoices past their due date.")
+    overdue_amount: float = Field(description="Total of the overdue invoices.")
+    oldest_overdue_due_date: datetime | None = Field(
+        description="Due date of the longest overdue invoice."
+    )
+    next_due_date: datetime | None = Field(
+        description="Earliest due date still to come."
+    )
+
+
+class AgingBucket(BaseModel):
+    days_overdue: str = Field(description="Range of days past due, e.g. 31-60.")
+    count: int = Field(description="Number of invoices.")
+    amount: float = Field(description="Total of the invoices.")
+
+
+class OverdueInvoice(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    invoice_number: str = Field(
+        pattern=INVOICE_NUMBER_PATTERN, description="The invoice number."
+    )
+    customer_email: str = Field(description="The customer's contact email.")
+    amount: float = Field(description="The total amount due on the invoice.")
+    due_date: datetime = Field(description="When the payment was due.")
+    days_overdue: int = Field(description="Days since the due date.")
+
+
+class OverdueInvoices(BaseModel):
+    as_of: datetime = Field(description="Invoices due before this are overdue.")
+    currency: str = Field(description="Currency of the amounts.")
+    count: int = Field(description="Number of overdue invoices.")
+    amount: float = Field(description="Total of the overdue invoices.")
+    aging: list[AgingBucket] = Field(
+        description="Overdue invoices by days past due, most recent first."
+    )
+    oldest: list[OverdueInvoice] = Field(
+        description="The longest overdue invoices, oldest first."
+    )
+
+
+def period_range(period: str, today: date) -> tuple[date, date]:
+    """First day and the day after the last day of a named period.
+
+    :param period: one of :data:`PERIODS`, e.g. "this_month"
+    :type period: str
+    :param today: the day the period is relative to
+    :type today: date
+    :raises ValueError: if ``period`` is not one of :data:`PERIODS`
+    :return: ``(since, until)``, ``until`` excluded
+    :rtype: tuple[date, date]
+    """
+    month = today.replace(day=1)
+    next_month = (month + timedelta(days=31)).replace(day=1)
+    ranges = {
+        "today": (today, today + timedelta(days=1)),
+        "this_week": (
+            today - timedelta(days=today.weekday()),
+            today + timedelta(days=7 - today.weekday()),
+        ),
+        "this_month": (month, next_month),
+        "last_month": ((month - timedelta(days=1)).replace(day=1), month),
+        "this_year": (date(today.year, 1, 1), date(today.year + 1, 1, 1)),
+        "last_30_days": (today - timedelta(days=29), today + timedelta(days=1)),
+    }
+    if period not in ranges:
+        raise ValueError(f"Unknown period {period!r}; use one of {', '.join(PERIODS)}")
+    return ranges[period]
+
+
+def _date_key(column, group_by: str, dialect_name: str):
+    sqlite_format, sql_format = DATE_GROUPS[group_by]
+    if dialect_name == "sqlite":
+        return func.strftime(sqlite_format, column)
+    return func.to_char(column, sql_format)
+
+
+def ticket_counts_query(
+    dialect_name: str,
+    status: str | None = None,
+    customer: str | None = None,
+    since: date | None = None,
+    until: date | None = None,
+    group_by: str | None = None,
+) -> Select:
+    """Count tickets, optionally per group, in one statement.
+
+    Every row carries the overall ``total`` and the number of groups
+    (``group_count``) as window aggregates, so capping the groups at
+    ``ANALYTICS_MAX_GROUPS`` needs no second query. Without ``group_by``
+    the statement returns one row with the total only.
+
+    :param dialect_name: ``sqlite``, ``postgresql`` or any other backend
+    :type dialect_name: str
+    :param status: only tickets with this status: Open, Pending, Resolved or Closed
+    :type status: str | None
+    :param customer: only tickets of this customer ID or email address
+    :type customer: str | None
+    :param since: only tickets created on or after this day
+    :type since: date | None
+    :param until: only tickets created before this day
+    :type until: date | None
+    :param group_by: one of :data:`GROUPS`
+    :type group_by: str | None
+    :raises ValueError: if a filter or ``group_by`` is not valid
+    :return: statement selecting ``key``, ``count``, ``total`` and ``group_count``
+    :rtype: Select
+    """
+    filters = []
+    ticket_status = parse_status(status)
+    if ticket_status is not None:
+        filters.append(Ticket.status == ticket_status)
+    condition = customer_filter(Ticket.customer_id, customer)
+    if condition is not None:
+        filters.append(condition)
+    if since is not None:
+        filters.append(Ticket.created_at >= since)
+    if until is not None:
+        filters.append(Ticket.created_at < until)
+    if group_by is None:
+        return select(func.count().label("total")).select_from(Ticket).where(*filters)
+    if group_by not in GROUPS:
+        known = ", ".join(GROUPS)
+        raise ValueError(f"Cannot group by {group_by!r}; use one of {known}")
+
+    if group_by == "status":
+        key = Ticket.status
+    elif group_by == "customer":
+        key = Customer.email
+    else:
+        key = _date_key(Ticket.created_at, group_by, dialect_name)
+    # Grouped in an outer query: the date format is a bound parameter, and
+    # PostgreSQL does not match two occurrences of it as the same expression.
+    keyed = select(key.label("key")).select_from(Ticket).where(*filters)
+    if group_by == "customer":
+        keyed = keyed.join(Customer, Ticket.customer_id == Customer.id)
+    keyed = keyed.subquery()
+    count = func.count()
+    order = keyed.c.key.desc() if group_by in DATE_GROUPS else count.desc()
+    return (
+        select(
+            keyed.c.key,
+            count.label("count"),
+            func.sum(count).over().label("total"),
+            func.count().over().label("group_count"),
+        )
+        .group_by(keyed.c.key)
+        .order_by(order, keyed.c.key)
+        .limit(ANALYTICS_MAX_GROUPS)
+    )
+
+
+def _prepare_counts(period: str | None, since: date | None, until: date | None):
+    if period:
+        since, until = period_range(period, datetime.utcnow().date())
+    return since, until
+
+
+def _ticket_counts(rows, since, until, group_by) -> TicketCounts:
+    if group_by is None:
+        return TicketCounts(
+            total=rows[0].total, since=since, until=until, groups=[], more_groups=0
+        )
+    groups = [
+        GroupCount(key=getattr(row.key, "value", row.key), count=row.count)
+        for row in rows
+    ]
+    return TicketCounts(
+        total=rows[0].total if rows else 0,
+        since=since,
+        until=until,
+        groups=groups,
+        more_groups=rows[0].group_count - len(rows) if rows else 0,
+    )
+
+
+@traced
+def count_tickets(
+    status: str | None = None,
+    customer: str | None = None,
+    period: str | None = None,
+    since: date | None = None,
+    until: date | None = None,
+    group_by: str | None = None,
+    session: Session | None = None,
+) -> TicketCounts:
+    """Count tickets by status, customer and creation day, in the database.
+
+    :param status: only tickets with this status: Open, Pending, Resolved or Closed
+    :type status: str | None
+    :param customer: only tickets of this customer ID or email address
+    :type customer: str | None
+    :param period: one of :data:`PERIODS`; replaces ``since`` and ``until``
+    :type period: str | None
+    :param since: only tickets created on or after this day
+    :type since: date | None
+    :param until: only tickets created before this day
+    :type until: date | None
+    :param group_by: one of :data:`GROUPS`, or None for the total only
+    :type group_by: str | None
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: Session | None
+    :raises ValueError: if a filter, the period or ``group_by`` is not valid
+    :return: the total and the largest (or latest) groups
+    :rtype: TicketCounts
+    """
+    since, until = _prepare_counts(period, since, until)
+    with session_scope(session) as session:
+        query = ticket_counts_query(
+            session.get_bind().dialect.name, status, customer, since, until, group_by
+        )
+        rows = session.execute(query).all()
+    return _ticket_counts(rows, since, until, group_by)
+
+
+@traced
+async def count_tickets_async(
+    status: str | None = None,
+    customer: str | None = None,
+    period: str | None = None,
+    since: date | None = None,
+    until: date | None = None,
+    group_by: str | None = None,
+    session: "AsyncSession | None" = None,
+) -> TicketCounts:
+    """Async variant of :func:`count_tickets`."""
+    since, until = _prepare_counts(period, since, until)
+    async with async_session_scope(session) as session:
+        query = ticket_counts_query(
+            session.get_bind().dialect.name, status, customer, since, until, group_by
+        )
+        rows = (await session.execute(query)).all()
+    return _ticket_counts(rows, since, until, group_by)
+
+
+def _balances_query(keys: list[str], as_of: datetime) -> Select:
+    customer_ids = {int(key) for key in keys if key.isdigit()}
+    email_addresses = {key for key in keys if "@" in key}
+    overdue = Invoice.due_date < as_of
+    return (
+        select(
+            Customer.id.label("customer_id"),
+            Customer.name,
+            Customer.email,
+            func.count(Invoice.id).label("invoice_count"),
+            func.coalesce(func.sum(Invoice.amount), 0).label("balance"),
+            func.count(case((overdue, Invoice.id))).label("overdue_count"),
+            func.coalesce(func.sum(case((overdue, Invoice.amount))), 0).label(
+                "overdue_amount"
+            ),
+            func.min(case((overdue, Invoice.due_date))).label(
+                "oldest_overdue_due_date"
+            ),
+            func.min(case((~overdue, Invoice.due_date))).label("next_due_date"),
+        )
+        .outerjoin(Invoice, open_invoice_filter(Customer.id))
+        .where(or_(Customer.id.in_(customer_ids), Customer.email.in_(email_addresses)))
+        .group_by(Customer.id, Customer.name, Customer.email)
+    )
+
+
+def _balances(keys: list[str], rows) -> list[CustomerBalance | None]:
+    found: dict[str, CustomerBalance] = {}
+    for row in rows:
+        balance = CustomerBalance(
+            customer_id=row.customer_id,
+            name=row.name,
+            email=row.email,
+            currency=INVOICE_CURRENCY,
+            invoice_count=row.invoice_count,
+            balance=round(row.balance, 2),
+            overdue_count=row.overdue_count,
+            overdue_amount=round(row.overdue_amount, 2),
+            oldest_overdue_due_date=row.oldest_overdue_due_date,
+            next_due_date=row.next_due_date,
+        )
+        found[str(row.customer_id)] = found[row.email] = balance
+    return [found.get(key) for key in keys]
+
+
+@traced
+def get_customer_balances(
+    keys: list[str], as_of: datetime | None = None, session: Session | None = None
+) -> list[CustomerBalance | None]:
+    """What each customer owes and how much of it is overdue, in one query.
+
+    :param keys: Customer IDs or email addresses; keys containing "@" are
+        treated as email addresses.
+    :type keys: list[str]
+    :param as_of: invoices due before this are overdue; now if omitted
+    :type as_of: datetime | None
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: Session | None
+    :return: One entry per requested key, in request order; None if not found.
+    :rtype: list[CustomerBalance | None]
+    """
+    query = _balances_query(keys, as_of or datetime.utcnow())
+    with session_scope(session) as session:
+        rows = session.execute(query).all()
+    return _balances(keys, rows)
+
+
+@traced
+async def get_customer_balances_async(
+    keys: list[str],
+    as_of: datetime | None = None,
+    session: "AsyncSession | None" = None,
+) -> list[CustomerBalance | None]:
+    """Async variant of :func:`get_customer_balances`."""
+    query = _balances_query(keys, as_of or datetime.utcnow())
+    async with async_session_scope(session) as session:
+        rows = (await session.execute(query)).all()
+    return _balances(keys, rows)
+
+
+def _aging_labels() -> list[str]:
+    bounds = [0, *ANALYTICS_AGING_DAYS]
+    labels = [f"{low + 1}-{high}" for low, high in zip(bounds, bounds[1:])]
+    return [*labels, f"over {bounds[-1]}"]
+
+
+def _overdue_filters(as_of: datetime, customer: str | None) -> list:
+    filters = [Invoice.due_date < as_of]
+    condition = customer_filter(Invoice.customer_id, customer)
+    if condition is not None:
+        filters.append(condition)
+    return filters
+
+
+def _aging_query(as_of: datetime, customer: str | None) -> Select:
+    # Bucket i holds invoices at most ANALYTICS_AGING_DAYS[i] days past due.
+    bucket = case(
+        *(
+            (Invoice.due_date >= as_of - timedelta(days=days), i)
+            for i, days in enumerate(ANALYTICS_AGING_DAYS)
+        ),
+        else_=len(ANALYTICS_AGING_DAYS),
+    )
+    # Grouped in an outer query, as the bucket bounds are bound parameters.
+    bucketed = (
+        select(bucket.label("bucket"), Invoice.amount)
+        .where(*_overdue_filters(as_of, customer))
+        .subquery()
+    )
+    return (
+        select(
+            bucketed.c.bucket,
+            func.count().label("count"),
+            func.sum(bucketed.c.amount).label("amount"),
+        )
+        .group_by(bucketed.c.bucket)
+        .order_by(bucketed.c.bucket)
+    )
+
+
+def _oldest_query(as_of: datetime, customer: str | None, limit: int) -> Select:
+    return (
+        select(
+            Invoice.invoice_number,
+            Customer.email.label("customer_email"),
+            Invoice.amount,
+            Invoice.due_date,
+        )
+        .join(Customer, Invoice.customer_id == Customer.id)
+        .where(*_overdue_filters(as_of, customer))
+        .order_by(Invoice.due_date, Invoice.id)
+        .limit(limit)
+    )
+
+
+def _overdue(as_of: datetime, aging_rows, oldest_rows) -> OverdueInvoices:
+    labels = _aging_labels()
+    return OverdueInvoices(
+        as_of=as_of,
+        currency=INVOICE_CURRENCY,
+        count=sum(row.count for row in aging_rows),
+        amount=round(sum(row.amount for row in aging_rows), 2),
+        aging=[
+            AgingBucket(
+                days_overdue=labels[row.bucket],
+                count=row.count,
+                amount=round(row.amount, 2),
+            )
+            for row in aging_rows
+        ],
+        oldest=[
+            OverdueInvoice(
+                invoice_number=row.invoice_number,
+                customer_email=row.customer_email,
+                amount=row.amount,
+                due_date=row.due_date,
+                days_overdue=(as_of - row.due_date).days,
+            )
+            for row in oldest_rows
+        ],
+    )
+
+
+@traced
+def get_overdue_invoices(
+    customer: str | None = None,
+    limit: int = ANALYTICS_OVERDUE_LIMIT,
+    as_of: datetime | None = None,
+    session: Session | None = None,
+) -> OverdueInvoices:
+    """Overdue invoices: totals by days past due and the oldest ones.
+
+    :param customer: only invoices of this customer ID or email address
+    :type customer: str | None
+    :param limit: number of the longest overdue invoices to list
+    :type limit: int
+    :param as_of: invoices due before this are overdue; now if omitted
+    :type as_of: datetime | None
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: Session | None
+    :raises ValueError: if ``customer`` is neither an ID nor an email address
+    :return: count, total, aging buckets and the oldest invoices
+    :rtype: OverdueInvoices
+    """
+    as_of = as_of or datetime.utcnow()
+    limit = max(0, min(limit, ANALYTICS_MAX_GROUPS))
+    with session_scope(session) as session:
+        aging_rows = session.execute(_aging_query(as_of, customer)).all()
+        oldest_rows = session.execute(_oldest_query(as_of, customer, limit)).all()
+    return _overdue(as_of, aging_rows, oldest_rows)
+
+
+@traced
+async def get_overdue_invoices_async(
+    customer: str | None = None,
+    limit: int = ANALYTICS_OVERDUE_LIMIT,
+    as_of: datetime | None = None,
+    session: "AsyncSession | None" = None,
+) -> OverdueInvoices:
+    """Async variant of :func:`get_overdue_invoices`."""
+    as_of = as_of or datetime.utcnow()
+    limit = max(0, min(limit, ANALYTICS_MAX_GROUPS))
+    async with async_session_scope(session) as session:
+        aging_rows = (await session.execute(_aging_query(as_of, customer))).all()
+        oldest_rows = (
+            await session.execute(_oldest_query(as_of, customer, limit))
+        ).all()
+    return _overdue(as_of, aging_rows, oldest_rows)
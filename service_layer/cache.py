@@ -0,0 +1,245 @@
+"""In-process cache for service-layer lookups.
+
+Caches hold the validated pydantic models (``InvoiceDetails``,
+``TicketDetails``, ``CustomerDetails``) keyed by the identifier they were
+looked up with. Not-found keys are cached as ``None`` with a shorter TTL.
+
+Entries are invalidated when the underlying rows are written through the ORM
+(mapper ``after_insert`` / ``after_update`` / ``after_delete`` events, which
+includes every change of ``Ticket.updated_at``) and again once the writing
+session commits. Bulk Core statements bypass these events; call
+:meth:`LookupCache.clear` after them.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Iterable
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from config import (
+    LOOKUP_CACHE_MAXSIZE,
+    LOOKUP_CACHE_NEGATIVE_TTL_SECONDS,
+    LOOKUP_CACHE_TTL_SECONDS,
+)
+from database import Customer, CustomerDetail, Invoice, Ticket
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    negative_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LookupCache:
+    """Thread-safe LRU cache with a TTL and negative caching."""
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = LOOKUP_CACHE_MAXSIZE,
+        ttl: float = LOOKUP_CACHE_TTL_SECONDS,
+        negative_ttl: float = LOOKUP_CACHE_NEGATIVE_TTL_SECONDS,
+    ) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stats = CacheStats()
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, key: Hashable, now: float) -> tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return False, None
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._entries[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        if value is None:
+            self.stats.negative_hits += 1
+        return True, value
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        """Look up a key.
+
+        :param key: lookup key, e.g. an invoice number
+        :type key: Hashable
+        :return: (hit, value); value is None for a cached "not found"
+        :rtype: tuple[bool, Any]
+        """
+        with self._lock:
+            return self._get(key, time.monotonic())
+
+    def get_many(self, keys: Iterable[Hashable]) -> tuple[dict, list]:
+        """Split keys into cached values and keys that still need a query.
+
+        :param keys: lookup keys
+        :type keys: Iterable[Hashable]
+        :return: ({key: cached value}, [missing keys without duplicates])
+        :rtype: tuple[dict, list]
+        """
+        found, missing = {}, []
+        now = time.monotonic()
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                hit, value = self._get(key, now)
+                if hit:
+                    found[key] = value
+                else:
+                    missing.append(key)
+        return found, missing
+
+    def set(self, key: Hashable, value: Any) -> None:
+        ttl = self.ttl if value is not None else self.negative_ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def fill(self, keys: Iterable[Hashable], found: dict) -> dict:
+        """Store query results for ``keys``, caching absent keys as not found.
+
+        :return: {key: value or None} for every key
+        :rtype: dict
+        """
+        results = {key: found.get(key) for key in keys}
+        for key, value in results.items():
+            self.set(key, value)
+        return results
+
+    def invalidate(self, *keys: Hashable) -> None:
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.stats.invalidations += 1
+
+    def invalidate_where(self, predicate: Callable[[Any], bool]) -> None:
+        """Drop every entry whose cached value matches ``predicate``."""
+        with self._lock:
+            stale = [
+                key
+                for key, (_, value) in self._entries.items()
+                if value is not None and predicate(value)
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.stats.invalidations += len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+invoice_cache = LookupCache("invoices")
+ticket_cache = LookupCache("tickets")
+customer_cache = LookupCache("customers")
+
+
+def cache_stats() -> dict[str, CacheStats]:
+    return {
+        cache.name: cache.stats
+        for cache in (invoice_cache, ticket_cache, customer_cache)
+    }
+
+
+def _old_and_new(target, attribute: str) -> set:
+    """Current value of an attribute plus the value it had before this flush."""
+    history = inspect(target).attrs[attribute].history
+    return {*history.deleted, *history.unchanged, *history.added} - {None}
+
+
+def _invoice_invalidation(connection, target: Invoice) -> Callable[[], None]:
+    invoice_numbers = _old_and_new(target, "invoice_number")
+    return lambda: invoice_cache.invalidate(*invoice_numbers)
+
+
+def _ticket_invalidation(connection, target: Ticket) -> Callable[[], None]:
+    ticket_numbers = _old_and_new(target, "ticket_number")
+    return lambda: ticket_cache.invalidate(*ticket_numbers)
+
+
+def _customer_invalidation(connection, target: Customer) -> Callable[[], None]:
+    customer_id = str(target.id)
+    emails = _old_and_new(target, "email")
+
+    def apply() -> None:
+        customer_cache.invalidate(customer_id, *emails)
+        # Invoice and ticket details embed the customer's name and email.
+        invoice_cache.invalidate_where(lambda details: details.customer_email in emails)
+        ticket_cache.invalidate_where(lambda details: details.customer_email in emails)
+
+    return apply
+
+
+def _customer_detail_invalidation(
+    connection, target: CustomerDetail
+) -> Callable[[], None]:
+    detail_id = target.id
+    customer_ids = _old_and_new(target, "customer_id")
+    emails = connection.scalars(
+        select(Customer.email).where(Customer.id.in_(customer_ids))
+    ).all()
+
+    def apply() -> None:
+        customer_cache.invalidate(*map(str, customer_ids), *emails)
+        customer_cache.invalidate_where(lambda details: details.id == detail_id)
+
+    return apply
+
+
+def _on_write(invalidation: Callable) -> Callable:
+    """Invalidate now, and again after commit in case a reader re-cached the old row."""
+
+    def listener(mapper, connection, target) -> None:
+        apply = invalidation(connection, target)
+        apply()
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault("cache_invalidations", []).append(apply)
+
+    return listener
+
+
+for _model, _invalidation in (
+    (Invoice, _invoice_invalidation),
+    (Ticket, _ticket_invalidation),
+    (Customer, _customer_invalidation),
+    (CustomerDetail, _customer_detail_invalidation),
+):
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _on_write(_invalidation))
+
+
+@event.listens_for(Session, "after_commit")
+def _replay_invalidations(session) -> None:
+    for apply in session.info.pop("cache_invalidations", []):
+        apply()
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_invalidations(session) -> None:
+    session.info.pop("cache_invalidations", None)
@@ -0,0 +1,290 @@
+"""Customer 360 read model: a customer with everything an agent asks about.
+
+One :class:`Customer360` holds the customer, their detail row, their most
+recent tickets and their open invoices. Whatever the number of customers
+requested, it is loaded with three indexed queries in one session: customers
+outer-joined to their details with per-section counts, then the top tickets
+and invoices of every customer, ranked with ``ROW_NUMBER()`` so each section
+is limited per customer rather than overall.
+"""
+
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import Select, func, or_, select
+from sqlalchemy.orm import Session
+
+from config import (
+    CUSTOMER_360_INVOICE_LIMIT,
+    CUSTOMER_360_MAX_LIMIT,
+    CUSTOMER_360_TICKET_LIMIT,
+)
+from database import Customer, CustomerDetail, Invoice, Ticket
+from db_session import async_session_scope, session_scope
+from service_layer.customer_details import CustomerDetails
+from service_layer.invoice_service import INVOICE_NUMBER_PATTERN
+from service_layer.ticket_service import TICKET_NUMBER_PATTERN
+from tracing import traced
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class TicketSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    ticket_number: str = Field(
+        pattern=TICKET_NUMBER_PATTERN, description="The ticket number, e.g. TKT-1001."
+    )
+    subject: str = Field(description="Short summary of the issue.")
+    status: str = Field(description="The current lifecycle status of the ticket.")
+    created_at: datetime = Field(description="When the ticket was created.")
+
+
+class InvoiceSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    invoice_number: str = Field(
+        pattern=INVOICE_NUMBER_PATTERN,
+        description="The invoice number, e.g. INV-02398-JM.",
+    )
+    amount: float = Field(description="The total amount due on the invoice.")
+    issued_date: datetime = Field(description="When the invoice was issued.")
+    due_date: datetime = Field(description="When the payment is due.")
+
+
+class Customer360(BaseModel):
+    customer_id: int = Field(description="Customer ID")
+    name: str = Field(description="The customer's full name.")
+    email: str = Field(description="The customer's contact email.")
+    details: CustomerDetails | None = Field(
+        description="Address, phone and VIP status; None if not on file."
+    )
+    ticket_count: int = Field(description="Number of tickets the customer raised.")
+    recent_tickets: list[TicketSummary] = Field(
+        description="The customer's most recent tickets, newest first."
+    )
+    open_invoice_count: int = Field(description="Number of open invoices.")
+    open_invoices: list[InvoiceSummary] = Field(
+        description="Open invoices, most recently issued first."
+    )
+
+
+def clamp_limit(limit: int) -> int:
+    """Keep a caller supplied section limit within ``[0, CUSTOMER_360_MAX_LIMIT]``."""
+    return max(0, min(limit, CUSTOMER_360_MAX_LIMIT))
+
+
+def open_invoice_filter(customer_id):
+    # Invoices carry no payment status yet, so every invoice is still open.
+    return Invoice.customer_id == customer_id
+
+
+def _customers_query(keys: list[str]) -> Select:
+    customer_ids = {int(key) for key in keys if key.isdigit()}
+    email_addresses = {key for key in keys if "@" in key}
+    ticket_count = (
+        select(func.count(Ticket.id))
+        .where(Ticket.customer_id == Customer.id)
+        .scalar_subquery()
+    )
+    open_invoice_count = (
+        select(func.count(Invoice.id))
+        .where(open_invoice_filter(Customer.id))
+        .scalar_subquery()
+    )
+    return (
+        select(
+            Customer.id,
+            Customer.name,
+            Customer.email,
+            CustomerDetail,
+            ticket_count.label("ticket_count"),
+            open_invoice_count.label("open_invoice_count"),
+        )
+        .outerjoin(CustomerDetail, CustomerDetail.customer_id == Customer.id)
+        .where(or_(Customer.id.in_(customer_ids), Customer.email.in_(email_addresses)))
+        .order_by(Customer.id, CustomerDetail.id)
+    )
+
+
+def _top_per_customer(columns, customer_column, order_by, where, limit) -> Select:
+    """The first ``limit`` rows per customer, in ``order_by`` order."""
+    position = (
+        func.row_number()
+        .over(partition_by=customer_column, order_by=order_by)
+        .label("position")
+    )
+    ranked = select(customer_column, *columns, position).where(where).subquery()
+    return (
+        select(ranked)
+        .where(ranked.c.position <= limit)
+        .order_by(ranked.c.customer_id, ranked.c.position)
+    )
+
+
+def _recent_tickets_query(customer_ids: list[int], limit: int) -> Select:
+    return _top_per_customer(
+        (Ticket.ticket_number, Ticket.subject, Ticket.status, Ticket.created_at),
+        Ticket.customer_id,
+        (Ticket.created_at.desc(), Ticket.id.desc()),
+        Ticket.customer_id.in_(customer_ids),
+        limit,
+    )
+
+
+def _open_invoices_query(customer_ids: list[int], limit: int) -> Select:
+    return _top_per_customer(
+        (Invoice.invoice_number, Invoice.amount, Invoice.issued_date, Invoice.due_date),
+        Invoice.customer_id,
+        (Invoice.issued_date.desc(), Invoice.id.desc()),
+        open_invoice_filter(Invoice.customer_id)
+        & Invoice.customer_id.in_(customer_ids),
+        limit,
+    )
+
+
+def _grouped(rows, model) -> dict[int, list]:
+    grouped: dict[int, list] = {}
+    for row in rows:
+        grouped.setdefault(row.customer_id, []).append(
+            model.model_validate(row, from_attributes=True)
+        )
+    return grouped
+
+
+def _assemble(
+    keys: list[str], customer_rows, ticket_rows, invoice_rows
+) -> list[Customer360 | None]:
+    tickets = _grouped(ticket_rows, TicketSummary)
+    invoices = _grouped(invoice_rows, InvoiceSummary)
+    found: dict[str, Customer360] = {}
+    for customer_id, name, email, detail, ticket_count, invoice_count in customer_rows:
+        if str(customer_id) in found:
+            # A customer with several detail rows keeps the first, as in
+            # get_customer_info.
+            continue
+        view = Customer360(
+            customer_id=customer_id,
+            name=name,
+            email=email,
+            details=(
+                CustomerDetails.model_validate(detail, from_attributes=True)
+                if detail
+                else None
+            ),
+            ticket_count=ticket_count,
+            recent_tickets=tickets.get(customer_id, []),
+            open_invoice_count=invoice_count,
+            open_invoices=invoices.get(customer_id, []),
+        )
+        found[str(customer_id)] = found[email] = view
+    return [found.get(key) for key in keys]
+
+
+def _customer_ids(customer_rows) -> list[int]:
+    return list(dict.fromkeys(row.id for row in customer_rows))
+
+
+@traced
+def get_customer_360_many(
+    keys: list[str],
+    ticket_limit: int = CUSTOMER_360_TICKET_LIMIT,
+    invoice_limit: int = CUSTOMER_360_INVOICE_LIMIT,
+    session: Session | None = None,
+) -> list[Customer360 | None]:
+    """Load the 360 view of many customers with three queries.
+
+    Customers without a detail row are still returned, with ``details`` None.
+
+    :param keys: Customer IDs or email addresses; keys containing "@" are
+        treated as email addresses.
+    :type keys: list[str]
+    :param ticket_limit: Most recent tickets to include per customer.
+    :type ticket_limit: int
+    :param invoice_limit: Open invoices to include per customer.
+    :type invoice_limit: int
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: Session | None
+    :return: One entry per requested key, in request order; None if not found.
+    :rtype: list[Customer360 | None]
+    """
+    ticket_limit, invoice_limit = clamp_limit(ticket_limit), clamp_limit(invoice_limit)
+    with session_scope(session) as session:
+        customer_rows = session.execute(_customers_query(keys)).all()
+        customer_ids = _customer_ids(customer_rows)
+        ticket_rows = invoice_rows = []
+        if customer_ids and ticket_limit:
+            ticket_rows = session.execute(
+                _recent_tickets_query(customer_ids, ticket_limit)
+            ).all()
+        if customer_ids and invoice_limit:
+            invoice_rows = session.execute(
+                _open_invoices_query(customer_ids, invoice_limit)
+            ).all()
+        # Detail rows expire when a short-lived session commits.
+        return _assemble(keys, customer_rows, ticket_rows, invoice_rows)
+
+
+@traced
+async def get_customer_360_many_async(
+    keys: list[str],
+    ticket_limit: int = CUSTOMER_360_TICKET_LIMIT,
+    invoice_limit: int = CUSTOMER_360_INVOICE_LIMIT,
+    session: "AsyncSession | None" = None,
+) -> list[Customer360 | None]:
+    """Async variant of :func:`get_customer_360_many`."""
+    ticket_limit, invoice_limit = clamp_limit(ticket_limit), clamp_limit(invoice_limit)
+    async with async_session_scope(session) as session:
+        customer_rows = (await session.execute(_customers_query(keys))).all()
+        customer_ids = _customer_ids(customer_rows)
+        ticket_rows = invoice_rows = []
+        if customer_ids and ticket_limit:
+            ticket_rows = (
+                await session.execute(_recent_tickets_query(customer_ids, ticket_limit))
+            ).all()
+        if customer_ids and invoice_limit:
+            invoice_rows = (
+                await session.execute(
+                    _open_invoices_query(customer_ids, invoice_limit)
+                )
+            ).all()
+        return _assemble(keys, customer_rows, ticket_rows, invoice_rows)
+
+
+@traced
+def get_customer_360(
+    customer_id: str | None,
+    email_address: str | None,
+    ticket_limit: int = CUSTOMER_360_TICKET_LIMIT,
+    invoice_limit: int = CUSTOMER_360_INVOICE_LIMIT,
+    session: Session | None = None,
+) -> Customer360 | None:
+    """Load the 360 view of one customer by ID or email address.
+
+    :param customer_id: The ID of the customer.
+    :type customer_id: str | None
+    :param email_address: The email address of the customer; wins over the ID.
+    :type email_address: str | None
+    :return: The customer's 360 view or None if not found.
+    :rtype: Customer360 | None
+    """
+    key = email_address or str(customer_id)
+    return get_customer_360_many([key], ticket_limit, invoice_limit, session)[0]
+
+
+@traced
+async def get_customer_360_async(
+    customer_id: str | None,
+    email_address: str | None,
+    ticket_limit: int = CUSTOMER_360_TICKET_LIMIT,
+    invoice_limit: int = CUSTOMER_360_INVOICE_LIMIT,
+    session: "AsyncSession | None" = None,
+) -> Customer360 | None:
+    """Async variant of :func:`get_customer_360`."""
+    key = email_address or str(customer_id)
+    results = await get_customer_360_many_async(
+        [key], ticket_limit, invoice_limit, session
+    )
+    return results[0]
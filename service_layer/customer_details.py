@@ -1,6 +1,16 @@
+from typing import TYPE_CHECKING
+
 from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import Select, or_, select
+from sqlalchemy.orm import Session
+
+from database import Customer, CustomerDetail
+from db_session import async_session_scope, session_scope
+from service_layer.cache import customer_cache
+from tracing import traced
 
-from database import Customer, CustomerDetail, Invoice, Session
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 
 class CustomerDetails(BaseModel):
@@ -14,35 +24,150 @@ class CustomerDetails(BaseModel):
     is_vip: int = Field(default=0, description="VIP status (0 = No, 1 = Yes)")
 
 
+def customer_filter(column, customer: str | None):
+    """Condition on a customer ID column from a customer ID or email address.
+
+    :raises ValueError: if ``customer`` is neither an ID nor an email address
+    """
+    if not customer:
+        return None
+    if "@" in customer:
+        customer_id = select(Customer.id).where(Customer.email == customer)
+        return column == customer_id.scalar_subquery()
+    if customer.isdigit():
+        return column == int(customer)
+    raise ValueError(f"Customer {customer!r} is neither an ID nor an email")
+
+
+def _customer_query(customer_id: str | None, email_address: str | None) -> Select:
+    query = select(CustomerDetail).join(
+        Customer, CustomerDetail.customer_id == Customer.id
+    )
+    if email_address:
+        query = query.where(Customer.email == email_address)
+    else:
+        query = query.where(Customer.id == customer_id)
+    return query.order_by(CustomerDetail.id).limit(1)
+
+
+def _customers_query(keys: list[str]) -> Select:
+    customer_ids = {int(key) for key in keys if key.isdigit()}
+    email_addresses = {key for key in keys if "@" in key}
+    return (
+        select(CustomerDetail, Customer.id, Customer.email)
+        .join(Customer, CustomerDetail.customer_id == Customer.id)
+        .where(or_(Customer.id.in_(customer_ids), Customer.email.in_(email_addresses)))
+        .order_by(CustomerDetail.id)
+    )
+
+
+def _by_key(rows) -> dict[str, CustomerDetails]:
+    found = {}
+    for detail, customer_id, email in rows:
+        details = CustomerDetails.model_validate(detail, from_attributes=True)
+        found.setdefault(str(customer_id), details)
+        found.setdefault(email, details)
+    return found
+
+
+def _cache_key(customer_id: str | None, email_address: str | None) -> str:
+    return email_address if email_address else str(customer_id)
+
+
+@traced
 def get_customer_info(
-    customer_id: str | None, email_address: str | None
+    customer_id: str | None,
+    email_address: str | None,
+    session: Session | None = None,
 ) -> CustomerDetails | None:
-    """Get customer details by customer ID or email address.xwww
+    """Get customer details by customer ID or email address.
 
     :param customer_id: The ID of the customer.
     :type customer_id: str | None
     :param email_address: The email address of the customer.
     :type email_address: str | None
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: Session | None
     :return: The details of the customer or None if not found.
     :rtype: CustomerDetails | None
     """
-    session = Session()
-    if email_address:
-        row = (
-            session.query(CustomerDetail)
-            .join(Customer, CustomerDetail.customer_id == Customer.id)
-            .join(Invoice, Invoice.customer_id == Customer.id)
-            .filter(Customer.email == email_address)
-            .first()
+    key = _cache_key(customer_id, email_address)
+    hit, details = customer_cache.get(key)
+    if hit:
+        return details
+    with session_scope(session) as session:
+        row = session.scalars(_customer_query(customer_id, email_address)).first()
+        details = (
+            CustomerDetails.model_validate(row, from_attributes=True) if row else None
         )
-    else:
+    customer_cache.set(key, details)
+    return details
+
+
+@traced
+async def get_customer_info_async(
+    customer_id: str | None,
+    email_address: str | None,
+    session: "AsyncSession | None" = None,
+) -> CustomerDetails | None:
+    """Async variant of :func:`get_customer_info` that does not block the event loop.
+
+    :param customer_id: The ID of the customer.
+    :type customer_id: str | None
+    :param email_address: The email address of the customer.
+    :type email_address: str | None
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: AsyncSession | None
+    :return: The details of the customer or None if not found.
+    :rtype: CustomerDetails | None
+    """
+    key = _cache_key(customer_id, email_address)
+    hit, details = customer_cache.get(key)
+    if hit:
+        return details
+    async with async_session_scope(session) as session:
         row = (
-            session.query(CustomerDetail)
-            .join(Customer, CustomerDetail.customer_id == Customer.id)
-            .filter(Customer.id == customer_id)
-            .first()
+            await session.scalars(_customer_query(customer_id, email_address))
+        ).first()
+        details = (
+            CustomerDetails.model_validate(row, from_attributes=True) if row else None
         )
+    customer_cache.set(key, details)
+    return details
 
-    if not row:
-        return None
-    return CustomerDetails.model_validate(row, from_attributes=True)
+
+@traced
+def get_customer_info_many(
+    keys: list[str], session: Session | None = None
+) -> list[CustomerDetails | None]:
+    """Resolve many customers by ID or email address with a single query.
+
+    Cached keys are served from the lookup cache; only the rest are queried.
+
+    :param keys: Customer IDs or email addresses; keys containing "@" are
+        treated as email addresses.
+    :type keys: list[str]
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: Session | None
+    :return: One entry per requested key, in request order; None if not found.
+    :rtype: list[CustomerDetails | None]
+    """
+    found, missing = customer_cache.get_many(keys)
+    if missing:
+        with session_scope(session) as session:
+            rows = session.execute(_customers_query(missing)).all()
+            found |= customer_cache.fill(missing, _by_key(rows))
+    return [found[key] for key in keys]
+
+
+@traced
+async def get_customer_info_many_async(
+    keys: list[str], session: "AsyncSession | None" = None
+) -> list[CustomerDetails | None]:
+    """Async variant of :func:`get_customer_info_many`."""
+    found, missing = customer_cache.get_many(keys)
+    if missing:
+        async with async_session_scope(session) as session:
+            rows = (await session.execute(_customers_query(missing))).all()
+            found |= customer_cache.fill(missing, _by_key(rows))
+    return [found[key] for key in keys]
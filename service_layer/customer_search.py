@@ -0,0 +1,402 @@
+"""Fuzzy customer search over names, email addresses and phone numbers.
+
+:data:`customer_index` is an in-memory trigram index built from the database
+on first use. Names and emails are split into words and indexed by the
+trigrams of each word padded the way ``pg_trgm`` does ("  ab", " ab", "abc",
+"bc "), so partial names and misspelled emails still share most of their
+trigrams with the stored value. Phone numbers are indexed by the trigrams of
+their digits, so any fragment of three or more digits matches; a query made
+of digits and phone punctuation only is matched against them.
+
+A search gathers candidates from the query's rare trigrams, the ones held by
+few customers (``@example.org`` is in nearly every email), and then scores the
+best candidates exactly::
+
+    score = 0.75 * containment + 0.25 * jaccard
+
+per field, keeping the best field. Containment (the share of the query's
+trigrams found in the field) lets fragments score high and the Jaccard
+similarity ranks the closest complete value first; an exact match scores 1.
+
+Customer and customer detail rows written through the ORM are re-indexed when
+their session commits (mapper events, as for :mod:`service_layer.cache`).
+Bulk Core statements bypass these events; call :meth:`CustomerIndex.invalidate`
+after them to rebuild the index on the next search. Rows written by other
+processes are picked up by rebuilding the index every
+``CUSTOMER_SEARCH_RELOAD_SECONDS``; searches use the previous index meanwhile.
+
+Trigrams are interned, so all entries share one string per distinct trigram;
+entries keep their fields' trigrams as tuples and each trigram's customers are
+a sorted array of IDs, which keeps the index small at 100k customers.
+"""
+
+import asyncio
+import bisect
+import heapq
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Collection, Iterable
+
+from pydantic import BaseModel, Field
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from config import (
+    CUSTOMER_SEARCH_CANDIDATES,
+    CUSTOMER_SEARCH_LIMIT,
+    CUSTOMER_SEARCH_MIN_SCORE,
+    CUSTOMER_SEARCH_RELOAD_SECONDS,
+)
+from database import Customer, CustomerDetail
+from db_session import async_session_scope, session_scope
+from tracing import traced
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+WORD_RE = re.compile(r"[^\W_]+")
+NON_DIGIT_RE = re.compile(r"\D")
+PHONE_RE = re.compile(r"[\d\s+\-().]+")
+# Trigrams held by more customers than this are too common to find candidates.
+COMMON_TRIGRAM_FRACTION = 0.05
+COMMON_TRIGRAM_MIN_POSTINGS = 500
+FIELDS = ("name", "email", "phone_number")
+
+
+class CustomerMatch(BaseModel):
+    customer_id: int = Field(description="Customer ID")
+    name: str = Field(description="The customer's full name.")
+    email: str = Field(description="The customer's contact email.")
+    phone_number: str | None = Field(description="The customer's phone number.")
+    matched_field: str = Field(description="Field that matched best.")
+    score: float = Field(description="Similarity from 0 to 1; 1 is an exact match.")
+
+
+def text_trigrams(text: str) -> frozenset[str]:
+    """``pg_trgm`` style trigrams of every word of ``text``, lower-cased."""
+    trigrams = set()
+    for word in WORD_RE.findall(text.lower()):
+        padded = f"  {word} "
+        trigrams.update(sys.intern(padded[i : i + 3]) for i in range(len(padded) - 2))
+    return frozenset(trigrams)
+
+
+def digit_trigrams(text: str) -> frozenset[str]:
+    """Trigrams of the digits of ``text``, ignoring separators and spacing."""
+    digits = NON_DIGIT_RE.sub("", text)
+    return frozenset(sys.intern(digits[i : i + 3]) for i in range(len(digits) - 2))
+
+
+def similarity(query: frozenset[str], field: Collection[str]) -> float:
+    if not query or not field:
+        return 0.0
+    shared = len(query.intersection(field))
+    containment = shared / len(query)
+    jaccard = shared / (len(query) + len(field) - shared)
+    return 0.75 * containment + 0.25 * jaccard
+
+
+@dataclass(slots=True)
+class _Entry:
+    name: str
+    email: str
+    phone_number: str | None
+    # Distinct trigrams of each of FIELDS, in that order.
+    trigrams: tuple[tuple[str, ...], ...]
+
+
+def _entry(name: str, email: str, phone_number: str | None) -> _Entry:
+    return _Entry(
+        name=name,
+        email=email,
+        phone_number=phone_number,
+        trigrams=(
+            tuple(text_trigrams(name)),
+            tuple(text_trigrams(email)),
+            tuple(digit_trigrams(phone_number or "")),
+        ),
+    )
+
+
+class CustomerIndex:
+    """Thread-safe in-memory trigram index of customers."""
+
+    def __init__(self) -> None:
+        self._entries: dict[int, _Entry] = {}
+        self._postings: dict[str, array] = {}
+        self._lock = threading.RLock()
+        self.loaded_at = 0.0
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _add(self, customer_id: int, entry: _Entry) -> None:
+        self._remove(customer_id)
+        self._entries[customer_id] = entry
+        for trigram in set().union(*entry.trigrams):
+            bisect.insort(self._postings.setdefault(trigram, array("q")), customer_id)
+
+    def _remove(self, customer_id: int) -> None:
+        entry = self._entries.pop(customer_id, None)
+        if entry is None:
+            return
+        for trigram in set().union(*entry.trigrams):
+            postings = self._postings.get(trigram)
+            if postings is None:
+                continue
+            i = bisect.bisect_left(postings, customer_id)
+            if i < len(postings) and postings[i] == customer_id:
+                del postings[i]
+            if not postings:
+                del self._postings[trigram]
+
+    def build(self, rows: Iterable[tuple[int, str, str, str | None]]) -> None:
+        """Replace the index with ``(customer_id, name, email, phone)`` rows."""
+        entries = {}
+        for customer_id, name, email, phone_number in rows:
+            # Customers with several detail rows keep the first phone number.
+            if customer_id not in entries:
+                entries[customer_id] = _entry(name, email, phone_number)
+        ids: dict[str, list[int]] = {}
+        for customer_id in sorted(entries):
+            for trigram in set().union(*entries[customer_id].trigrams):
+                ids.setdefault(trigram, []).append(customer_id)
+        postings = {trigram: array("q", values) for trigram, values in ids.items()}
+        del ids
+        with self._lock:
+            self._entries, self._postings = entries, postings
+            self.loaded_at = time.monotonic()
+            self.loaded = True
+
+    def upsert(
+        self,
+        customer_id: int,
+        name: str | None = None,
+        email: str | None = None,
+        phone_number: str | None = None,
+    ) -> None:
+        """Index a customer, keeping the stored value of fields passed as None."""
+        with self._lock:
+            current = self._entries.get(customer_id)
+            if current is None and (name is None or email is None):
+                # A detail row of a customer that is not indexed (yet).
+                return
+            if current is not None:
+                name = current.name if name is None else name
+                email = current.email if email is None else email
+                if phone_number is None:
+                    phone_number = current.phone_number
+            self._add(customer_id, _entry(name, email, phone_number))
+
+    def invalidate(self) -> None:
+        """Rebuild from the database on the next search."""
+        with self._lock:
+            self.loaded = False
+
+    def remove(self, customer_id: int) -> None:
+        with self._lock:
+            self._remove(customer_id)
+
+    def clear_phone_number(self, customer_id: int) -> None:
+        with self._lock:
+            current = self._entries.get(customer_id)
+            if current is not None:
+                self._add(customer_id, _entry(current.name, current.email, None))
+
+    def _candidates(self, trigrams: frozenset[str], limit: int) -> list[int]:
+        common = max(
+            COMMON_TRIGRAM_MIN_POSTINGS, COMMON_TRIGRAM_FRACTION * len(self._entries)
+        )
+        postings = [self._postings[t] for t in trigrams if t in self._postings]
+        rare = [ids for ids in postings if len(ids) <= common]
+        if not rare and postings:
+            rare = [min(postings, key=len)]
+        hits = Counter()
+        for ids in rare:
+            hits.update(ids)
+        return [customer_id for customer_id, _ in hits.most_common(limit)]
+
+    def search(
+        self,
+        query: str,
+        limit: int = CUSTOMER_SEARCH_LIMIT,
+        min_score: float = CUSTOMER_SEARCH_MIN_SCORE,
+        candidates: int = CUSTOMER_SEARCH_CANDIDATES,
+    ) -> list[CustomerMatch]:
+        """Best matching customers for a partial name, email or phone number.
+
+        :param query: free text, e.g. "wangsandr@exmaple.org" or "555 0142"
+        :type query: str
+        :param limit: maximum number of matches
+        :type limit: int
+        :param min_score: drop matches scoring below this
+        :type min_score: float
+        :param candidates: customers scored exactly, taken from the rare trigrams
+        :type candidates: int
+        :return: matches, best first
+        :rtype: list[CustomerMatch]
+        """
+        # Digits in a name or email query (customer1234@...) are not a phone.
+        is_phone = PHONE_RE.fullmatch(query.strip()) is not None
+        queries = {
+            "name": text_trigrams(query),
+            "email": text_trigrams(query),
+            "phone_number": digit_trigrams(query) if is_phone else frozenset(),
+        }
+        with self._lock:
+            candidate_ids = self._candidates(
+                queries["name"] | queries["phone_number"], candidates
+            )
+            scored = []
+            for customer_id in candidate_ids:
+                entry = self._entries[customer_id]
+                score, field = max(
+                    (similarity(queries[field], trigrams), field)
+                    for field, trigrams in zip(FIELDS, entry.trigrams)
+                )
+                if score >= min_score:
+                    scored.append((score, -customer_id, field, entry))
+        best = heapq.nlargest(limit, scored, key=lambda item: item[:2])
+        return [
+            CustomerMatch(
+                customer_id=-negative_id,
+                name=entry.name,
+                email=entry.email,
+                phone_number=entry.phone_number,
+                matched_field=field,
+                score=round(score, 4),
+            )
+            for score, negative_id, field, entry in best
+        ]
+
+
+customer_index = CustomerIndex()
+_load_lock = threading.Lock()
+
+
+def _index_query():
+    return (
+        select(Customer.id, Customer.name, Customer.email, CustomerDetail.phone_number)
+        .outerjoin(CustomerDetail, CustomerDetail.customer_id == Customer.id)
+        .order_by(Customer.id, CustomerDetail.id)
+    )
+
+
+def _claim_load(force: bool) -> bool:
+    """Whether this caller should (re)build the index.
+
+    Only one caller rebuilds a stale index; the others keep searching the
+    current one. Until the first build, every caller builds.
+    """
+    with _load_lock:
+        age = time.monotonic() - customer_index.loaded_at
+        if not force and customer_index.loaded and age < CUSTOMER_SEARCH_RELOAD_SECONDS:
+            return False
+        if customer_index.loaded:
+            customer_index.loaded_at = time.monotonic()
+        return True
+
+
+@traced
+def load_customer_index(
+    session: Session | None = None, force: bool = False
+) -> CustomerIndex:
+    """Build :data:`customer_index` from the database if never built or stale."""
+    if _claim_load(force):
+        with session_scope(session) as session:
+            rows = session.execute(_index_query().execution_options(yield_per=5000))
+            customer_index.build(rows)
+    return customer_index
+
+
+@traced
+async def load_customer_index_async(
+    session: "AsyncSession | None" = None, force: bool = False
+) -> CustomerIndex:
+    """Async variant of :func:`load_customer_index`; indexing runs in a thread."""
+    if _claim_load(force):
+        async with async_session_scope(session) as session:
+            rows = (await session.execute(_index_query())).all()
+        await asyncio.to_thread(customer_index.build, rows)
+    return customer_index
+
+
+@traced
+def search_customers(
+    query: str, limit: int = CUSTOMER_SEARCH_LIMIT, session: Session | None = None
+) -> list[CustomerMatch]:
+    """Fuzzy-match customers by partial name, misspelled email or phone fragment.
+
+    :param query: what the user gave, e.g. "sandra wang" or "wangsandr@example.org"
+    :type query: str
+    :param limit: maximum number of matches
+    :type limit: int
+    :param session: used to build the index on first use
+    :type session: Session | None
+    :return: matches with scores, best first
+    :rtype: list[CustomerMatch]
+    """
+    return load_customer_index(session).search(query, limit)
+
+
+@traced
+async def search_customers_async(
+    query: str,
+    limit: int = CUSTOMER_SEARCH_LIMIT,
+    session: "AsyncSession | None" = None,
+) -> list[CustomerMatch]:
+    """Async variant of :func:`search_customers`."""
+    index = await load_customer_index_async(session)
+    return index.search(query, limit)
+
+
+def _customer_update(target: Customer, deleted: bool = False):
+    customer_id, name, email = target.id, target.name, target.email
+    if deleted:
+        return lambda: customer_index.remove(customer_id)
+    return lambda: customer_index.upsert(customer_id, name, email)
+
+
+def _detail_update(target: CustomerDetail, deleted: bool = False):
+    customer_id, phone_number = target.customer_id, target.phone_number
+    if deleted:
+        return lambda: customer_index.clear_phone_number(customer_id)
+    return lambda: customer_index.upsert(customer_id, phone_number=phone_number)
+
+
+def _on_write(update, deleted: bool = False):
+    """Queue an index update that is applied once the session commits."""
+
+    def listener(mapper, connection, target) -> None:
+        session = object_session(target)
+        if session is not None:
+            apply = update(target, deleted)
+            session.info.setdefault("customer_index_updates", []).append(apply)
+
+    return listener
+
+
+for _model, _update in ((Customer, _customer_update), (CustomerDetail, _detail_update)):
+    event.listen(_model, "after_insert", _on_write(_update))
+    event.listen(_model, "after_update", _on_write(_update))
+    event.listen(_model, "after_delete", _on_write(_update, deleted=True))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_index_updates(session) -> None:
+    # An index that is not built yet reads the committed rows when it is.
+    updates = session.info.pop("customer_index_updates", [])
+    if customer_index.loaded:
+        for apply in updates:
+            apply()
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_index_updates(session) -> None:
+    session.info.pop("customer_index_updates", None)
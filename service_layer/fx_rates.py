@@ -0,0 +1,500 @@
+"""Currency conversion with dated reference rates.
+
+Rates live in the ``fx_rates`` table as units per euro, one row per day and
+currency, the way the ECB publishes them. :func:`import_ecb_csv` loads the
+ECB's ``eurofxref-hist.csv``::
+
+    python -m service_layer.fx_rates eurofxref-hist.csv
+
+:data:`fx_rates` holds the table in memory as a date × currency NumPy matrix
+and reloads it every ``FX_RATES_RELOAD_SECONDS``. A day without a rate
+(weekend, holiday) uses the latest earlier one, and every conversion
+reports the day of the rate it used.
+
+A batch is converted in one pass. Amounts are multiplied by their day's
+cross rate in float64 and rounded to the target currency's minor unit.
+Results within float error of a half unit are recomputed with ``Decimal``,
+so rounding is exactly ``ROUND_HALF_UP``. Amounts are returned as
+``Decimal``.
+"""
+
+import asyncio
+import csv
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import ROUND_HALF_UP, Decimal
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+import numpy as np
+from pydantic import BaseModel, Field
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from config import FX_RATES_RELOAD_SECONDS, INVOICE_CURRENCY
+from database import FxRate, Invoice
+from db_session import async_session_scope, session_scope
+from service_layer.invoice_service import INVOICE_NUMBER_PATTERN
+from tracing import traced
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+CURRENCY_RE = re.compile(r"^[A-Z]{3}$")
+# Digits after the decimal point, for currencies that do not use two.
+MINOR_UNITS = {"ISK": 0, "JPY": 0, "KRW": 0}
+RATE_PLACES = Decimal("0.000001")
+ROUNDING = ROUND_HALF_UP
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+INSERT_ROWS = 5000
+
+
+class MissingRateError(LookupError):
+    """No rate is known on or before a requested day."""
+
+
+class Conversion(BaseModel):
+    amount: Decimal = Field(description="The amount before conversion.")
+    from_currency: str = Field(description="Currency of the amount, e.g. USD.")
+    converted: Decimal = Field(description="The amount in the target currency.")
+    to_currency: str = Field(description="Target currency, e.g. EUR.")
+    rate: Decimal = Field(description="Target currency units per source unit.")
+    rate_date: date = Field(
+        description="Day of the reference rate, the latest on or before the day asked."
+    )
+
+
+class InvoiceConversion(Conversion):
+    invoice_number: str = Field(
+        pattern=INVOICE_NUMBER_PATTERN, description="The invoice number."
+    )
+    issued_date: datetime = Field(
+        description="When the invoice was issued; the rate is that day's."
+    )
+
+
+def parse_currency(currency: str) -> str:
+    """Upper-case ISO 4217 code.
+
+    :raises ValueError: if ``currency`` is not three letters
+    """
+    code = currency.strip().upper()
+    if not CURRENCY_RE.match(code):
+        raise ValueError(f"{currency!r} is not a currency code like EUR or USD")
+    return code
+
+
+def _day_array(days: Sequence[date]) -> np.ndarray:
+    # Through ordinals: numpy parses date objects one by one, 20 times slower.
+    ordinals = np.fromiter(map(date.toordinal, days), np.int64, len(days))
+    return (ordinals - EPOCH_ORDINAL).astype("datetime64[D]")
+
+
+def _decimal(value) -> Decimal:
+    # str() keeps 0.1 as 0.1 instead of its binary expansion.
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+class RateTable:
+    """Date × currency matrix of units per euro, forward-filled over days."""
+
+    def __init__(self) -> None:
+        self._replace(np.empty(0, dtype="datetime64[D]"), {"EUR": 0}, [])
+        self.loaded_at = 0.0
+        self.loaded = False
+
+    def _replace(self, dates, currencies, rows) -> None:
+        units = np.full((len(dates), len(currencies)), np.nan)
+        for row, column, value in rows:
+            units[row, column] = value
+        units[:, currencies["EUR"]] = 1.0
+        # Row holding the rate in force on each day: the last one with a value.
+        source = np.where(np.isnan(units), 0, np.arange(len(dates))[:, None])
+        np.maximum.accumulate(source, axis=0, out=source)
+        filled = np.take_along_axis(units, source, axis=0)
+        # One assignment, so readers never see a half-replaced table.
+        self._state = (dates, currencies, filled, source)
+
+    def build(self, rows: Iterable[tuple[date, str, Decimal]]) -> None:
+        """Replace the table with ``(rate_date, currency, units_per_eur)`` rows."""
+        rows = list(rows)
+        days = sorted({row[0] for row in rows})
+        day_index = {day: i for i, day in enumerate(days)}
+        codes = sorted({row[1] for row in rows} | {"EUR"})
+        currencies = {code: i for i, code in enumerate(codes)}
+        self._replace(
+            np.array(days, dtype="datetime64[D]"),
+            currencies,
+            [
+                (day_index[day], currencies[code], float(units))
+                for day, code, units in rows
+            ],
+        )
+        self.loaded_at = time.monotonic()
+        self.loaded = True
+
+    def invalidate(self) -> None:
+        """Reload from the database on the next lookup."""
+        self.loaded = False
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Days with at least one rate, ascending."""
+        return self._state[0]
+
+    @property
+    def currencies(self) -> list[str]:
+        return list(self._state[1])
+
+    @property
+    def latest_date(self) -> date | None:
+        return self.dates[-1].item() if len(self.dates) else None
+
+    def _units(self, currency: str, days: np.ndarray):
+        dates, currencies, units, source = self._state
+        column = currencies.get(currency)
+        if column is None:
+            known = ", ".join(currencies)
+            raise ValueError(f"No rates for {currency}; known currencies: {known}")
+        rows = np.searchsorted(dates, days, side="right") - 1
+        clipped = np.maximum(rows, 0)
+        values = np.where(rows >= 0, units[clipped, column], np.nan)
+        return values, dates[source[clipped, column]]
+
+    def has_rates(
+        self, from_currency: str, to_currency: str, days: Sequence[date]
+    ) -> np.ndarray:
+        """Boolean mask of the days on or after the first rate of both currencies.
+
+        :raises ValueError: if a currency code is malformed or has no rates
+        """
+        day_array = _day_array(days)
+        from_units, _ = self._units(parse_currency(from_currency), day_array)
+        to_units, _ = self._units(parse_currency(to_currency), day_array)
+        return ~(np.isnan(from_units) | np.isnan(to_units))
+
+    def convert_batch(
+        self,
+        amounts: Sequence,
+        from_currency: str,
+        to_currency: str,
+        days: Sequence[date],
+    ) -> "ConvertedBatch":
+        """Convert each amount at the rate of its day, as arrays.
+
+        :param amounts: numbers, Decimals or numeric strings
+        :type amounts: Sequence
+        :param from_currency: currency of the amounts
+        :type from_currency: str
+        :param to_currency: currency to convert to
+        :type to_currency: str
+        :param days: the day of each amount; datetimes count as their day
+        :type days: Sequence[date]
+        :raises ValueError: if a currency code is malformed or has no rates
+        :raises MissingRateError: if a day precedes the first rate of a currency
+        :return: converted amounts and their rates, aligned with ``amounts``
+        :rtype: ConvertedBatch
+        """
+        from_currency = parse_currency(from_currency)
+        to_currency = parse_currency(to_currency)
+        day_array = _day_array(days)
+        from_units, from_days = self._units(from_currency, day_array)
+        to_units, to_days = self._units(to_currency, day_array)
+        missing = np.isnan(from_units) | np.isnan(to_units)
+        if missing.any():
+            first = day_array[missing].min().item()
+            raise MissingRateError(
+                f"No {from_currency}/{to_currency} rate on or before {first}"
+            )
+        digits = MINOR_UNITS.get(to_currency, 2)
+        values = np.asarray(amounts, dtype=np.float64)
+        scaled = values * (to_units / from_units) * 10.0**digits
+        magnitude = np.abs(scaled)
+        # ROUND_HALF_UP rounds halves away from zero.
+        minor_units = (np.sign(scaled) * np.floor(magnitude + 0.5)).astype(np.int64)
+        near_half = np.abs(magnitude - np.floor(magnitude) - 0.5) <= np.maximum(
+            1e-6, magnitude * 1e-12
+        )
+        batch = ConvertedBatch(
+            from_currency,
+            to_currency,
+            digits,
+            minor_units,
+            from_units,
+            to_units,
+            np.maximum(from_days, to_days),
+        )
+        for i in np.flatnonzero(near_half).tolist():
+            exact = _decimal(amounts[i]) * batch.cross_rate(i)
+            minor_units[i] = int(exact.scaleb(digits).quantize(Decimal(1), ROUNDING))
+        return batch
+
+    def convert(
+        self,
+        amounts: Sequence,
+        from_currency: str,
+        to_currency: str,
+        days: Sequence[date],
+    ) -> list[Conversion]:
+        """:meth:`convert_batch`, as one :class:`Conversion` per amount."""
+        batch = self.convert_batch(amounts, from_currency, to_currency, days)
+        rate_dates = batch.rate_dates.tolist()
+        pairs = list(zip(batch.from_units.tolist(), batch.to_units.tolist()))
+        rates: dict[tuple[float, float], Decimal] = {}
+        conversions = []
+        for i, (amount, minor_units) in enumerate(
+            zip(amounts, batch.minor_units.tolist())
+        ):
+            # Amounts of the same day share their rate.
+            rate = rates.get(pairs[i])
+            if rate is None:
+                rate = batch.cross_rate(i).quantize(RATE_PLACES, ROUNDING)
+                rates[pairs[i]] = rate
+            conversions.append(
+                Conversion(
+                    amount=_decimal(amount),
+                    from_currency=batch.from_currency,
+                    converted=Decimal(minor_units).scaleb(-batch.digits),
+                    to_currency=batch.to_currency,
+                    rate=rate,
+                    rate_date=rate_dates[i],
+                )
+            )
+        return conversions
+
+
+@dataclass
+class ConvertedBatch:
+    """Amounts converted by :meth:`RateTable.convert_batch`, as parallel arrays."""
+
+    from_currency: str
+    to_currency: str
+    digits: int  # of the target currency's minor unit
+    minor_units: np.ndarray  # int64 converted amounts, e.g. cents
+    from_units: np.ndarray  # units per euro of the source currency
+    to_units: np.ndarray  # units per euro of the target currency
+    rate_dates: np.ndarray  # datetime64[D] day of the rates used
+
+    def cross_rate(self, i: int) -> Decimal:
+        """Exact target units per source unit of amount ``i``."""
+        # Rates are stored with six decimals, which float64 round-trips.
+        return _decimal(float(self.to_units[i])) / _decimal(float(self.from_units[i]))
+
+
+fx_rates = RateTable()
+_load_lock = threading.Lock()
+
+
+def _rates_query():
+    return select(FxRate.rate_date, FxRate.currency, FxRate.units_per_eur)
+
+
+def _is_stale() -> bool:
+    age = time.monotonic() - fx_rates.loaded_at
+    return not fx_rates.loaded or age >= FX_RATES_RELOAD_SECONDS
+
+
+@traced
+def load_fx_rates(session: Session | None = None, force: bool = False) -> RateTable:
+    """Load :data:`fx_rates` from the database if never loaded or stale."""
+    with _load_lock:
+        if force or _is_stale():
+            with session_scope(session) as session:
+                fx_rates.build(session.execute(_rates_query()))
+    return fx_rates
+
+
+@traced
+async def load_fx_rates_async(
+    session: "AsyncSession | None" = None, force: bool = False
+) -> RateTable:
+    """Async variant of :func:`load_fx_rates`; the matrix is built in a thread."""
+    if force or _is_stale():
+        async with async_session_scope(session) as session:
+            rows = (await session.execute(_rates_query())).all()
+        await asyncio.to_thread(fx_rates.build, rows)
+    return fx_rates
+
+
+def _days(table: RateTable, on_date: date | None, count: int) -> list[date]:
+    day = on_date or table.latest_date
+    if day is None:
+        raise MissingRateError("No exchange rates are loaded")
+    return [day] * count
+
+
+@traced
+def convert_amounts(
+    amounts: list[float],
+    from_currency: str = INVOICE_CURRENCY,
+    to_currency: str = "EUR",
+    on_date: date | None = None,
+    session: Session | None = None,
+) -> list[Conversion]:
+    """Convert amounts between currencies at the rate of one day.
+
+    :param amounts: amounts in ``from_currency``
+    :type amounts: list[float]
+    :param from_currency: currency of the amounts
+    :type from_currency: str
+    :param to_currency: currency to convert to
+    :type to_currency: str
+    :param on_date: day of the rate; the latest day with rates if omitted
+    :type on_date: date | None
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: Session | None
+    :raises ValueError: if a currency is malformed or unknown
+    :raises MissingRateError: if there is no rate on or before the day
+    :return: one conversion per amount, in order
+    :rtype: list[Conversion]
+    """
+    table = load_fx_rates(session)
+    days = _days(table, on_date, len(amounts))
+    return table.convert(amounts, from_currency, to_currency, days)
+
+
+@traced
+async def convert_amounts_async(
+    amounts: list[float],
+    from_currency: str = INVOICE_CURRENCY,
+    to_currency: str = "EUR",
+    on_date: date | None = None,
+    session: "AsyncSession | None" = None,
+) -> list[Conversion]:
+    """Async variant of :func:`convert_amounts`."""
+    table = await load_fx_rates_async(session)
+    days = _days(table, on_date, len(amounts))
+    return table.convert(amounts, from_currency, to_currency, days)
+
+
+def _invoices_query(invoice_numbers: list[str]):
+    return select(Invoice.invoice_number, Invoice.amount, Invoice.issued_date).where(
+        Invoice.invoice_number.in_(set(invoice_numbers))
+    )
+
+
+def _convert_invoices(
+    table: RateTable, invoice_numbers: list[str], currency: str, rows
+) -> list[InvoiceConversion | MissingRateError | None]:
+    currency = parse_currency(currency)
+    covered = table.has_rates(
+        INVOICE_CURRENCY, currency, [row.issued_date for row in rows]
+    ).tolist()
+    # Invoices issued before the first rate are reported one by one, so they
+    # do not fail the conversion of the others.
+    by_number: dict[str, InvoiceConversion | MissingRateError] = {
+        row.invoice_number: MissingRateError(
+            f"No {INVOICE_CURRENCY}/{currency} rate on or before "
+            f"{row.issued_date:%Y-%m-%d} for Invoice ID: {row.invoice_number}"
+        )
+        for row, has_rate in zip(rows, covered)
+        if not has_rate
+    }
+    rows = [row for row, has_rate in zip(rows, covered) if has_rate]
+    conversions = table.convert(
+        [row.amount for row in rows],
+        INVOICE_CURRENCY,
+        currency,
+        [row.issued_date for row in rows],
+    )
+    for row, conversion in zip(rows, conversions):
+        by_number[row.invoice_number] = InvoiceConversion(
+            **conversion.model_dump(),
+            invoice_number=row.invoice_number,
+            issued_date=row.issued_date,
+        )
+    return [by_number.get(invoice_number) for invoice_number in invoice_numbers]
+
+
+@traced
+def convert_invoices(
+    invoice_numbers: list[str],
+    currency: str = "EUR",
+    session: Session | None = None,
+) -> list[InvoiceConversion | MissingRateError | None]:
+    """Convert invoice amounts at the rate of each invoice's issue date.
+
+    :param invoice_numbers: invoices to convert, e.g. ["INV-02398-JM"]
+    :type invoice_numbers: list[str]
+    :param currency: currency to convert to
+    :type currency: str
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: Session | None
+    :raises ValueError: if the currency is malformed or unknown
+    :return: one conversion per invoice number, in order; None if not found and
+        a :class:`MissingRateError` if the invoice predates the first rate
+    :rtype: list[InvoiceConversion | MissingRateError | None]
+    """
+    table = load_fx_rates(session)
+    with session_scope(session) as session:
+        rows = session.execute(_invoices_query(invoice_numbers)).all()
+    return _convert_invoices(table, invoice_numbers, currency, rows)
+
+
+@traced
+async def convert_invoices_async(
+    invoice_numbers: list[str],
+    currency: str = "EUR",
+    session: "AsyncSession | None" = None,
+) -> list[InvoiceConversion | MissingRateError | None]:
+    """Async variant of :func:`convert_invoices`."""
+    # Not inside the scope below: a run session is handed to one user at a time.
+    table = await load_fx_rates_async(session)
+    async with async_session_scope(session) as session:
+        rows = (await session.execute(_invoices_query(invoice_numbers))).all()
+    return _convert_invoices(table, invoice_numbers, currency, rows)
+
+
+def read_ecb_csv(path: str) -> list[dict]:
+    """``fx_rates`` rows of a file laid out like the ECB's eurofxref-hist.csv.
+
+    The first column is the day, every other one a currency in units per
+    euro; "N/A" and empty cells are skipped.
+    """
+    rows = []
+    with open(path, newline="") as file:
+        for record in csv.DictReader(file, skipinitialspace=True):
+            day = date.fromisoformat(record.pop("Date").strip())
+            for currency, value in record.items():
+                value = (value or "").strip()
+                if currency and CURRENCY_RE.match(currency.strip()) and value:
+                    if value != "N/A":
+                        rows.append(
+                            {
+                                "rate_date": day,
+                                "currency": currency.strip(),
+                                "units_per_eur": Decimal(value),
+                            }
+                        )
+    return rows
+
+
+@traced
+def import_ecb_csv(path: str, session: Session | None = None) -> int:
+    """Replace the rates of the days in an ECB-style CSV file.
+
+    :param path: file laid out like the ECB's eurofxref-hist.csv
+    :type path: str
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: Session | None
+    :return: number of rates written
+    :rtype: int
+    """
+    rows = read_ecb_csv(path)
+    days = sorted({row["rate_date"] for row in rows})
+    with session_scope(session) as session:
+        for start in range(0, len(days), INSERT_ROWS):
+            chunk = days[start : start + INSERT_ROWS]
+            session.execute(delete(FxRate).where(FxRate.rate_date.in_(chunk)))
+        for start in range(0, len(rows), INSERT_ROWS):
+            session.execute(insert(FxRate), rows[start : start + INSERT_ROWS])
+    fx_rates.invalidate()
+    return len(rows)
+
+
+if __name__ == "__main__":
+    for csv_path in sys.argv[1:]:
+        print(f"{csv_path}: {import_ecb_csv(csv_path):,} rates")
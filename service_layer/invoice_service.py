@@ -1,15 +1,26 @@
 from datetime import datetime
+from typing import TYPE_CHECKING
 
 from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
 
-from database import Customer, Invoice, Session
+from database import Customer, Invoice
+from db_session import async_session_scope, session_scope
+from service_layer.cache import invoice_cache
+from tracing import traced
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+INVOICE_NUMBER_PATTERN = r"^INV-\d+-[A-Za-z]+$"
 
 
 class InvoiceDetails(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
     invoice_number: str = Field(
-        pattern=r"^INV-\d+-[A-Za-z]+$",
+        pattern=INVOICE_NUMBER_PATTERN,
         description="The unique identifier for the invoice, e.g., INV-02398-JM.",
         examples=["INV-02398-JM"],
     )
@@ -24,22 +35,100 @@ class InvoiceDetails(BaseModel):
     )
 
 
-def get_invoice_infos(invoice_number: str):
-    session = Session()
-    row = (
-        session.query(
-            Invoice.invoice_number,
-            Invoice.amount,
-            Invoice.due_date,
-            Invoice.issued_date,
-            Customer.name.label("customer_name"),
-            Customer.email.label("customer_email"),
-        )
-        .join(Customer, Invoice.customer_id == Customer.id)
-        .filter(Invoice.invoice_number == invoice_number)
-        .first()
-    )
+def _invoice_select() -> Select:
+    return select(
+        Invoice.invoice_number,
+        Invoice.amount,
+        Invoice.due_date,
+        Invoice.issued_date,
+        Customer.name.label("customer_name"),
+        Customer.email.label("customer_email"),
+    ).join(Customer, Invoice.customer_id == Customer.id)
+
+
+def _invoice_query(invoice_number: str) -> Select:
+    return _invoice_select().where(Invoice.invoice_number == invoice_number).limit(1)
+
+
+def _invoices_query(invoice_numbers: list[str]) -> Select:
+    return _invoice_select().where(Invoice.invoice_number.in_(set(invoice_numbers)))
+
+
+def _by_invoice_number(rows) -> dict[str, InvoiceDetails]:
+    return {
+        row.invoice_number: InvoiceDetails.model_validate(row, from_attributes=True)
+        for row in rows
+    }
+
+
+@traced
+def get_invoice_infos(invoice_number: str, session: Session | None = None):
+    hit, details = invoice_cache.get(invoice_number)
+    if hit:
+        return details
+    with session_scope(session) as session:
+        row = session.execute(_invoice_query(invoice_number)).first()
+
+    details = InvoiceDetails.model_validate(row, from_attributes=True) if row else None
+    invoice_cache.set(invoice_number, details)
+    return details
+
+
+@traced
+async def get_invoice_infos_async(
+    invoice_number: str, session: "AsyncSession | None" = None
+) -> InvoiceDetails | None:
+    """Async variant of :func:`get_invoice_infos` that does not block the event loop.
+
+    :param invoice_number: The invoice number, e.g. INV-02398-JM.
+    :type invoice_number: str
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: AsyncSession | None
+    :return: The invoice details or None if not found.
+    :rtype: InvoiceDetails | None
+    """
+    hit, details = invoice_cache.get(invoice_number)
+    if hit:
+        return details
+    async with async_session_scope(session) as session:
+        row = (await session.execute(_invoice_query(invoice_number))).first()
+
+    details = InvoiceDetails.model_validate(row, from_attributes=True) if row else None
+    invoice_cache.set(invoice_number, details)
+    return details
+
+
+@traced
+def get_invoice_infos_many(
+    invoice_numbers: list[str], session: Session | None = None
+) -> list[InvoiceDetails | None]:
+    """Resolve many invoice numbers with a single ``IN (...)`` query.
+
+    Cached keys are served from the lookup cache; only the rest are queried.
+
+    :param invoice_numbers: Invoice numbers, e.g. ["INV-02398-JM", "INV-11111-AB"].
+    :type invoice_numbers: list[str]
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: Session | None
+    :return: One entry per requested number, in request order; None if not found.
+    :rtype: list[InvoiceDetails | None]
+    """
+    found, missing = invoice_cache.get_many(invoice_numbers)
+    if missing:
+        with session_scope(session) as session:
+            rows = session.execute(_invoices_query(missing)).all()
+        found |= invoice_cache.fill(missing, _by_invoice_number(rows))
+    return [found[invoice_number] for invoice_number in invoice_numbers]
+
 
-    if not row:
-        return None
-    return InvoiceDetails.model_validate(row, from_attributes=True)
+@traced
+async def get_invoice_infos_many_async(
+    invoice_numbers: list[str], session: "AsyncSession | None" = None
+) -> list[InvoiceDetails | None]:
+    """Async variant of :func:`get_invoice_infos_many`."""
+    found, missing = invoice_cache.get_many(invoice_numbers)
+    if missing:
+        async with async_session_scope(session) as session:
+            rows = (await session.execute(_invoices_query(missing))).all()
+        found |= invoice_cache.fill(missing, _by_invoice_number(rows))
+    return [found[invoice_number] for invoice_number in invoice_numbers]
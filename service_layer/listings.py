@@ -0,0 +1,367 @@
+"""Page-by-page listings of a customer's tickets and invoices.
+
+A customer can have thousands of tickets, so listings never load them all.
+Rows come newest first and are paged by keyset on ``(created_at, id)`` for
+tickets and ``(issued_date, id)`` for invoices: a page asks for the rows
+strictly before the last row of the previous page, which the indexes on
+``(customer_id, created_at, id)`` and ``(customer_id, issued_date, id)`` find
+without reading past the earlier pages, however deep the page.
+
+That position is handed out as an opaque cursor token with every page but
+the last. A token also names the listing, customer and filters it belongs
+to, and is refused for any other. Rows without a date are not listed.
+
+:func:`iter_customer_tickets` and :func:`iter_customer_invoices` walk a whole
+listing in one query instead, streaming the rows with ``yield_per`` (a
+server-side cursor on PostgreSQL) and yielding the same pages, for exports
+and batch jobs rather than for the model.
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterator
+
+from pydantic import BaseModel, Field
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.orm import Session
+
+from config import LISTING_MAX_PAGE_SIZE, LISTING_PAGE_SIZE
+from database import Customer, Invoice, Ticket
+from db_session import async_session_scope, session_scope
+from service_layer.customer_360 import InvoiceSummary, TicketSummary
+from service_layer.customer_details import customer_filter
+from service_layer.ticket_search import parse_status
+from tracing import traced
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class CustomerTicketPage(BaseModel):
+    customer_id: int = Field(description="Customer ID")
+    customer_email: str = Field(description="The customer's contact email.")
+    tickets: list[TicketSummary] = Field(description="Tickets, newest first.")
+    next_cursor: str | None = Field(
+        description="Pass back as cursor for the next page; None on the last page."
+    )
+
+
+class CustomerInvoicePage(BaseModel):
+    customer_id: int = Field(description="Customer ID")
+    customer_email: str = Field(description="The customer's contact email.")
+    invoices: list[InvoiceSummary] = Field(
+        description="Invoices, most recently issued first."
+    )
+    next_cursor: str | None = Field(
+        description="Pass back as cursor for the next page; None on the last page."
+    )
+
+
+@dataclass(frozen=True)
+class _Listing:
+    name: str
+    model: type
+    columns: tuple
+    customer_column: object
+    position_column: object
+    id_column: object
+
+
+TICKETS = _Listing(
+    "tickets",
+    Ticket,
+    (Ticket.id, Ticket.ticket_number, Ticket.subject, Ticket.status, Ticket.created_at),
+    Ticket.customer_id,
+    Ticket.created_at,
+    Ticket.id,
+)
+INVOICES = _Listing(
+    "invoices",
+    Invoice,
+    (
+        Invoice.id,
+        Invoice.invoice_number,
+        Invoice.amount,
+        Invoice.issued_date,
+        Invoice.due_date,
+    ),
+    Invoice.customer_id,
+    Invoice.issued_date,
+    Invoice.id,
+)
+
+
+def encode_cursor(scope: str, position: datetime, row_id: int) -> str:
+    """Opaque token for the rows after ``(position, row_id)`` in ``scope``."""
+    payload = json.dumps([scope, position.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, scope: str) -> tuple[datetime, int]:
+    """Position of a token made by :func:`encode_cursor` for ``scope``.
+
+    :raises ValueError: if the token is malformed or belongs to another scope
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        token_scope, position, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        position, row_id = datetime.fromisoformat(position), int(row_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError(f"Malformed cursor {token!r}; start without one") from exc
+    if token_scope != scope:
+        raise ValueError(
+            "The cursor belongs to another listing; start without one "
+            "or keep the customer and filters of the previous page"
+        )
+    return position, row_id
+
+
+def clamp_page_size(page_size: int) -> int:
+    return max(1, min(page_size, LISTING_MAX_PAGE_SIZE))
+
+
+def _customer_query(customer: str) -> Select:
+    condition = customer_filter(Customer.id, customer)
+    if condition is None:
+        raise ValueError("A customer ID or email address is required")
+    return select(Customer.id, Customer.email).where(condition)
+
+
+def _scope(listing: _Listing, customer_id: int, filters: dict) -> str:
+    values = ",".join(f"{key}={value}" for key, value in sorted(filters.items()))
+    return f"{listing.name}:{customer_id}:{values}"
+
+
+def _rows_query(
+    listing: _Listing,
+    customer_id: int,
+    filters: dict,
+    after: tuple[datetime, int] | None = None,
+) -> Select:
+    query = select(*listing.columns).where(
+        listing.customer_column == customer_id,
+        listing.position_column.is_not(None),
+        *(
+            getattr(listing.model, column) == value
+            for column, value in filters.items()
+        ),
+    )
+    if after is not None:
+        query = query.where(
+            tuple_(listing.position_column, listing.id_column) < tuple_(*after)
+        )
+    return query.order_by(listing.position_column.desc(), listing.id_column.desc())
+
+
+def _cursor(listing: _Listing, scope: str, row) -> str:
+    position = getattr(row, listing.position_column.key)
+    return encode_cursor(scope, position, getattr(row, listing.id_column.key))
+
+
+def _page(listing: _Listing, customer, rows, next_cursor: str | None):
+    if listing is TICKETS:
+        return CustomerTicketPage(
+            customer_id=customer.id,
+            customer_email=customer.email,
+            tickets=[TicketSummary.model_validate(row) for row in rows],
+            next_cursor=next_cursor,
+        )
+    return CustomerInvoicePage(
+        customer_id=customer.id,
+        customer_email=customer.email,
+        invoices=[InvoiceSummary.model_validate(row) for row in rows],
+        next_cursor=next_cursor,
+    )
+
+
+def _page_query(
+    listing: _Listing, customer, filters: dict, cursor: str | None, page_size: int
+) -> tuple[Select, str]:
+    scope = _scope(listing, customer.id, filters)
+    after = decode_cursor(cursor, scope) if cursor else None
+    query = _rows_query(listing, customer.id, filters, after).limit(page_size + 1)
+    return query, scope
+
+
+def _fetch_page(session: Session, listing, customer_key, filters, cursor, page_size):
+    customer = session.execute(_customer_query(customer_key)).first()
+    if customer is None:
+        return None
+    query, scope = _page_query(listing, customer, filters, cursor, page_size)
+    rows = session.execute(query).all()
+    return _result(listing, customer, scope, rows, page_size)
+
+
+def _result(listing: _Listing, customer, scope: str, rows, page_size: int):
+    # The query reads one row past the page to tell whether there is a next.
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = _cursor(listing, scope, rows[-1])
+    return _page(listing, customer, rows, next_cursor)
+
+
+async def _fetch_page_async(
+    session: "AsyncSession", listing, customer_key, filters, cursor, page_size
+):
+    customer = (await session.execute(_customer_query(customer_key))).first()
+    if customer is None:
+        return None
+    query, scope = _page_query(listing, customer, filters, cursor, page_size)
+    rows = (await session.execute(query)).all()
+    return _result(listing, customer, scope, rows, page_size)
+
+
+def _ticket_filters(status: str | None) -> dict:
+    ticket_status = parse_status(status)
+    return {} if ticket_status is None else {"status": ticket_status}
+
+
+@traced
+def list_customer_tickets(
+    customer: str,
+    status: str | None = None,
+    cursor: str | None = None,
+    page_size: int = LISTING_PAGE_SIZE,
+    session: Session | None = None,
+) -> CustomerTicketPage | None:
+    """One page of a customer's tickets, newest first.
+
+    :param customer: customer ID or email address
+    :type customer: str
+    :param status: only tickets with this status: Open, Pending, Resolved or Closed
+    :type status: str | None
+    :param cursor: ``next_cursor`` of the previous page; None for the first page
+    :type cursor: str | None
+    :param page_size: tickets per page, up to ``LISTING_MAX_PAGE_SIZE``
+    :type page_size: int
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: Session | None
+    :raises ValueError: if the customer, status or cursor is not valid
+    :return: the page, or None if the customer is not found
+    :rtype: CustomerTicketPage | None
+    """
+    filters = _ticket_filters(status)
+    with session_scope(session) as session:
+        return _fetch_page(
+            session, TICKETS, customer, filters, cursor, clamp_page_size(page_size)
+        )
+
+
+@traced
+async def list_customer_tickets_async(
+    customer: str,
+    status: str | None = None,
+    cursor: str | None = None,
+    page_size: int = LISTING_PAGE_SIZE,
+    session: "AsyncSession | None" = None,
+) -> CustomerTicketPage | None:
+    """Async variant of :func:`list_customer_tickets`."""
+    filters = _ticket_filters(status)
+    async with async_session_scope(session) as session:
+        return await _fetch_page_async(
+            session, TICKETS, customer, filters, cursor, clamp_page_size(page_size)
+        )
+
+
+@traced
+def list_customer_invoices(
+    customer: str,
+    cursor: str | None = None,
+    page_size: int = LISTING_PAGE_SIZE,
+    session: Session | None = None,
+) -> CustomerInvoicePage | None:
+    """One page of a customer's invoices, most recently issued first.
+
+    :param customer: customer ID or email address
+    :type customer: str
+    :param cursor: ``next_cursor`` of the previous page; None for the first page
+    :type cursor: str | None
+    :param page_size: invoices per page, up to ``LISTING_MAX_PAGE_SIZE``
+    :type page_size: int
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: Session | None
+    :raises ValueError: if the customer or cursor is not valid
+    :return: the page, or None if the customer is not found
+    :rtype: CustomerInvoicePage | None
+    """
+    with session_scope(session) as session:
+        return _fetch_page(
+            session, INVOICES, customer, {}, cursor, clamp_page_size(page_size)
+        )
+
+
+@traced
+async def list_customer_invoices_async(
+    customer: str,
+    cursor: str | None = None,
+    page_size: int = LISTING_PAGE_SIZE,
+    session: "AsyncSession | None" = None,
+) -> CustomerInvoicePage | None:
+    """Async variant of :func:`list_customer_invoices`."""
+    async with async_session_scope(session) as session:
+        return await _fetch_page_async(
+            session, INVOICES, customer, {}, cursor, clamp_page_size(page_size)
+        )
+
+
+def _stream(
+    listing: _Listing,
+    customer_key: str,
+    filters: dict,
+    page_size: int,
+    session: Session | None,
+) -> Iterator:
+    with session_scope(session) as session:
+        customer = session.execute(_customer_query(customer_key)).first()
+        if customer is None:
+            return
+        scope = _scope(listing, customer.id, filters)
+        query = _rows_query(listing, customer.id, filters)
+        result = session.execute(query.execution_options(yield_per=page_size))
+        previous = None
+        for rows in result.partitions():
+            if previous is not None:
+                cursor = _cursor(listing, scope, previous[-1])
+                yield _page(listing, customer, previous, cursor)
+            previous = rows
+        if previous is not None:
+            yield _page(listing, customer, previous, None)
+
+
+def iter_customer_tickets(
+    customer: str,
+    status: str | None = None,
+    page_size: int = 1000,
+    session: Session | None = None,
+) -> Iterator[CustomerTicketPage]:
+    """Stream all of a customer's tickets, newest first, in pages.
+
+    Pages carry the same cursors as :func:`list_customer_tickets`. Nothing is
+    yielded for an unknown customer.
+
+    :param customer: customer ID or email address
+    :type customer: str
+    :param status: only tickets with this status
+    :type status: str | None
+    :param page_size: rows fetched from the database at a time
+    :type page_size: int
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: Session | None
+    :raises ValueError: if the customer or status is not valid
+    :return: pages until the last ticket
+    :rtype: Iterator[CustomerTicketPage]
+    """
+    return _stream(TICKETS, customer, _ticket_filters(status), page_size, session)
+
+
+def iter_customer_invoices(
+    customer: str, page_size: int = 1000, session: Session | None = None
+) -> Iterator[CustomerInvoicePage]:
+    """Stream all of a customer's invoices, most recent first, in pages.
+
+    See :func:`iter_customer_tickets`.
+    """
+    return _stream(INVOICES, customer, {}, page_size, session)
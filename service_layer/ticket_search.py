@@ -0,0 +1,315 @@
+"""Ranked full-text search over ticket subjects and descriptions.
+
+SQLite queries the ``tickets_fts`` FTS5 table ranked by BM25, PostgreSQL the
+GIN-indexed ``tickets.search_vector`` ranked by ``ts_rank_cd``; both are
+created by the add_ticket_full_text_search migration (or ``create_all``, see
+``database.TICKET_SEARCH_DDL``). Other backends fall back to an unranked
+``LIKE`` scan. Subject matches weigh more than description matches.
+
+Ranking cost grows with the number of matching tickets: a word found in most
+tickets is scored for every one of them, a rare word is nearly free.
+
+Free text is reduced to its words, all of which must match (a ticket about
+"refund" also matches "refunds"), so user input never reaches the FTS query
+syntax.
+"""
+
+import re
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel, Field
+from sqlalchemy import (
+    Integer,
+    Select,
+    column,
+    func,
+    literal,
+    literal_column,
+    select,
+    table,
+)
+from sqlalchemy.orm import Session
+
+from config import TICKET_SEARCH_MAX_PAGE_SIZE, TICKET_SEARCH_PAGE_SIZE
+from database import Customer, Ticket, TicketStatus
+from db_session import async_session_scope, session_scope
+from service_layer.customer_details import customer_filter
+from service_layer.ticket_service import TICKET_NUMBER_PATTERN
+from tracing import traced
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+TERM_RE = re.compile(r"\w+")
+MAX_TERMS = 16
+SNIPPET_WORDS = 16
+# BM25 column weights of (subject, description).
+SUBJECT_WEIGHT = 4.0
+DESCRIPTION_WEIGHT = 1.0
+
+tickets_fts = table("tickets_fts", column("rowid", Integer))
+
+
+class TicketSearchHit(BaseModel):
+    ticket_number: str = Field(
+        pattern=TICKET_NUMBER_PATTERN, description="The ticket number, e.g. TKT-1001."
+    )
+    subject: str = Field(description="Short summary of the issue.")
+    snippet: str = Field(description="Matching part of the description.")
+    status: str = Field(description="The current lifecycle status of the ticket.")
+    created_at: datetime = Field(description="When the ticket was created.")
+    customer_email: str = Field(description="Email of the customer who raised it.")
+    score: float = Field(description="Relevance; higher is a better match.")
+
+
+class TicketSearchPage(BaseModel):
+    query: str = Field(description="The search text as given.")
+    page: int = Field(description="1-based page number.")
+    page_size: int = Field(description="Maximum hits per page.")
+    hits: list[TicketSearchHit] = Field(description="Best matches first.")
+    has_more: bool = Field(description="Whether a next page exists.")
+
+
+def search_terms(text: str) -> list[str]:
+    """Distinct lower-cased words of a free-text query, at most ``MAX_TERMS``."""
+    return list(dict.fromkeys(TERM_RE.findall(text.lower())))[:MAX_TERMS]
+
+
+def parse_status(status: str | None) -> TicketStatus | None:
+    """Match a status filter against the names and values of ``TicketStatus``.
+
+    :raises ValueError: if the status is not a known ticket status
+    """
+    if not status:
+        return None
+    for member in TicketStatus:
+        if status.strip().lower() in (member.name.lower(), member.value.lower()):
+            return member
+    known = ", ".join(member.value for member in TicketStatus)
+    raise ValueError(f"Unknown ticket status {status!r}; expected one of {known}")
+
+
+def _sqlite_ranked(terms: list[str], status, customer_filter) -> Select:
+    match = " ".join(f'"{term}"' for term in terms)
+    fts = literal_column("tickets_fts")
+    # bm25() is negative, more negative for better matches.
+    rank = func.bm25(fts, SUBJECT_WEIGHT, DESCRIPTION_WEIGHT)
+    query = select(tickets_fts.c.rowid.label("id"), (-rank).label("score")).where(
+        fts.op("MATCH")(match)
+    )
+    # Tickets are only joined to filter by status. A customer's tickets are
+    # collected through their index and checked against the matches; the unary
+    # plus keeps SQLite from instead running the full-text query once per id.
+    if status is not None:
+        query = query.join(Ticket, Ticket.id == tickets_fts.c.rowid).where(
+            Ticket.status == status
+        )
+    if customer_filter is not None:
+        unindexed_rowid = literal_column("+tickets_fts.rowid", Integer)
+        query = query.where(
+            unindexed_rowid.in_(select(Ticket.id).where(customer_filter))
+        )
+    return query
+
+
+def _filtered(query: Select, status, customer_filter) -> Select:
+    if status is not None:
+        query = query.where(Ticket.status == status)
+    if customer_filter is not None:
+        query = query.where(customer_filter)
+    return query
+
+
+def _postgresql_ranked(terms: list[str], status, customer_filter) -> Select:
+    query = func.plainto_tsquery("english", " ".join(terms))
+    search_vector = literal_column("tickets.search_vector")
+    ranked = select(
+        Ticket.id, func.ts_rank_cd(search_vector, query).label("score")
+    ).where(search_vector.op("@@")(query))
+    return _filtered(ranked, status, customer_filter)
+
+
+def _fallback_ranked(terms: list[str], status, customer_filter) -> Select:
+    query = select(Ticket.id, literal(0.0).label("score"))
+    for term in terms:
+        pattern = f"%{term}%"
+        query = query.where(
+            Ticket.subject.ilike(pattern) | Ticket.description.ilike(pattern)
+        )
+    return _filtered(query, status, customer_filter)
+
+
+RANKED_QUERIES = {"sqlite": _sqlite_ranked, "postgresql": _postgresql_ranked}
+
+
+def search_query(
+    dialect_name: str,
+    terms: list[str],
+    status: TicketStatus | None = None,
+    customer: str | None = None,
+    page: int = 1,
+    page_size: int = TICKET_SEARCH_PAGE_SIZE,
+) -> Select:
+    """Build the search statement for a dialect, one row past the page.
+
+    Matches are ranked and cut to the page on ticket ids and scores alone;
+    only the rows of the page are joined to their tickets and customers.
+    Equal scores list newer tickets first.
+
+    :param dialect_name: ``sqlite``, ``postgresql`` or any other backend
+    :type dialect_name: str
+    :param terms: words that must all match, see :func:`search_terms`
+    :type terms: list[str]
+    :param status: only tickets with this status
+    :type status: TicketStatus | None
+    :param customer: only tickets of this customer ID or email address
+    :type customer: str | None
+    :raises ValueError: if ``customer`` is neither an ID nor an email address
+    :return: statement selecting up to ``page_size + 1`` hits
+    :rtype: Select
+    """
+    ranked_query = RANKED_QUERIES.get(dialect_name, _fallback_ranked)
+    ranked = ranked_query(terms, status, customer_filter(Ticket.customer_id, customer))
+    hit = ranked.selected_columns
+    hits = (
+        ranked.order_by(hit.score.desc(), hit.id.desc())
+        .limit(page_size + 1)
+        .offset((page - 1) * page_size)
+        .subquery()
+    )
+    return (
+        select(
+            Ticket.ticket_number,
+            Ticket.subject,
+            Ticket.description,
+            Ticket.status,
+            Ticket.created_at,
+            Customer.email.label("customer_email"),
+            hits.c.score,
+        )
+        .select_from(hits)
+        .join(Ticket, Ticket.id == hits.c.id)
+        .join(Customer, Ticket.customer_id == Customer.id)
+        .order_by(hits.c.score.desc(), Ticket.id.desc())
+    )
+
+
+def snippet(text: str, terms: list[str], words: int = SNIPPET_WORDS) -> str:
+    """About ``words`` words of ``text`` around the first match, matches in [].
+
+    Words match a term when they share its first five letters, which roughly
+    follows the stemming of the full-text indexes.
+    """
+    prefixes = tuple(term[:5] for term in terms)
+    tokens = text.split()
+    matches = [
+        i for i, token in enumerate(tokens) if token.lower().startswith(prefixes)
+    ]
+    first = max(0, (matches[0] if matches else 0) - words // 4)
+    window = tokens[first : first + words]
+    marked = [
+        f"[{token}]" if first + i in matches else token
+        for i, token in enumerate(window)
+    ]
+    prefix = "..." if first else ""
+    suffix = "..." if first + words < len(tokens) else ""
+    return prefix + " ".join(marked) + suffix
+
+
+def _prepare(
+    text: str, status: str | None, page: int, page_size: int
+) -> tuple[list[str], TicketStatus | None, int, int]:
+    page_size = max(1, min(page_size, TICKET_SEARCH_MAX_PAGE_SIZE))
+    return search_terms(text), parse_status(status), max(page, 1), page_size
+
+
+def _page(text: str, page: int, page_size: int, rows) -> TicketSearchPage:
+    terms = search_terms(text)
+    return TicketSearchPage(
+        query=text,
+        page=page,
+        page_size=page_size,
+        hits=[
+            TicketSearchHit(
+                ticket_number=row.ticket_number,
+                subject=row.subject,
+                snippet=snippet(row.description, terms),
+                status=row.status.value,
+                created_at=row.created_at,
+                customer_email=row.customer_email,
+                score=row.score,
+            )
+            for row in rows[:page_size]
+        ],
+        has_more=len(rows) > page_size,
+    )
+
+
+@traced
+def search_tickets(
+    text: str,
+    status: str | None = None,
+    customer: str | None = None,
+    page: int = 1,
+    page_size: int = TICKET_SEARCH_PAGE_SIZE,
+    session: Session | None = None,
+) -> TicketSearchPage:
+    """Find tickets whose subject or description mention every word of ``text``.
+
+    :param text: free-text query, e.g. "refund not received"
+    :type text: str
+    :param status: only tickets with this status, e.g. "Open"
+    :type status: str | None
+    :param customer: only tickets of this customer ID or email address
+    :type customer: str | None
+    :param page: 1-based page number
+    :type page: int
+    :param page_size: hits per page, capped at ``TICKET_SEARCH_MAX_PAGE_SIZE``
+    :type page_size: int
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: Session | None
+    :raises ValueError: if ``status`` or ``customer`` cannot be parsed
+    :return: one page of hits, best matches first
+    :rtype: TicketSearchPage
+    """
+    terms, ticket_status, page, page_size = _prepare(text, status, page, page_size)
+    if not terms:
+        return _page(text, page, page_size, [])
+    with session_scope(session) as session:
+        query = search_query(
+            session.get_bind().dialect.name,
+            terms,
+            ticket_status,
+            customer,
+            page,
+            page_size,
+        )
+        rows = session.execute(query).all()
+    return _page(text, page, page_size, rows)
+
+
+@traced
+async def search_tickets_async(
+    text: str,
+    status: str | None = None,
+    customer: str | None = None,
+    page: int = 1,
+    page_size: int = TICKET_SEARCH_PAGE_SIZE,
+    session: "AsyncSession | None" = None,
+) -> TicketSearchPage:
+    """Async variant of :func:`search_tickets`."""
+    terms, ticket_status, page, page_size = _prepare(text, status, page, page_size)
+    if not terms:
+        return _page(text, page, page_size, [])
+    async with async_session_scope(session) as session:
+        query = search_query(
+            session.get_bind().dialect.name,
+            terms,
+            ticket_status,
+            customer,
+            page,
+            page_size,
+        )
+        rows = (await session.execute(query)).all()
+    return _page(text, page, page_size, rows)
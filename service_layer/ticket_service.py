@@ -1,15 +1,26 @@
 from datetime import datetime
+from typing import TYPE_CHECKING
 
 from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
 
-from database import Customer, Session, Ticket
+from database import Customer, Ticket
+from db_session import async_session_scope, session_scope
+from service_layer.cache import ticket_cache
+from tracing import traced
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+TICKET_NUMBER_PATTERN = r"^TKT-\d+$"
 
 
 class TicketDetails(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
     ticket_number: str = Field(
-        pattern=r"^TKT-\d+$",
+        pattern=TICKET_NUMBER_PATTERN,
         description="The unique identifier for the ticket, e.g., TKT-1001.",
         examples=["TKT-1001"],
     )
@@ -25,21 +36,99 @@ class TicketDetails(BaseModel):
     )
 
 
-def get_ticket_infos(ticket_number: str):
-    session = Session()
-    row = (
-        session.query(
-            Ticket.ticket_number,
-            Ticket.status,
-            Ticket.created_at,
-            Customer.name.label("customer_name"),
-            Customer.email.label("customer_email"),
-        )
-        .join(Customer, Ticket.customer_id == Customer.id)
-        .filter(Ticket.ticket_number == ticket_number)
-        .first()
-    )
+def _ticket_select() -> Select:
+    return select(
+        Ticket.ticket_number,
+        Ticket.status,
+        Ticket.created_at,
+        Customer.name.label("customer_name"),
+        Customer.email.label("customer_email"),
+    ).join(Customer, Ticket.customer_id == Customer.id)
+
+
+def _ticket_query(ticket_number: str) -> Select:
+    return _ticket_select().where(Ticket.ticket_number == ticket_number).limit(1)
+
+
+def _tickets_query(ticket_numbers: list[str]) -> Select:
+    return _ticket_select().where(Ticket.ticket_number.in_(set(ticket_numbers)))
+
+
+def _by_ticket_number(rows) -> dict[str, TicketDetails]:
+    return {
+        row.ticket_number: TicketDetails.model_validate(row, from_attributes=True)
+        for row in rows
+    }
+
+
+@traced
+def get_ticket_infos(ticket_number: str, session: Session | None = None):
+    hit, details = ticket_cache.get(ticket_number)
+    if hit:
+        return details
+    with session_scope(session) as session:
+        row = session.execute(_ticket_query(ticket_number)).first()
+
+    details = TicketDetails.model_validate(row, from_attributes=True) if row else None
+    ticket_cache.set(ticket_number, details)
+    return details
+
+
+@traced
+async def get_ticket_infos_async(
+    ticket_number: str, session: "AsyncSession | None" = None
+) -> TicketDetails | None:
+    """Async variant of :func:`get_ticket_infos` that does not block the event loop.
+
+    :param ticket_number: The ticket number, e.g. TKT-1001.
+    :type ticket_number: str
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: AsyncSession | None
+    :return: The ticket details or None if not found.
+    :rtype: TicketDetails | None
+    """
+    hit, details = ticket_cache.get(ticket_number)
+    if hit:
+        return details
+    async with async_session_scope(session) as session:
+        row = (await session.execute(_ticket_query(ticket_number))).first()
+
+    details = TicketDetails.model_validate(row, from_attributes=True) if row else None
+    ticket_cache.set(ticket_number, details)
+    return details
+
+
+@traced
+def get_ticket_infos_many(
+    ticket_numbers: list[str], session: Session | None = None
+) -> list[TicketDetails | None]:
+    """Resolve many ticket numbers with a single ``IN (...)`` query.
+
+    Cached keys are served from the lookup cache; only the rest are queried.
+
+    :param ticket_numbers: Ticket numbers, e.g. ["TKT-1001", "TKT-1002"].
+    :type ticket_numbers: list[str]
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: Session | None
+    :return: One entry per requested number, in request order; None if not found.
+    :rtype: list[TicketDetails | None]
+    """
+    found, missing = ticket_cache.get_many(ticket_numbers)
+    if missing:
+        with session_scope(session) as session:
+            rows = session.execute(_tickets_query(missing)).all()
+        found |= ticket_cache.fill(missing, _by_ticket_number(rows))
+    return [found[ticket_number] for ticket_number in ticket_numbers]
+
 
-    if not row:
-        return None
-    return TicketDetails.model_validate(row, from_attributes=True)
+@traced
+async def get_ticket_infos_many_async(
+    ticket_numbers: list[str], session: "AsyncSession | None" = None
+) -> list[TicketDetails | None]:
+    """Async variant of :func:`get_ticket_infos_many`."""
+    found, missing = ticket_cache.get_many(ticket_numbers)
+    if missing:
+        async with async_session_scope(session) as session:
+            rows = (await session.execute(_tickets_query(missing))).all()
+        found |= ticket_cache.fill(missing, _by_ticket_number(rows))
+    return [found[ticket_number] for ticket_number in ticket_numbers]
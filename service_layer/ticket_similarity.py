@@ -0,0 +1,674 @@
+"""Similar tickets: a local vector index over ticket subjects and descriptions.
+
+Every ticket becomes a fixed-size vector with the hashing trick. Its words
+and word pairs are weighted by TF-IDF, and each is added with a sign to one
+of ``TICKET_SIMILARITY_DIMENSIONS`` slots picked by its CRC32. Vectors are L2
+normalised, so the cosine similarity of two tickets is the dot product of
+their vectors. A batch of queries is scored against the index with one matrix
+product per chunk of rows. The best candidates are then rescored exactly on
+their hashed features, free of the collisions of the dense vectors. No model
+is downloaded and no network is used.
+
+:data:`ticket_index` has two parts. The base is a matrix sorted by ticket id;
+it can be saved to a directory and memory-mapped back. Tickets created or
+edited later go to a small in-memory delta, and their stale base row is
+masked out. :meth:`TicketVectorIndex.compact` merges the two parts.
+:func:`refresh_ticket_index` reads the tickets whose ``updated_at`` is at or
+after the newest one indexed, so changes are picked up without a rebuild.
+
+Document frequencies are counted per hashed feature as tickets are indexed.
+A ticket is weighted with the frequencies known when it is indexed; only a
+rebuild reweighs all of them. Deleted tickets are not seen by a refresh. They
+are dropped when the matches are joined back to the tickets table.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterable, Sequence
+
+import numpy as np
+from pydantic import BaseModel, Field
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+
+from config import (
+    TICKET_SIMILARITY_DIMENSIONS,
+    TICKET_SIMILARITY_INDEX_DIR,
+    TICKET_SIMILARITY_LIMIT,
+    TICKET_SIMILARITY_MAX_LIMIT,
+    TICKET_SIMILARITY_MIN_SCORE,
+    TICKET_SIMILARITY_REFRESH_SECONDS,
+)
+from database import Customer, Ticket
+from db_session import async_session_scope, session_scope
+from service_layer.ticket_service import TICKET_NUMBER_PATTERN
+from tracing import traced
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+TERM_RE = re.compile(r"\w{2,}")
+# Subject words count twice as much as description words.
+SUBJECT_WEIGHT = 2.0
+# Mixes the hashes of two words into the hash of the pair (FNV prime).
+PAIR_MULTIPLIER = 0x01000193
+# Document frequencies are counted in this many hash slots.
+DF_SLOTS = 1 << 20
+# Tickets read and vectorised per batch, and index rows per matrix product.
+CHUNK_ROWS = 10_000
+SCAN_ROWS = 65_536
+# Dense matches rescored exactly per match returned.
+CANDIDATES_PER_MATCH = 8
+# The delta is merged into the base once it outgrows this share of it.
+COMPACT_FRACTION = 0.1
+SUMMARY_CHARS = 240
+
+
+class SimilarTicket(BaseModel):
+    ticket_number: str = Field(
+        pattern=TICKET_NUMBER_PATTERN, description="The ticket number, e.g. TKT-1001."
+    )
+    subject: str = Field(description="Short summary of the issue.")
+    summary: str = Field(description="Start of the ticket description.")
+    status: str = Field(description="The current lifecycle status of the ticket.")
+    created_at: datetime = Field(description="When the ticket was created.")
+    updated_at: datetime | None = Field(
+        description="Last change to the ticket, e.g. when it was resolved."
+    )
+    customer_email: str = Field(description="Email of the customer who raised it.")
+    score: float = Field(description="Cosine similarity; 1 is the same wording.")
+
+
+@functools.lru_cache(maxsize=1 << 18)
+def term_hash(term: str) -> int:
+    return zlib.crc32(term.encode())
+
+
+def hashed_features(
+    documents: Sequence[tuple[str, str]],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Hashed words and word pairs of ``(subject, description)`` documents.
+
+    :return: document position, feature hash and weighted count of every
+        distinct (document, feature) pair, sorted by document
+    :rtype: tuple[np.ndarray, np.ndarray, np.ndarray]
+    """
+    hashes: list[int] = []
+    weights: list[float] = []
+    lengths: list[int] = []
+    for subject, description in documents:
+        subject_terms = TERM_RE.findall(subject.lower())
+        description_terms = TERM_RE.findall(description.lower())
+        hashes += map(term_hash, subject_terms)
+        hashes += map(term_hash, description_terms)
+        weights += [SUBJECT_WEIGHT] * len(subject_terms)
+        weights += [1.0] * len(description_terms)
+        lengths.append(len(subject_terms) + len(description_terms))
+    words = np.array(hashes, dtype=np.uint64)
+    word_weights = np.array(weights)
+    rows = np.repeat(np.arange(len(documents), dtype=np.uint64), lengths)
+    # Pairs of neighbouring words of the same document.
+    same = rows[1:] == rows[:-1]
+    pairs = (words[:-1][same] * PAIR_MULTIPLIER ^ words[1:][same]) & 0xFFFFFFFF
+    pair_weights = np.minimum(word_weights[:-1], word_weights[1:])[same]
+    keys = np.concatenate([rows << 32 | words, rows[1:][same] << 32 | pairs])
+    distinct, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(
+        inverse, weights=np.concatenate([word_weights, pair_weights])
+    )
+    return (distinct >> 32).astype(np.intp), distinct & 0xFFFFFFFF, counts
+
+
+class TicketVectorIndex:
+    """Thread-safe index of unit ticket vectors, queried by cosine similarity."""
+
+    def __init__(self, dimensions: int = TICKET_SIMILARITY_DIMENSIONS) -> None:
+        self.dimensions = dimensions
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._df = np.zeros(DF_SLOTS, dtype=np.int32)
+        self.num_documents = 0
+        self._base_ids = np.empty(0, dtype=np.int64)
+        self._base = np.empty((0, self.dimensions), dtype=np.float32)
+        self._base_alive = np.empty(0, dtype=bool)
+        self._delta_ids = np.empty(0, dtype=np.int64)
+        self._delta = np.empty((0, self.dimensions), dtype=np.float32)
+        self._delta_count = 0
+        self._delta_positions: dict[int, int] = {}
+        # Newest ``updated_at`` indexed and the tickets updated then; the next
+        # refresh reads from there and skips those tickets.
+        self.watermark: datetime | None = None
+        self._watermark_ids: set[int] = set()
+        self.refreshed_at = 0.0
+        self.loaded = False
+
+    def _replace(self, other: "TicketVectorIndex") -> None:
+        with self._lock:
+            state = dict(vars(other))
+            del state["_lock"]
+            vars(self).update(state)
+
+    def __len__(self) -> int:
+        return int(self._base_alive.sum()) + self._delta_count
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the vectors, ids and document frequencies."""
+        arrays = (self._base, self._base_ids, self._base_alive, self._delta)
+        return sum(array.nbytes for array in arrays) + self._df.nbytes
+
+    def _count(self, features: np.ndarray, documents: int) -> None:
+        slots = (features % DF_SLOTS).astype(np.intp)
+        self._df += np.bincount(slots, minlength=DF_SLOTS).astype(np.int32)
+        self.num_documents += documents
+
+    def vectorize(
+        self, documents: Sequence[tuple[str, str]], count: bool = False
+    ) -> np.ndarray:
+        """Unit vectors of ``(subject, description)`` documents.
+
+        :param documents: the subject and description of each document
+        :type documents: Sequence[tuple[str, str]]
+        :param count: add the documents to the document frequencies first
+        :type count: bool
+        :return: one float32 row per document; all zeros if it has no words
+        :rtype: np.ndarray
+        """
+        rows, features, counts = hashed_features(documents)
+        if count:
+            self._count(features, len(documents))
+        signs = np.where(features >> 31 & 1, -1.0, 1.0)
+        slots = rows * self.dimensions + (features % self.dimensions).astype(np.intp)
+        vectors = np.bincount(
+            slots,
+            weights=self._weights(features, counts) * signs,
+            minlength=len(documents) * self.dimensions,
+        )
+        vectors = vectors.reshape(len(documents), self.dimensions).astype(np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def _weights(self, features: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """TF-IDF weights of features, from the current document frequencies."""
+        df = self._df[(features % DF_SLOTS).astype(np.intp)]
+        idf = np.log((1 + self.num_documents) / (1 + df)) + 1
+        return (1 + np.log(counts)) * idf
+
+    def sparse_vectors(
+        self, documents: Sequence[tuple[str, str]]
+    ) -> list[dict[int, float]]:
+        """Unit TF-IDF vectors keyed by feature hash, free of hashing collisions.
+
+        Used to rescore the candidates found with the dense vectors.
+        """
+        rows, features, counts = hashed_features(documents)
+        weights = self._weights(features, counts)
+        vectors: list[dict[int, float]] = [{} for _ in documents]
+        for row, feature, weight in zip(rows.tolist(), features.tolist(), weights):
+            vectors[row][feature] = weight
+        for vector in vectors:
+            norm = sum(weight * weight for weight in vector.values()) ** 0.5
+            for feature in vector:
+                vector[feature] /= norm
+        return vectors
+
+    def build(self, read_chunks: Callable[[], Iterable[Sequence]]) -> None:
+        """Replace the index with the tickets read by ``read_chunks``.
+
+        The tickets are read twice, once to count document frequencies and
+        once to vectorise them; queries keep using the old index meanwhile.
+
+        :param read_chunks: returns chunks of ``(id, subject, description,
+            updated_at)`` rows in ticket id order
+        :type read_chunks: Callable[[], Iterable[Sequence]]
+        """
+        fresh = TicketVectorIndex(self.dimensions)
+        for chunk in read_chunks():
+            _, features, _ = hashed_features([(row[1], row[2]) for row in chunk])
+            fresh._count(features, len(chunk))
+        ids = np.empty(fresh.num_documents, dtype=np.int64)
+        vectors = np.empty((fresh.num_documents, self.dimensions), dtype=np.float32)
+        start = 0
+        for chunk in read_chunks():
+            # Tickets created since the first pass are left to the next refresh.
+            chunk = chunk[: len(ids) - start]
+            stop = start + len(chunk)
+            ids[start:stop] = [row[0] for row in chunk]
+            vectors[start:stop] = fresh.vectorize([(row[1], row[2]) for row in chunk])
+            fresh._advance(chunk)
+            start = stop
+        fresh._base_ids, fresh._base = ids[:start], vectors[:start]
+        fresh._base_alive = np.ones(start, dtype=bool)
+        fresh.loaded = True
+        self._replace(fresh)
+
+    def _advance(self, rows: Sequence) -> None:
+        """Move the watermark to the newest ``updated_at`` of ``rows``."""
+        times = [row[3] for row in rows if row[3] is not None]
+        if not times:
+            return
+        newest = max(times)
+        at_newest = {row[0] for row in rows if row[3] == newest}
+        if self.watermark is None or newest > self.watermark:
+            self.watermark, self._watermark_ids = newest, at_newest
+        elif newest == self.watermark:
+            self._watermark_ids |= at_newest
+
+    def upsert(self, rows: Sequence) -> None:
+        """Index new or changed ``(id, subject, description, updated_at)`` rows."""
+        # All under the lock: counting the rows updates the document
+        # frequencies that every other vector is weighted with.
+        with self._lock:
+            rows = [
+                row
+                for row in rows
+                if row[3] != self.watermark or row[0] not in self._watermark_ids
+            ]
+            if not rows:
+                return
+            vectors = self.vectorize([(row[1], row[2]) for row in rows], count=True)
+            ids = np.array([row[0] for row in rows], dtype=np.int64)
+            positions = np.searchsorted(self._base_ids, ids)
+            found = positions < len(self._base_ids)
+            found[found] = self._base_ids[positions[found]] == ids[found]
+            self._base_alive[positions[found]] = False
+            for ticket_id, vector in zip(ids.tolist(), vectors):
+                self._delta_put(ticket_id, vector)
+            self._advance(rows)
+            if self._delta_count > COMPACT_FRACTION * max(len(self._base), SCAN_ROWS):
+                self.compact()
+
+    def _delta_put(self, ticket_id: int, vector: np.ndarray) -> None:
+        position = self._delta_positions.get(ticket_id)
+        if position is None:
+            position = self._delta_count
+            if position == len(self._delta_ids):
+                capacity = max(1024, 2 * position)
+                self._delta_ids = np.resize(self._delta_ids, capacity)
+                self._delta = np.resize(self._delta, (capacity, self.dimensions))
+            self._delta_ids[position] = ticket_id
+            self._delta_positions[ticket_id] = position
+            self._delta_count += 1
+        self._delta[position] = vector
+
+    def compact(self) -> None:
+        """Merge the delta into the base, which is then held in memory."""
+        with self._lock:
+            alive = self._base_alive
+            ids = np.concatenate(
+                [self._base_ids[alive], self._delta_ids[: self._delta_count]]
+            )
+            vectors = np.concatenate(
+                [self._base[alive], self._delta[: self._delta_count]]
+            )
+            order = np.argsort(ids, kind="stable")
+            self._base_ids, self._base = ids[order], vectors[order]
+            self._base_alive = np.ones(len(ids), dtype=bool)
+            self._delta_ids = np.empty(0, dtype=np.int64)
+            self._delta = np.empty((0, self.dimensions), dtype=np.float32)
+            self._delta_count = 0
+            self._delta_positions = {}
+
+    def search(
+        self,
+        queries: np.ndarray,
+        limit: int = TICKET_SIMILARITY_LIMIT,
+        min_score: float = TICKET_SIMILARITY_MIN_SCORE,
+        exclude: Sequence[int | None] | None = None,
+    ) -> list[list[tuple[int, float]]]:
+        """Most similar tickets of each query vector.
+
+        :param queries: unit query vectors, one per row, see :meth:`vectorize`
+        :type queries: np.ndarray
+        :param limit: matches per query
+        :type limit: int
+        :param min_score: drop matches with a lower cosine similarity
+        :type min_score: float
+        :param exclude: a ticket id per query to leave out, e.g. its own ticket
+        :type exclude: Sequence[int | None] | None
+        :return: ``(ticket_id, score)`` pairs per query, best first
+        :rtype: list[list[tuple[int, float]]]
+        """
+        exclude = exclude or [None] * len(queries)
+        keep = limit + 1
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        with self._lock:
+            segments = [
+                (self._base_ids, self._base, self._base_alive),
+                (
+                    self._delta_ids[: self._delta_count],
+                    self._delta[: self._delta_count],
+                    None,
+                ),
+            ]
+            for ids, vectors, alive in segments:
+                for start in range(0, len(ids), SCAN_ROWS):
+                    stop = start + SCAN_ROWS
+                    scores = queries @ vectors[start:stop].T
+                    if alive is not None:
+                        scores[:, ~alive[start:stop]] = -np.inf
+                    chunk_scores, chunk_ids = _top(
+                        scores, np.broadcast_to(ids[start:stop], scores.shape), keep
+                    )
+                    best_scores, best_ids = _top(
+                        np.concatenate([best_scores, chunk_scores], axis=1),
+                        np.concatenate([best_ids, chunk_ids], axis=1),
+                        keep,
+                    )
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        results = []
+        for query, excluded in enumerate(exclude):
+            matches = [
+                (int(best_ids[query, i]), float(best_scores[query, i]))
+                for i in order[query]
+                if best_ids[query, i] != excluded
+                and best_scores[query, i] >= min_score
+            ]
+            results.append(matches[:limit])
+        return results
+
+    def save(self, directory: str | Path) -> None:
+        """Write the compacted index to ``directory`` for :meth:`load`."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self.compact()
+            meta = {
+                "dimensions": self.dimensions,
+                "num_documents": self.num_documents,
+                "watermark": self.watermark and self.watermark.isoformat(),
+            }
+            arrays = {"ids": self._base_ids, "vectors": self._base, "df": self._df}
+            for name, array in arrays.items():
+                # Replaced, not overwritten: a loaded index may map the old file.
+                with open(directory / f"{name}.npy.tmp", "wb") as file:
+                    np.save(file, array)
+                os.replace(directory / f"{name}.npy.tmp", directory / f"{name}.npy")
+            (directory / "meta.json").write_text(json.dumps(meta))
+
+    def load(self, directory: str | Path) -> bool:
+        """Memory-map an index saved by :meth:`save`.
+
+        :return: False if there is none or it has other dimensions
+        :rtype: bool
+        """
+        directory = Path(directory)
+        try:
+            meta = json.loads((directory / "meta.json").read_text())
+        except FileNotFoundError:
+            return False
+        if meta["dimensions"] != self.dimensions:
+            return False
+        loaded = TicketVectorIndex(self.dimensions)
+        loaded._base = np.load(directory / "vectors.npy", mmap_mode="r")
+        loaded._base_ids = np.load(directory / "ids.npy")
+        loaded._base_alive = np.ones(len(loaded._base_ids), dtype=bool)
+        loaded._df = np.load(directory / "df.npy")
+        loaded.num_documents = meta["num_documents"]
+        if meta["watermark"]:
+            loaded.watermark = datetime.fromisoformat(meta["watermark"])
+        loaded.loaded = True
+        self._replace(loaded)
+        return True
+
+
+def _top(scores: np.ndarray, ids: np.ndarray, keep: int):
+    """The ``keep`` best scores of each row, unordered, with their ids."""
+    if scores.shape[1] <= keep:
+        return scores, ids
+    top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+    return np.take_along_axis(scores, top, 1), np.take_along_axis(ids, top, 1)
+
+
+ticket_index = TicketVectorIndex()
+_refresh_lock = threading.Lock()
+
+_TICKET_COLUMNS = (Ticket.id, Ticket.subject, Ticket.description, Ticket.updated_at)
+
+
+def _all_tickets_query() -> Select:
+    return select(*_TICKET_COLUMNS).order_by(Ticket.id)
+
+
+def _changed_tickets_query(since: datetime | None) -> Select:
+    query = select(*_TICKET_COLUMNS).order_by(Ticket.updated_at, Ticket.id)
+    return query if since is None else query.where(Ticket.updated_at >= since)
+
+
+def _chunks(session: Session, query: Select) -> Iterable[Sequence]:
+    result = session.execute(query.execution_options(yield_per=CHUNK_ROWS))
+    return result.partitions()
+
+
+def _is_stale(index: TicketVectorIndex) -> bool:
+    age = time.monotonic() - index.refreshed_at
+    return not index.loaded or age >= TICKET_SIMILARITY_REFRESH_SECONDS
+
+
+@traced
+def refresh_ticket_index(
+    session: Session | None = None, force: bool = False
+) -> TicketVectorIndex:
+    """Bring :data:`ticket_index` up to date with the tickets table.
+
+    The first call loads the index saved in ``TICKET_SIMILARITY_INDEX_DIR``
+    or builds it, saving it there if set. Later calls index the tickets
+    updated since the newest one indexed, at most every
+    ``TICKET_SIMILARITY_REFRESH_SECONDS`` unless ``force`` is set.
+
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: Session | None
+    :param force: refresh even if the last refresh is recent
+    :type force: bool
+    :return: the refreshed index
+    :rtype: TicketVectorIndex
+    """
+    index = ticket_index
+    with _refresh_lock:
+        if not force and not _is_stale(index):
+            return index
+        with session_scope(session) as session:
+            if not index.loaded:
+                directory = TICKET_SIMILARITY_INDEX_DIR
+                if not (directory and index.load(directory)):
+                    index.build(lambda: _chunks(session, _all_tickets_query()))
+                    if directory:
+                        index.save(directory)
+            for chunk in _chunks(session, _changed_tickets_query(index.watermark)):
+                index.upsert(chunk)
+        index.refreshed_at = time.monotonic()
+    return index
+
+
+@traced
+async def refresh_ticket_index_async(force: bool = False) -> TicketVectorIndex:
+    """Async variant of :func:`refresh_ticket_index`.
+
+    A stale index is refreshed in a worker thread, through the sync engine and
+    under the same lock, so requests that find it stale at the same time
+    refresh it one after the other, and the later ones find nothing to do.
+    """
+    index = ticket_index
+    if not force and not _is_stale(index):
+        return index
+    return await asyncio.to_thread(refresh_ticket_index, None, force)
+
+
+def _is_ticket_number(query: str) -> bool:
+    return re.fullmatch(TICKET_NUMBER_PATTERN, query.strip()) is not None
+
+
+def _sources_query(queries: list[str]) -> Select:
+    numbers = {query.strip() for query in queries if _is_ticket_number(query)}
+    return select(
+        Ticket.id, Ticket.ticket_number, Ticket.subject, Ticket.description
+    ).where(Ticket.ticket_number.in_(numbers))
+
+
+def _matches_query(ticket_ids: set[int]) -> Select:
+    return (
+        select(
+            Ticket.id,
+            Ticket.ticket_number,
+            Ticket.subject,
+            Ticket.description,
+            Ticket.status,
+            Ticket.created_at,
+            Ticket.updated_at,
+            Customer.email.label("customer_email"),
+        )
+        .join(Customer, Ticket.customer_id == Customer.id)
+        .where(Ticket.id.in_(ticket_ids))
+    )
+
+
+def _documents(queries: list[str], sources) -> tuple[list, list, list[bool]]:
+    """Query documents, the ticket id each excludes and the unknown tickets."""
+    by_number = {row.ticket_number: row for row in sources}
+    documents, exclude, unknown = [], [], []
+    for query in queries:
+        source = by_number.get(query.strip())
+        if source is not None:
+            documents.append((source.subject, source.description))
+            exclude.append(source.id)
+        else:
+            documents.append(("", query))
+            exclude.append(None)
+        unknown.append(source is None and _is_ticket_number(query))
+    return documents, exclude, unknown
+
+
+def _candidates(
+    index: TicketVectorIndex, documents: list, exclude: list, limit: int
+) -> list[list[tuple[int, float]]]:
+    # Hashing collisions blur the dense scores; take more candidates than
+    # needed so the exact rescoring can reorder them.
+    return index.search(
+        index.vectorize(documents),
+        CANDIDATES_PER_MATCH * limit,
+        min_score=0.0,
+        exclude=exclude,
+    )
+
+
+def _rescore(
+    index: TicketVectorIndex, documents: list, candidates, rows, limit: int
+) -> list[list[tuple[object, float]]]:
+    """Rank candidates by their exact cosine similarity to each query."""
+    by_id = {row.id: row for row in rows}
+    ranked = []
+    for document, hits in zip(documents, candidates):
+        found = [by_id[ticket_id] for ticket_id, _ in hits if ticket_id in by_id]
+        query, *vectors = index.sparse_vectors(
+            [document] + [(row.subject, row.description) for row in found]
+        )
+        scores = [
+            sum(weight * vector.get(feature, 0.0) for feature, weight in query.items())
+            for vector in vectors
+        ]
+        matches = sorted(zip(scores, found), key=lambda match: -match[0])
+        ranked.append(
+            [
+                (row, score)
+                for score, row in matches[:limit]
+                if score >= TICKET_SIMILARITY_MIN_SCORE
+            ]
+        )
+    return ranked
+
+
+def _assemble(unknown: list[bool], ranked) -> list[list[SimilarTicket] | None]:
+    return [
+        None
+        if is_unknown
+        else [
+            SimilarTicket(
+                ticket_number=row.ticket_number,
+                subject=row.subject,
+                summary=_summary(row.description),
+                status=row.status.value,
+                created_at=row.created_at,
+                updated_at=row.updated_at,
+                customer_email=row.customer_email,
+                score=round(score, 4),
+            )
+            for row, score in matches
+        ]
+        for is_unknown, matches in zip(unknown, ranked)
+    ]
+
+
+def _summary(description: str) -> str:
+    if len(description) <= SUMMARY_CHARS:
+        return description
+    return description[:SUMMARY_CHARS].rsplit(" ", 1)[0] + "..."
+
+
+def _candidate_ids(candidates) -> set[int]:
+    return {ticket_id for hits in candidates for ticket_id, _ in hits}
+
+
+@traced
+def find_similar_tickets_many(
+    queries: list[str],
+    limit: int = TICKET_SIMILARITY_LIMIT,
+    session: Session | None = None,
+) -> list[list[SimilarTicket] | None]:
+    """Past tickets most similar to each query, scored in one batch.
+
+    Candidates are taken from :data:`ticket_index` and rescored exactly on
+    their current subject and description.
+
+    :param queries: ticket numbers, whose subject and description are looked
+        up, or free-text problem descriptions
+    :type queries: list[str]
+    :param limit: matches per query, capped at ``TICKET_SIMILARITY_MAX_LIMIT``
+    :type limit: int
+    :param session: The run's session; a short-lived one is opened if omitted.
+    :type session: Session | None
+    :return: matches per query, in request order, best first; None for a
+        ticket number that does not exist
+    :rtype: list[list[SimilarTicket] | None]
+    """
+    limit = max(1, min(limit, TICKET_SIMILARITY_MAX_LIMIT))
+    with session_scope(session) as session:
+        index = refresh_ticket_index(session)
+        sources = session.execute(_sources_query(queries)).all()
+        documents, exclude, unknown = _documents(queries, sources)
+        candidates = _candidates(index, documents, exclude, limit)
+        rows = session.execute(_matches_query(_candidate_ids(candidates))).all()
+    return _assemble(unknown, _rescore(index, documents, candidates, rows, limit))
+
+
+@traced
+async def find_similar_tickets_many_async(
+    queries: list[str],
+    limit: int = TICKET_SIMILARITY_LIMIT,
+    session: "AsyncSession | None" = None,
+) -> list[list[SimilarTicket] | None]:
+    """Async variant of :func:`find_similar_tickets_many`; scoring runs in a thread."""
+    limit = max(1, min(limit, TICKET_SIMILARITY_MAX_LIMIT))
+    index = await refresh_ticket_index_async()
+    async with async_session_scope(session) as session:
+        sources = (await session.execute(_sources_query(queries))).all()
+        documents, exclude, unknown = _documents(queries, sources)
+        candidates = await asyncio.to_thread(
+            _candidates, index, documents, exclude, limit
+        )
+        rows = (await session.execute(_matches_query(_candidate_ids(candidates)))).all()
+    ranked = await asyncio.to_thread(
+        _rescore, index, documents, candidates, rows, limit
+    )
+    return _assemble(unknown, ranked)
@@ -0,0 +1,45 @@
+"""Tests of the batch runner's input handling, with the router stubbed out."""
+
+import asyncio
+import io
+import json
+
+import batch
+from planner_agent.agent import AgentNames, PlannerOutput
+
+LINES = "\n".join(
+    [
+        '{"id": "a", "prompt": "first"}',
+        "not json",
+        '{"id": "b"}',
+        '["a", "list"]',
+        "",
+        '{"id": "done", "prompt": "already answered"}',
+        '{"prompt": "last"}',
+    ]
+)
+
+
+async def fake_route(prompt, deps) -> PlannerOutput:
+    return PlannerOutput(
+        decision="stub", target_agent=AgentNames.NONE, final_summary=prompt
+    )
+
+
+def test_bad_lines_do_not_stop_the_batch(monkeypatch):
+    monkeypatch.setattr(batch, "route_async", fake_route)
+    output = io.StringIO()
+    runner = batch.BatchRunner(output, None, concurrency=2)
+    items = batch.read_items(io.StringIO(LINES), done={"done"})
+    stats = asyncio.run(runner.run(items))
+
+    results = {
+        record["id"]: record
+        for record in map(json.loads, output.getvalue().splitlines())
+    }
+    assert (stats.succeeded, stats.failed, stats.skipped) == (2, 3, 1)
+    assert results["a"]["output"]["final_summary"] == "first"
+    assert results["7"]["output"]["final_summary"] == "last"
+    assert results["2"]["error"].startswith("line 2: JSONDecodeError")
+    assert results["b"]["error"] == "line 3: KeyError('prompt')"
+    assert results["4"]["error"].startswith("line 4: TypeError")
@@ -0,0 +1,41 @@
+"""Tests of invoice conversion against an in-memory rate table."""
+
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+
+from service_layer.fx_rates import (
+    InvoiceConversion,
+    MissingRateError,
+    RateTable,
+    _convert_invoices,
+)
+
+Row = namedtuple("Row", "invoice_number amount issued_date")
+
+
+def test_invoices_before_the_first_rate_do_not_fail_the_others():
+    table = RateTable()
+    table.build(
+        [
+            (date(2024, 1, 2), "USD", Decimal("1.1")),
+            (date(2024, 1, 3), "USD", Decimal("1.0")),
+        ]
+    )
+    rows = [
+        Row("INV-00001-AA", Decimal("110.00"), datetime(2024, 1, 2, 9)),
+        Row("INV-00002-BB", Decimal("50.00"), datetime(2023, 12, 31, 9)),
+        Row("INV-00003-CC", Decimal("10.00"), datetime(2024, 1, 6, 9)),
+    ]
+    numbers = ["INV-00002-BB", "INV-00001-AA", "INV-00009-ZZ", "INV-00003-CC"]
+
+    missing, first, unknown, last = _convert_invoices(table, numbers, "eur", rows)
+
+    assert isinstance(missing, MissingRateError)
+    assert str(missing) == (
+        "No USD/EUR rate on or before 2023-12-31 for Invoice ID: INV-00002-BB"
+    )
+    assert isinstance(first, InvoiceConversion)
+    assert (first.invoice_number, first.converted) == ("INV-00001-AA", Decimal("100"))
+    assert unknown is None
+    assert (last.converted, last.rate_date) == (Decimal("10"), date(2024, 1, 3))
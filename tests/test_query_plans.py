@@ -0,0 +1,193 @@
+"""Query-plan regression tests for the service-layer queries.
+
+Builds the schema with the alembic migrations (not ``create_all``), seeds a
+scaled-up database, runs ``ANALYZE`` and captures the ``EXPLAIN`` plan of
+every service-layer query. A test fails if its query scans a whole table
+instead of using an index.
+
+Usage::
+
+    python -m pytest tests/test_query_plans.py
+    QUERY_PLAN_SCALE=100 python -m pytest tests/test_query_plans.py
+"""
+
+import os
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import Select, text
+
+from benchmarks.common import (
+    customer_email,
+    invoice_number,
+    seed_database,
+    ticket_number,
+)
+from database import Base, TicketStatus, get_engine
+from service_layer import analytics, customer_360, listings, ticket_similarity
+from service_layer.customer_details import _customer_query, _customers_query
+from service_layer.invoice_service import _invoice_query, _invoices_query
+from service_layer.ticket_service import _ticket_query, _tickets_query
+
+ROOT = Path(__file__).resolve().parent.parent
+# Rows are 200 customers, 1000 tickets and 500 invoices times the scale.
+SCALE = int(os.getenv("QUERY_PLAN_SCALE", "10"))
+
+
+@dataclass
+class PlanCheck:
+    name: str
+    statement: Select
+    tables: tuple[str, ...]
+
+
+def plan_checks() -> list[PlanCheck]:
+    invoices = [invoice_number(i) for i in (1, 2, 3)]
+    tickets = [ticket_number(i) for i in (1, 2, 3)]
+    as_of = datetime(2025, 12, 1)
+    return [
+        PlanCheck("get_invoice_infos", _invoice_query(invoices[0]), ("invoices",)),
+        PlanCheck("get_invoice_infos_many", _invoices_query(invoices), ("invoices",)),
+        PlanCheck("get_ticket_infos", _ticket_query(tickets[0]), ("tickets",)),
+        PlanCheck("get_ticket_infos_many", _tickets_query(tickets), ("tickets",)),
+        PlanCheck(
+            "get_customer_info by id",
+            _customer_query("5", None),
+            ("customers", "customer_details"),
+        ),
+        PlanCheck(
+            "get_customer_info by email",
+            _customer_query(None, customer_email(5)),
+            ("customers", "customer_details"),
+        ),
+        PlanCheck(
+            "get_customer_info_many",
+            _customers_query(["5", customer_email(6)]),
+            ("customers", "customer_details"),
+        ),
+        PlanCheck(
+            "customer 360",
+            customer_360._customers_query(["5", customer_email(6)]),
+            ("customers", "customer_details", "tickets", "invoices"),
+        ),
+        PlanCheck(
+            "customer 360 recent tickets",
+            customer_360._recent_tickets_query([5, 6], 5),
+            ("tickets",),
+        ),
+        PlanCheck(
+            "customer 360 open invoices",
+            customer_360._open_invoices_query([5, 6], 5),
+            ("invoices",),
+        ),
+        PlanCheck(
+            "similar-ticket index refresh",
+            ticket_similarity._changed_tickets_query(datetime(2025, 11, 30)),
+            ("tickets",),
+        ),
+        PlanCheck(
+            "ticket counts of a month by status",
+            analytics.ticket_counts_query(
+                get_engine().dialect.name,
+                since=date(2025, 11, 1),
+                until=date(2025, 12, 1),
+                group_by="status",
+            ),
+            ("tickets",),
+        ),
+        PlanCheck(
+            "customer balances",
+            analytics._balances_query(["5", customer_email(6)], as_of),
+            ("customers", "invoices"),
+        ),
+        PlanCheck(
+            "overdue invoices of a customer by age",
+            analytics._aging_query(as_of, "5"),
+            ("invoices",),
+        ),
+        PlanCheck(
+            "oldest overdue invoices",
+            analytics._oldest_query(as_of, None, 10),
+            ("invoices", "customers"),
+        ),
+        PlanCheck(
+            "customer ticket listing page",
+            listings._rows_query(listings.TICKETS, 5, {}, (as_of, 10**9)).limit(11),
+            ("tickets",),
+        ),
+        PlanCheck(
+            "customer ticket listing page by status",
+            listings._rows_query(
+                listings.TICKETS, 5, {"status": TicketStatus.OPEN}, (as_of, 10**9)
+            ).limit(11),
+            ("tickets",),
+        ),
+        PlanCheck(
+            "customer invoice listing page",
+            listings._rows_query(listings.INVOICES, 5, {}, (as_of, 10**9)).limit(11),
+            ("invoices",),
+        ),
+    ]
+
+
+def explain(connection, statement: Select) -> list[str]:
+    """Plan lines of a statement, in the dialect's own EXPLAIN format."""
+    sql = str(
+        statement.compile(
+            dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+        )
+    )
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+        return [row[-1] for row in rows]
+    return [row[0] for row in connection.exec_driver_sql(f"EXPLAIN {sql}").all()]
+
+
+def full_scans(plan: list[str], tables: tuple[str, ...]) -> list[str]:
+    """Plan lines that read one of ``tables`` without an index."""
+    scans = []
+    for line in plan:
+        for table in tables:
+            # SQLite: "SCAN tickets"; PostgreSQL: "Seq Scan on tickets".
+            if line.strip().startswith(f"SCAN {table}") and "INDEX" not in line:
+                scans.append(line)
+            elif f"Seq Scan on {table}" in line:
+                scans.append(line)
+    return scans
+
+
+def build_database(scale: int) -> None:
+    engine = get_engine()
+    Base.metadata.drop_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    command.upgrade(config, "head")
+    seed_database(
+        num_customers=200 * scale,
+        num_tickets=1000 * scale,
+        num_invoices=500 * scale,
+        create_schema=False,
+    )
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+
+
+@pytest.fixture(scope="module")
+def connection():
+    build_database(SCALE)
+    with get_engine().connect() as connection:
+        yield connection
+
+
+@pytest.mark.parametrize("check", plan_checks(), ids=lambda check: check.name)
+def test_query_uses_indexes(connection, check: PlanCheck) -> None:
+    plan = explain(connection, check.statement)
+    print("\n".join(plan))
+    scans = full_scans(plan, check.tables)
+    assert not scans, "full table scan in:\n" + "\n".join(plan)
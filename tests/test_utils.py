@@ -0,0 +1,120 @@
+"""Tests of the chat completions client in ``utils`` against a local stub.
+
+The tests share one :mod:`benchmarks.stub_chat_server` on a free port, with
+its counters reset before each test, and point the client at it.
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import utils
+from benchmarks.stub_chat_server import ANSWER, DROP_AFTER_TOKENS, StubChatServer
+from config import HTTP_BACKOFF_BASE_SECONDS
+
+ARGS = ("What is the status?", "stub-model", "You are a stub.", 0)
+STREAMED = [token + " " for token in ANSWER.split(" ")]
+
+
+@pytest.fixture(scope="module")
+def stub_server():
+    server = StubChatServer().start()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(utils, "MISTRAL_API_URL", server.url)
+        yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def server(stub_server):
+    stub_server.requests, stub_server.throttle, stub_server.drop = 0, 0, 0
+    stub_server.clients.clear()
+    return stub_server
+
+
+def throttled(retry_after: str) -> httpx.Response:
+    return httpx.Response(429, headers={"Retry-After": retry_after})
+
+
+async def _stream_async() -> list[str]:
+    return [token async for token in utils.astream_talk_to_ai(*ARGS)]
+
+
+def test_answer(server):
+    assert utils.talk_to_ai(*ARGS) == ANSWER
+
+
+def test_connection_is_pooled(server):
+    for _ in range(10):
+        utils.talk_to_ai(*ARGS)
+    assert server.requests == 10
+    assert len(server.clients) == 1
+
+
+def test_async_answer(server):
+    assert asyncio.run(utils.talk_to_ai_async(*ARGS)) == ANSWER
+
+
+def test_retries_429(server):
+    server.throttle = 2
+    assert utils.talk_to_ai(*ARGS) == ANSWER
+    assert server.requests == 3
+
+
+def test_gives_up_after_max_retries(server, monkeypatch):
+    monkeypatch.setattr(utils, "HTTP_MAX_RETRIES", 1)
+    server.throttle = 2
+    with pytest.raises(httpx.HTTPStatusError):
+        utils.talk_to_ai(*ARGS)
+    assert server.requests == 2
+
+
+def test_retry_after_seconds():
+    assert utils.retry_delay(0, throttled("2.5")) == 2.5
+
+
+def test_retry_after_date_without_zone_is_gmt():
+    in_five = time.gmtime(time.time() + 5)
+    header = time.strftime("%a, %d %b %Y %H:%M:%S -0000", in_five)
+    assert 3 < utils.retry_delay(0, throttled(header)) <= 5
+
+
+def test_unparsable_retry_after_falls_back_to_backoff():
+    assert 0 <= utils.retry_delay(0, throttled("soon")) <= HTTP_BACKOFF_BASE_SECONDS
+
+
+def test_stream(server):
+    assert list(utils.stream_talk_to_ai(*ARGS)) == STREAMED
+
+
+def test_async_stream_after_429(server):
+    server.throttle = 1
+    assert asyncio.run(_stream_async()) == STREAMED
+    assert server.requests == 2
+
+
+def test_dropped_stream_raises_without_retrying(server):
+    server.drop = 1
+    tokens = []
+    with pytest.raises(httpx.TransportError):
+        for token in utils.stream_talk_to_ai(*ARGS):
+            tokens.append(token)
+    assert tokens == STREAMED[:DROP_AFTER_TOKENS]
+    assert server.requests == 1
+
+
+def test_dropped_async_stream_raises_without_retrying(server):
+    server.drop = 1
+    tokens = []
+
+    async def consume() -> None:
+        async for token in utils.astream_talk_to_ai(*ARGS):
+            tokens.append(token)
+
+    with pytest.raises(httpx.TransportError):
+        asyncio.run(consume())
+    assert tokens == STREAMED[:DROP_AFTER_TOKENS]
+    assert server.requests == 1
@@ -3,10 +3,20 @@ from typing import Optional
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent
 
-from ai_model import model
+from accounting import Accounting
+from ai_model import get_model
+from compact import CompactResults
 from dependencies import MyDeps
 from ticket_agent.prompt import ticket_agent_prompt
-from ticket_agent.tools import get_ticket_details
+from ticket_agent.tools import (
+    count_tickets,
+    find_similar_tickets,
+    get_ticket_details,
+    get_ticket_details_many,
+    list_customer_tickets,
+    search_tickets,
+)
+from tracing import Tracing
 
 
 class TicketAgentOutput(BaseModel):
@@ -18,12 +28,24 @@ class TicketAgentOutput(BaseModel):
     details: Optional[str] = Field(description="Details about the ticket or invoice")
 
 
-ticket_agent = Agent(
-    model,
-    system_prompt=ticket_agent_prompt,
-    deps_type=MyDeps,
-    output_type=TicketAgentOutput,
-)
-
-
-ticket_agent.tool(get_ticket_details)
+def build_ticket_agent() -> Agent:
+    ticket_agent = Agent(
+        get_model(),
+        name="ticket_worker",
+        capabilities=[
+            CompactResults(),
+            Accounting("ticket_worker"),
+            Tracing("ticket_worker"),
+        ],
+        system_prompt=ticket_agent_prompt,
+        deps_type=MyDeps,
+        output_type=TicketAgentOutput,
+    )
+
+    ticket_agent.tool(get_ticket_details)
+    ticket_agent.tool(get_ticket_details_many)
+    ticket_agent.tool(search_tickets)
+    ticket_agent.tool(find_similar_tickets)
+    ticket_agent.tool(count_tickets)
+    ticket_agent.tool(list_customer_tickets)
+    return ticket_agent
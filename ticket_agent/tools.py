@@ -1,10 +1,26 @@
-from pydantic_ai import RunContext
+from datetime import date
 
+from pydantic_ai import ModelRetry, RunContext
+
+from config import LISTING_PAGE_SIZE, TICKET_SEARCH_PAGE_SIZE, TICKET_SIMILARITY_LIMIT
 from dependencies import MyDeps
-from service_layer.ticket_service import TicketDetails, get_ticket_infos
+from service_layer.analytics import TicketCounts, count_tickets_async
+from service_layer.listings import CustomerTicketPage, list_customer_tickets_async
+from service_layer.ticket_search import TicketSearchPage, search_tickets_async
+from service_layer.ticket_similarity import (
+    SimilarTicket,
+    find_similar_tickets_many_async,
+)
+from service_layer.ticket_service import (
+    TicketDetails,
+    get_ticket_infos_async,
+    get_ticket_infos_many_async,
+)
 
 
-def get_ticket_details(ctx: RunContext[MyDeps], ticket_number: str) -> TicketDetails:
+async def get_ticket_details(
+    ctx: RunContext[MyDeps], ticket_number: str
+) -> TicketDetails:
     """Retrieves complete official records for a support ticket.
     Mandatory to use this to find customer contact info, ticket status, and creation dates.
 
@@ -16,9 +32,169 @@ def get_ticket_details(ctx: RunContext[MyDeps], ticket_number: str) -> TicketDet
     :return: ticket details from the database
     :rtype: TicketDetails
     """
-    db_data = get_ticket_infos(ticket_number)
+    db_data = await get_ticket_infos_async(ticket_number, ctx.deps.async_session)
 
     if not db_data:
         return f"No database record found for Ticket ID: {ticket_number}"
 
     return db_data
+
+
+async def get_ticket_details_many(
+    ctx: RunContext[MyDeps], ticket_numbers: list[str]
+) -> list[TicketDetails | str]:
+    """Retrieves the official records of several support tickets in a single call.
+    Use this instead of repeated lookups when the user asks about more than one ticket.
+
+    :param ctx: Context injected into chat
+    :type ctx: RunContext[MyDeps]
+    :param ticket_numbers: Ticket numbers provided by the user
+    :type ticket_numbers: list[str]
+    :return: ticket details per ticket number, in the same order
+    :rtype: list[TicketDetails | str]
+    """
+    db_data = await get_ticket_infos_many_async(ticket_numbers, ctx.deps.async_session)
+    return [
+        details or f"No database record found for Ticket ID: {ticket_number}"
+        for ticket_number, details in zip(ticket_numbers, db_data)
+    ]
+
+
+async def search_tickets(
+    ctx: RunContext[MyDeps],
+    query: str,
+    status: str | None = None,
+    customer: str | None = None,
+    page: int = 1,
+    page_size: int = TICKET_SEARCH_PAGE_SIZE,
+) -> TicketSearchPage:
+    """Searches ticket subjects and descriptions for tickets about a topic.
+    Use this when the user describes tickets ("tickets about refunds") instead of giving ticket numbers.
+
+    :param ctx: Context injected into chat
+    :type ctx: RunContext[MyDeps]
+    :param query: words to look for, e.g. "refund not received"
+    :type query: str
+    :param status: only tickets with this status: Open, Pending, Resolved or Closed
+    :type status: str | None
+    :param customer: only tickets of this customer ID or email address
+    :type customer: str | None
+    :param page: 1-based page of results; ask for the next page while has_more is true
+    :type page: int
+    :param page_size: number of hits per page
+    :type page_size: int
+    :raises ModelRetry: if the status or customer filter is not valid
+    :return: best matching tickets first
+    :rtype: TicketSearchPage
+    """
+    try:
+        return await search_tickets_async(
+            query, status, customer, page, page_size, ctx.deps.async_session
+        )
+    except ValueError as exc:
+        raise ModelRetry(str(exc)) from exc
+
+
+async def find_similar_tickets(
+    ctx: RunContext[MyDeps],
+    ticket_number: str | None = None,
+    description: str | None = None,
+    limit: int = TICKET_SIMILARITY_LIMIT,
+) -> list[SimilarTicket] | str:
+    """Finds past tickets about a similar problem, with their status, to see how they were handled.
+    Use this when a customer reports a problem again or asks whether it happened before.
+
+    :param ctx: Context injected into chat
+    :type ctx: RunContext[MyDeps]
+    :param ticket_number: ticket whose problem to compare with, e.g. TKT-1001
+    :type ticket_number: str | None
+    :param description: the problem in the user's words, if there is no ticket number
+    :type description: str | None
+    :param limit: number of similar tickets to return
+    :type limit: int
+    :raises ModelRetry: if neither a ticket number nor a description is given
+    :return: the most similar tickets first
+    :rtype: list[SimilarTicket] | str
+    """
+    query = ticket_number or description
+    if not query:
+        raise ModelRetry("Give a ticket number or a description of the problem.")
+    [similar] = await find_similar_tickets_many_async(
+        [query], limit, ctx.deps.async_session
+    )
+    if similar is None:
+        return f"No database record found for Ticket ID: {ticket_number}"
+    return similar
+
+
+async def count_tickets(
+    ctx: RunContext[MyDeps],
+    status: str | None = None,
+    customer: str | None = None,
+    period: str | None = None,
+    since: date | None = None,
+    until: date | None = None,
+    group_by: str | None = None,
+) -> TicketCounts:
+    """Counts tickets in the database, optionally per status, customer, day or month.
+    Use this for "how many" questions instead of looking tickets up one by one.
+
+    :param ctx: Context injected into chat
+    :type ctx: RunContext[MyDeps]
+    :param status: only tickets with this status: Open, Pending, Resolved or Closed
+    :type status: str | None
+    :param customer: only tickets of this customer ID or email address
+    :type customer: str | None
+    :param period: today, this_week, this_month, last_month, this_year or last_30_days
+    :type period: str | None
+    :param since: only tickets created on or after this day, if no period is given
+    :type since: date | None
+    :param until: only tickets created before this day, if no period is given
+    :type until: date | None
+    :param group_by: status, customer, day or month; omit for the total only
+    :type group_by: str | None
+    :raises ModelRetry: if a filter, the period or the grouping is not valid
+    :return: the total and the counts per group
+    :rtype: TicketCounts
+    """
+    try:
+        return await count_tickets_async(
+            status, customer, period, since, until, group_by, ctx.deps.async_session
+        )
+    except ValueError as exc:
+        raise ModelRetry(str(exc)) from exc
+
+
+async def list_customer_tickets(
+    ctx: RunContext[MyDeps],
+    customer: str,
+    status: str | None = None,
+    cursor: str | None = None,
+    page_size: int = LISTING_PAGE_SIZE,
+) -> CustomerTicketPage | str:
+    """Lists a customer's tickets, newest first, one page at a time.
+    Fetch the next page with next_cursor only if the question needs older tickets.
+
+    :param ctx: Context injected into chat
+    :type ctx: RunContext[MyDeps]
+    :param customer: customer ID or email address
+    :type customer: str
+    :param status: only tickets with this status: Open, Pending, Resolved or Closed
+    :type status: str | None
+    :param cursor: next_cursor of the previous page; omit for the first page
+    :type cursor: str | None
+    :param page_size: number of tickets per page
+    :type page_size: int
+    :raises ModelRetry: if the customer, status or cursor is not valid
+    :return: a page of tickets and the cursor of the next page
+    :rtype: CustomerTicketPage | str
+    """
+    try:
+        page = await list_customer_tickets_async(
+            customer, status, cursor, page_size, ctx.deps.async_session
+        )
+    except ValueError as exc:
+        raise ModelRetry(str(exc)) from exc
+    if page is None:
+        return f"No database record found for customer: {customer}"
+    return page
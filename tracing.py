@@ -0,0 +1,438 @@
+"""Tracing of requests as nested, timed spans, exported as JSON lines.
+
+A trace covers one request and takes its run ID as trace ID. Spans nest
+through a context variable, so they follow awaits, tasks and the async
+engine's greenlets:
+
+* ``request``: each run scope of the request (see :mod:`dependencies`);
+* ``agent``: each planner or worker agent run, with a ``model`` span per
+  model request and a ``tool`` span per tool call, from the :class:`Tracing`
+  capability. A worker's agent span nests under the planner's
+  ``delegate_to_*`` tool span that started it;
+* ``service``: each service-layer function decorated with :func:`traced`,
+  with the number of rows it returned;
+* ``sql``: each statement, from the engine events :func:`instrument_engine`
+  attaches, with the row count of statements that report one.
+
+A share ``TRACE_SAMPLE_RATE`` of the requests is traced, chosen by run ID;
+the others record nothing and pay one context variable lookup per span.
+When its request span ends, a trace is appended to ``TRACE_PATH``, one span
+per line with OpenTelemetry's field names.
+
+``python -m tracing`` prints a flame-style breakdown of the traced requests.
+"""
+
+import argparse
+import functools
+import inspect
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import TRACE_PATH, TRACE_SAMPLE_RATE, TRACE_STATEMENT_CHARS
+
+SQL_TABLE_RE = re.compile(r'[()]|\b(?:FROM|INTO|UPDATE)\s+"?(\w+)', re.IGNORECASE)
+
+
+@dataclass
+class Span:
+    trace_id: str
+    name: str
+    kind: str
+    parent_span_id: str | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    span_id: str = field(default_factory=lambda: os.urandom(8).hex())
+    start_time_unix_nano: int = field(default_factory=time.time_ns)
+    end_time_unix_nano: int | None = None
+    error: str | None = None
+    # Spans of the trace that have ended, shared by every span in it.
+    finished: list["Span"] = field(default_factory=list, repr=False)
+
+    def child(self, name: str, kind: str, **attributes) -> "Span":
+        return Span(
+            self.trace_id, name, kind, self.span_id, attributes, finished=self.finished
+        )
+
+    def end(self, error: BaseException | None = None) -> None:
+        self.end_time_unix_nano = time.time_ns()
+        if error is not None:
+            self.error = repr(error)
+        self.finished.append(self)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_time_unix_nano,
+            "end_time_unix_nano": self.end_time_unix_nano,
+            "attributes": self.attributes,
+            "status": "ERROR" if self.error else "OK",
+            "error": self.error,
+        }
+
+
+class JsonlExporter:
+    """Appends finished traces to a file, one JSON span per line."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[Span]) -> None:
+        lines = "".join(
+            json.dumps(span.to_dict(), default=str) + "\n" for span in spans
+        )
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(lines)
+
+
+@dataclass
+class Tracer:
+    """Where traces go and how many requests are traced."""
+
+    sample_rate: float = TRACE_SAMPLE_RATE
+    exporter: JsonlExporter = field(default_factory=lambda: JsonlExporter(TRACE_PATH))
+
+    def sampled(self, trace_id: str) -> bool:
+        # By run ID rather than at random, so every part of a request agrees.
+        return zlib.crc32(trace_id.encode()) < self.sample_rate * 2**32
+
+
+tracer = Tracer()
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def _entered(span: Span) -> Iterator[Span]:
+    token = current_span.set(span)
+    try:
+        yield span
+    except BaseException as exc:
+        span.end(exc)
+        raise
+    else:
+        span.end()
+    finally:
+        current_span.reset(token)
+
+
+@contextmanager
+def trace(trace_id: str, name: str, **attributes) -> Iterator[Span | None]:
+    """Open the request span of a trace, if the request is sampled.
+
+    Inside an open trace this is an ordinary span. The trace is exported when
+    its request span ends.
+
+    :param trace_id: ID shared by every part of the request, i.e. its run ID
+    :type trace_id: str
+    :param name: name of the request span
+    :type name: str
+    :return: the request span, or None if the request is not traced
+    :rtype: Iterator[Span | None]
+    """
+    parent = current_span.get()
+    if parent is not None:
+        with _entered(parent.child(name, "request", **attributes)) as child:
+            yield child
+        return
+    if not tracer.sampled(trace_id):
+        yield None
+        return
+    root = Span(trace_id, name, "request", attributes=attributes)
+    try:
+        with _entered(root):
+            yield root
+    finally:
+        tracer.exporter.export(root.finished)
+
+
+@contextmanager
+def span(name: str, kind: str, **attributes) -> Iterator[Span | None]:
+    """Time the block as a child of the current span, if there is one.
+
+    :param name: what the block does, e.g. the agent or tool name
+    :type name: str
+    :param kind: agent, model, tool, service or sql
+    :type kind: str
+    :return: the span, or None if the request is not traced
+    :rtype: Iterator[Span | None]
+    """
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+    with _entered(parent.child(name, kind, **attributes)) as child:
+        yield child
+
+
+def _record_rows(span: Span, result) -> None:
+    if isinstance(result, (list, tuple)):
+        span.attributes["rows"] = len(result)
+    elif result is None:
+        span.attributes["rows"] = 0
+
+
+def traced(function):
+    """Decorate a service-layer function to run in a ``service`` span."""
+    name = f"{function.__module__.rsplit('.', 1)[-1]}.{function.__name__}"
+
+    if inspect.iscoroutinefunction(function):
+
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            if current_span.get() is None:
+                return await function(*args, **kwargs)
+            with span(name, "service") as current:
+                result = await function(*args, **kwargs)
+                _record_rows(current, result)
+                return result
+
+        return wrapper
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if current_span.get() is None:
+            return function(*args, **kwargs)
+        with span(name, "service") as current:
+            result = function(*args, **kwargs)
+            _record_rows(current, result)
+            return result
+
+    return wrapper
+
+
+def _tracing_capability() -> type:
+    from pydantic_ai.capabilities import AbstractCapability
+
+    @dataclass
+    class Tracing(AbstractCapability):
+        """Capability that records an agent's runs, model requests and tool calls."""
+
+        agent_name: str
+
+        async def wrap_run(self, ctx, *, handler):
+            with span(self.agent_name, "agent"):
+                return await handler()
+
+        async def wrap_model_request(self, ctx, *, request_context, handler):
+            with span(self.agent_name, "model") as current:
+                response = await handler(request_context)
+                if current is not None:
+                    current.attributes["input_tokens"] = response.usage.input_tokens
+                    current.attributes["output_tokens"] = response.usage.output_tokens
+                return response
+
+        async def wrap_tool_execute(self, ctx, *, call, tool_def, args, handler):
+            with span(call.tool_name, "tool", agent=self.agent_name):
+                return await handler(args)
+
+    Tracing.__qualname__ = "Tracing"
+    return Tracing
+
+
+_capability_lock = threading.Lock()
+
+
+def __getattr__(name: str) -> Any:
+    # Tracing is defined on first use: the service layer imports this module
+    # for traced(), and importing pydantic_ai would triple its import time.
+    if name != "Tracing":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _capability_lock:
+        if "Tracing" not in globals():
+            globals()["Tracing"] = _tracing_capability()
+    return globals()["Tracing"]
+
+
+def sql_span_name(statement: str) -> str:
+    """The statement's verb and main table, e.g. ``SELECT tickets``.
+
+    The table is the first one read or written outside parentheses, so that
+    subqueries in the select list do not count.
+    """
+    verb = statement.split(None, 1)[0].upper() if statement.strip() else "SQL"
+    depth = 0
+    for match in SQL_TABLE_RE.finditer(statement):
+        if match.group() == "(":
+            depth += 1
+        elif match.group() == ")":
+            depth -= 1
+        elif depth == 0:
+            return f"{verb} {match.group(1)}"
+    return verb
+
+
+_instrumented: set[Engine] = set()
+
+
+def instrument_engine(target: Engine) -> None:
+    """Record a ``sql`` span per statement run on ``target``, once per engine.
+
+    :param target: sync engine, or ``AsyncEngine.sync_engine``
+    :type target: Engine
+    """
+    if target in _instrumented:
+        return
+    _instrumented.add(target)
+
+    @event.listens_for(target, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        parent = current_span.get()
+        if parent is None:
+            return
+        statement_span = parent.child(
+            sql_span_name(statement),
+            "sql",
+            statement=statement[:TRACE_STATEMENT_CHARS],
+            executemany=executemany,
+        )
+        conn.info.setdefault("trace_spans", []).append(statement_span)
+
+    @event.listens_for(target, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            statement_span = spans.pop()
+            if cursor.rowcount >= 0:
+                statement_span.attributes["rowcount"] = cursor.rowcount
+            statement_span.end()
+
+    @event.listens_for(target, "handle_error")
+    def _error(exception_context):
+        connection = exception_context.connection
+        spans = connection.info.get("trace_spans") if connection is not None else None
+        if spans:
+            spans.pop().end(exception_context.original_exception)
+
+
+@dataclass
+class FlameNode:
+    """Spans of the same kind and name under the same parent, merged."""
+
+    kind: str
+    name: str
+    count: int = 0
+    duration_ns: int = 0
+    spans: list[dict] = field(default_factory=list)
+
+    def children(self, by_parent: dict) -> list["FlameNode"]:
+        return merge_spans(
+            [child for span in self.spans for child in by_parent[span["span_id"]]]
+        )
+
+
+def merge_spans(spans: list[dict]) -> list["FlameNode"]:
+    """Merge sibling spans by kind and name, longest total first."""
+    nodes: dict[tuple[str, str], FlameNode] = {}
+    for span_record in spans:
+        key = (span_record["kind"], span_record["name"])
+        node = nodes.setdefault(key, FlameNode(*key))
+        node.count += 1
+        node.duration_ns += (
+            span_record["end_time_unix_nano"] - span_record["start_time_unix_nano"]
+        )
+        node.spans.append(span_record)
+    return sorted(nodes.values(), key=lambda node: node.duration_ns, reverse=True)
+
+
+def read_traces(path: str) -> dict[str, list[dict]]:
+    """Spans of a JSONL trace file, by trace ID, in the order of their traces."""
+    traces: dict[str, list[dict]] = defaultdict(list)
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                span_record = json.loads(line)
+                traces[span_record["trace_id"]].append(span_record)
+    return dict(
+        sorted(
+            traces.items(),
+            key=lambda item: min(s["start_time_unix_nano"] for s in item[1]),
+        )
+    )
+
+
+def flame_lines(spans: list[dict], width: int = 30) -> list[str]:
+    """A flame-style breakdown of one trace, one line per merged span.
+
+    Each line shows the total and self time, the share of the request as a
+    bar, and the span with how many were merged. Concurrent children can add
+    up to more than their parent, so self time is never negative.
+
+    :param spans: the spans of one trace, as read by :func:`read_traces`
+    :type spans: list[dict]
+    :param width: width of a full bar
+    :type width: int
+    :return: lines to print
+    :rtype: list[str]
+    """
+    span_ids = {span_record["span_id"] for span_record in spans}
+    by_parent: dict[str | None, list[dict]] = defaultdict(list)
+    for span_record in spans:
+        parent = span_record["parent_span_id"]
+        by_parent[parent if parent in span_ids else None].append(span_record)
+    roots = merge_spans(by_parent[None])
+    total = sum(node.duration_ns for node in roots) or 1
+    lines = [f"{'total ms':>10} {'self ms':>9} {'share':<{width}}  span"]
+
+    def walk(node: FlameNode, depth: int) -> None:
+        children = node.children(by_parent)
+        self_ns = max(node.duration_ns - sum(c.duration_ns for c in children), 0)
+        share = node.duration_ns / total
+        bar = "█" * max(round(share * width), 1)
+        repeat = f" x{node.count}" if node.count > 1 else ""
+        errors = sum(1 for s in node.spans if s["status"] == "ERROR")
+        failed = f" ({errors} failed)" if errors else ""
+        lines.append(
+            f"{node.duration_ns / 1e6:10.2f} {self_ns / 1e6:9.2f} {bar:<{width}}  "
+            f"{'  ' * depth}{node.kind}: {node.name}{repeat}{failed}"
+        )
+        for child in children:
+            walk(child, depth + 1)
+
+    for root in roots:
+        walk(root, 0)
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Print a flame-style breakdown of traced requests."
+    )
+    parser.add_argument("path", nargs="?", default=TRACE_PATH)
+    parser.add_argument("--trace", help="only this trace (run) ID")
+    parser.add_argument(
+        "--last", type=int, default=5, help="the latest N traces (default 5)"
+    )
+    args = parser.parse_args()
+
+    traces = read_traces(args.path)
+    if args.trace:
+        selected = {args.trace: traces[args.trace]} if args.trace in traces else {}
+    else:
+        selected = dict(list(traces.items())[-args.last :])
+    if not selected:
+        parser.exit(1, "no matching traces\n")
+    for trace_id, spans in selected.items():
+        start = min(s["start_time_unix_nano"] for s in spans)
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start / 1e9))
+        print(f"trace {trace_id}  {started}  {len(spans)} spans")
+        print("\n".join(flame_lines(spans)))
+        print()
+
+
+if __name__ == "__main__":
+    main()
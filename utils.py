@@ -1,17 +1,72 @@
+import asyncio
+import json
 import os
+import random
+import time
+import weakref
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Iterator
 
-import requests
+import httpx
 from dotenv import load_dotenv
 
+from config import (
+    HTTP_BACKOFF_BASE_SECONDS,
+    HTTP_BACKOFF_MAX_SECONDS,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_RETRIES,
+    HTTP_TIMEOUT_SECONDS,
+    MISTRAL_API_URL,
+)
+
 load_dotenv()
 
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
 
-def talk_to_ai(
-    user_question: str, ai_model: str, system_prompt: str, temperature: float
-) -> str:
-    api_key = os.getenv("MISTRAL_API_KEY")
-    url = "https://api.mistral.ai/v1/chat/completions"
-    payload = {
+_client: httpx.Client | None = None
+_async_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, httpx.AsyncClient
+] = weakref.WeakKeyDictionary()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+    )
+
+
+def get_client() -> httpx.Client:
+    """Shared keep-alive client, created on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.Client(limits=_limits(), timeout=HTTP_TIMEOUT_SECONDS)
+    return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Shared keep-alive async client of the running event loop.
+
+    Pooled connections are bound to the loop that opened them, so each loop
+    gets its own client.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(limits=_limits(), timeout=HTTP_TIMEOUT_SECONDS)
+        _async_clients[loop] = client
+    return client
+
+
+def _request_body(
+    user_question: str,
+    ai_model: str,
+    system_prompt: str,
+    temperature: float,
+    stream: bool = False,
+) -> dict:
+    body = {
         "model": f"{ai_model}",
         "messages": [
             {"role": "system", "content": system_prompt},
@@ -19,6 +74,209 @@ def talk_to_ai(
         ],
         "temperature": temperature,
     }
-    headers = {"Authorization": f"Bearer {api_key}"}
-    response = requests.post(url, json=payload, headers=headers)
+    if stream:
+        body["stream"] = True
+    return body
+
+
+def _headers() -> dict[str, str]:
+    return {"Authorization": f"Bearer {os.getenv('MISTRAL_API_KEY')}"}
+
+
+def _retry_after_seconds(value: str) -> float | None:
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    # HTTP dates are in GMT; one without a zone must not be read as local time.
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return retry_at.timestamp() - time.time()
+
+
+def retry_delay(attempt: int, response: httpx.Response | None = None) -> float:
+    """Seconds to wait before retry number ``attempt`` (0-based).
+
+    Honours a ``Retry-After`` header (seconds or HTTP date), otherwise, or if
+    the header cannot be parsed, uses exponential backoff with full jitter.
+
+    :param attempt: number of retries already made
+    :type attempt: int
+    :param response: the failed response, if the server answered
+    :type response: httpx.Response | None
+    :return: delay in seconds, capped at ``HTTP_BACKOFF_MAX_SECONDS``
+    :rtype: float
+    """
+    retry_after = response.headers.get("Retry-After") if response else None
+    delay = _retry_after_seconds(retry_after) if retry_after else None
+    if delay is not None:
+        return min(max(delay, 0.0), HTTP_BACKOFF_MAX_SECONDS)
+    backoff = HTTP_BACKOFF_BASE_SECONDS * 2**attempt
+    return random.uniform(0, min(backoff, HTTP_BACKOFF_MAX_SECONDS))
+
+
+def _should_retry(attempt: int, response: httpx.Response | None) -> bool:
+    if attempt >= HTTP_MAX_RETRIES:
+        return False
+    return response is None or response.status_code in RETRY_STATUSES
+
+
+def _tokens_from_sse(line: str) -> Iterator[str]:
+    if not line.startswith("data:"):
+        return
+    data = line[len("data:") :].strip()
+    if not data or data == "[DONE]":
+        return
+    for choice in json.loads(data).get("choices", []):
+        content = choice.get("delta", {}).get("content")
+        if content:
+            yield content
+
+
+def talk_to_ai(
+    user_question: str,
+    ai_model: str,
+    system_prompt: str,
+    temperature: float,
+    timeout: float = HTTP_TIMEOUT_SECONDS,
+) -> str:
+    """Ask the chat completions endpoint a single question.
+
+    Retries 429/5xx responses and transport errors with backoff.
+
+    :param user_question: user message
+    :type user_question: str
+    :param ai_model: model name, e.g. config.AI_MODEL
+    :type ai_model: str
+    :param system_prompt: system message
+    :type system_prompt: str
+    :param temperature: sampling temperature
+    :type temperature: float
+    :param timeout: per-attempt timeout in seconds
+    :type timeout: float
+    :raises httpx.HTTPError: if the last attempt still fails
+    :return: the assistant's answer
+    :rtype: str
+    """
+    body = _request_body(user_question, ai_model, system_prompt, temperature)
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        response = None
+        try:
+            response = get_client().post(
+                MISTRAL_API_URL, json=body, headers=_headers(), timeout=timeout
+            )
+            if response.status_code not in RETRY_STATUSES:
+                break
+        except httpx.TransportError:
+            if not _should_retry(attempt, None):
+                raise
+        if not _should_retry(attempt, response):
+            break
+        time.sleep(retry_delay(attempt, response))
+    response.raise_for_status()
     return response.json()["choices"][0]["message"]["content"]
+
+
+async def talk_to_ai_async(
+    user_question: str,
+    ai_model: str,
+    system_prompt: str,
+    temperature: float,
+    timeout: float = HTTP_TIMEOUT_SECONDS,
+) -> str:
+    """Async variant of :func:`talk_to_ai`."""
+    body = _request_body(user_question, ai_model, system_prompt, temperature)
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        response = None
+        try:
+            response = await get_async_client().post(
+                MISTRAL_API_URL, json=body, headers=_headers(), timeout=timeout
+            )
+            if response.status_code not in RETRY_STATUSES:
+                break
+        except httpx.TransportError:
+            if not _should_retry(attempt, None):
+                raise
+        if not _should_retry(attempt, response):
+            break
+        await asyncio.sleep(retry_delay(attempt, response))
+    response.raise_for_status()
+    return response.json()["choices"][0]["message"]["content"]
+
+
+def stream_talk_to_ai(
+    user_question: str,
+    ai_model: str,
+    system_prompt: str,
+    temperature: float,
+    timeout: float = HTTP_TIMEOUT_SECONDS,
+) -> Iterator[str]:
+    """Stream the answer token by token over server-sent events.
+
+    Retries only happen before the first token; once tokens have been yielded
+    an error is raised to the caller.
+
+    :return: content deltas as they arrive
+    :rtype: Iterator[str]
+    """
+    body = _request_body(user_question, ai_model, system_prompt, temperature, True)
+    yielded = False
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        try:
+            with get_client().stream(
+                "POST", MISTRAL_API_URL, json=body, headers=_headers(), timeout=timeout
+            ) as response:
+                if response.status_code in RETRY_STATUSES and _should_retry(
+                    attempt, response
+                ):
+                    delay = retry_delay(attempt, response)
+                else:
+                    response.raise_for_status()
+                    for line in response.iter_lines():
+                        for token in _tokens_from_sse(line):
+                            yielded = True
+                            yield token
+                    return
+        except httpx.TransportError:
+            # A retry would repeat the answer from its start.
+            if yielded or not _should_retry(attempt, None):
+                raise
+            delay = retry_delay(attempt)
+        time.sleep(delay)
+
+
+async def astream_talk_to_ai(
+    user_question: str,
+    ai_model: str,
+    system_prompt: str,
+    temperature: float,
+    timeout: float = HTTP_TIMEOUT_SECONDS,
+) -> AsyncIterator[str]:
+    """Async variant of :func:`stream_talk_to_ai`."""
+    body = _request_body(user_question, ai_model, system_prompt, temperature, True)
+    yielded = False
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        try:
+            async with get_async_client().stream(
+                "POST", MISTRAL_API_URL, json=body, headers=_headers(), timeout=timeout
+            ) as response:
+                if response.status_code in RETRY_STATUSES and _should_retry(
+                    attempt, response
+                ):
+                    delay = retry_delay(attempt, response)
+                else:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        for token in _tokens_from_sse(line):
+                            yielded = True
+                            yield token
+                    return
+        except httpx.TransportError:
+            if yielded or not _should_retry(attempt, None):
+                raise
+            delay = retry_delay(attempt)
+        await asyncio.sleep(delay)